@@ -18,6 +18,10 @@ DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = ['*']
 
+# Public address of the site, used for absolute URLs (sitemap.xml) instead of
+# the request's Host header
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000').rstrip('/')
+
 # CSRF settings for Vercel
 CSRF_TRUSTED_ORIGINS = [
     'https://*.vercel.app',
@@ -45,6 +49,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'posting.middleware.tracing.TracingMiddleware',
+    'posting.middleware.profiler.ProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,6 +75,19 @@ TEMPLATES = [
     },
 ]
 
+# The storefront pages (views.py, streaming and fragments) can render with
+# Jinja2 instead, from jinja2/ (see posting/jinja2.py)
+STOREFRONT_TEMPLATE_ENGINE = os.environ.get('STOREFRONT_TEMPLATE_ENGINE', 'django')
+JINJA2_TEMPLATES = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'DIRS': [BASE_DIR / 'jinja2'],
+    'OPTIONS': {
+        'environment': 'posting.jinja2.environment',
+    },
+}
+if STOREFRONT_TEMPLATE_ENGINE == 'jinja2':
+    TEMPLATES.append(JINJA2_TEMPLATES)
+
 WSGI_APPLICATION = 'Blog.wsgi.application'
 
 
@@ -100,9 +119,29 @@ USE_I10N = True
 USE_TZ = True
 
 # API Configuration - External Services
-SHOPEE_SHOP_ID = os.environ.get('SHOPEE_SHOP_ID', '53252649')  # Default: modelmanis34 shop ID
+SHOPEE_SHOP_ID = os.environ.get('SHOPEE_SHOP_ID', '53252649')  # Main shop ID when SHOPEE_SHOPS is not set (modelmanis34)
+# Storefronts merged into one catalog, the first is the main shop. Set
+# SHOPEE_SHOPS to "username[:shopid],..." to add shops (e.g. a reseller or a
+# clearance shop); a missing shop ID is looked up once and stored.
+SHOPEE_SHOPS = [
+    {'username': username.strip(), 'shopid': shopid.strip() or None}
+    for username, _, shopid in (
+        entry.partition(':') for entry in os.environ.get('SHOPEE_SHOPS', f'modelmanis34:{SHOPEE_SHOP_ID}').split(',')
+    )
+    if username.strip()
+]
 SHOPEE_PROXY = os.environ.get('SHOPEE_PROXY', '')  # Cloudflare Worker URL (optional but recommended)
 INSTAGRAM_ACCESS_TOKEN = os.environ.get('INSTAGRAM_ACCESS_TOKEN', '')
+INSTAGRAM_GRAPH_URL = os.environ.get('INSTAGRAM_GRAPH_URL', 'https://graph.instagram.com')
+INSTAGRAM_PAGE_SIZE = 25  # Posts per me/media page
+INSTAGRAM_SYNC_MAX_PAGES = 10  # Upper bound of new pages fetched per sync
+
+# Full-catalog crawler (refresh_catalog)
+SHOPEE_CRAWL_CONCURRENCY = 4  # Pages requested in parallel
+SHOPEE_CRAWL_RATE = 5  # Requests per second per shop, across its workers
+SHOPEE_CRAWL_MAX_PAGES = 200
+SHOPEE_SHOP_CRAWL_TIMEOUT = 120  # Seconds before a slow shop is left out of a refresh
+SHOPEE_PROXY_CACHE_DIR = os.path.join(BASE_DIR, 'proxy_cache')  # Pages recorded by `manage.py shopee_proxy`
 
 # Shopee & Instagram URLs
 SHOPEE_STORE_URL = 'https://shopee.co.id/modelmanis34'
@@ -110,6 +149,121 @@ INSTAGRAM_PROFILE_URL = 'https://www.instagram.com/modelmanis_rtl/'
 
 # Cache timeout (in seconds) for API calls
 API_CACHE_TIMEOUT = 300  # 5 minutes
+API_STALE_TIMEOUT = 86400  # Last good results, served when upstream is busy or down
+API_NEGATIVE_CACHE_TIMEOUT = 30  # Upstream errors and empty pages: not asked for again meanwhile
+
+# Concurrent upstream calls per process; callers wait at most queue_timeout
+# seconds for a slot, then serve stale/fallback data (see posting/utils/bulkhead.py)
+UPSTREAM_BULKHEADS = {
+    'shopee': {'limit': 8, 'queue_timeout': 0.5},
+    'instagram': {'limit': 4, 'queue_timeout': 0.5},
+}
+
+# Hedged requests and 429/5xx retries per upstream (see posting/utils/hedging.py):
+# hedge after the `percentile` latency for at most `budget` of the requests,
+# retry up to `max_retries` times after Retry-After or a jittered backoff
+# (`backoff` * 2^n seconds), unless that means waiting over `max_wait` seconds
+UPSTREAM_HEDGING = {
+    'shopee': {'percentile': 95, 'budget': 0.1, 'max_retries': 2, 'backoff': 0.25, 'max_wait': 2.0},
+    'instagram': {'percentile': 95, 'budget': 0.1, 'max_retries': 2, 'backoff': 0.5, 'max_wait': 5.0},
+}
+
+# Snapshots written by `manage.py refresh_catalog` and read by the views
+CATALOG_SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+CATALOG_READ_ONLY = os.environ.get('CATALOG_READ_ONLY', 'False') == 'True'  # Views never call upstream
+CATALOG_SNAPSHOT_MAX_AGE = 3600  # Older snapshots are ignored unless read-only
+CATALOG_REFRESH_INTERVAL = 300
+CATALOG_REFRESH_JITTER = 0.1  # +/- 10% of each delay
+CATALOG_REFRESH_MAX_BACKOFF = 3600
+INSTAGRAM_SNAPSHOT_LIMIT = 24
+
+# Static export of the storefront (`manage.py export_static`). With
+# SERVE_STATIC_EXPORT=True WhiteNoise serves the exported pages before Django.
+STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR', os.path.join(BASE_DIR, 'export'))
+if os.environ.get('SERVE_STATIC_EXPORT', 'False') == 'True':
+    WHITENOISE_ROOT = STATIC_EXPORT_DIR
+    WHITENOISE_INDEX_FILE = True
+
+# Related products, computed at each catalog refresh (see posting/utils/related.py)
+RELATED_K = 8
+RELATED_MAX_DF = 0.1  # Name tokens in more products than this share don't generate candidates
+
+# Homepage rendering: 'full' (one response once all data is in), 'stream'
+# (flush the shell, then each section as its data arrives; see posting/streaming.py)
+# or 'fragments' (data-free shell loading posting/fragment_views.py lazily)
+HOMEPAGE_RENDER_MODE = os.environ.get('HOMEPAGE_RENDER_MODE', 'full')
+
+# Background prefetch of the next product_list page (see posting/utils/prefetch.py)
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', 'True') == 'True'
+PREFETCH_CONCURRENCY = 2
+PREFETCH_WINDOW = 20  # Outcomes the hit rate is computed over
+PREFETCH_MIN_HIT_RATE = 0.3
+PREFETCH_COOLDOWN = 600
+
+# Request tracing (see posting/utils/tracing.py)
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.1'))  # Share of requests whose spans are exported
+TRACE_FILE = os.environ.get('TRACE_FILE', str(BASE_DIR / 'traces' / 'spans.ndjson'))
+TRACE_FILE_MAX_BYTES = 10 * 1024 * 1024
+TRACE_FILE_BACKUPS = 5
+
+# On-demand request profiler (see posting/middleware/profiler.py), off without a token
+PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN', '')
+PROFILER_DIR = os.environ.get('PROFILER_DIR', str(BASE_DIR / 'profiles'))
+PROFILER_INTERVAL = 0.005  # Seconds between stack samples
+
+# /api/status answers liveness only, its counters need this token in X-Status-Token
+STATUS_TOKEN = os.environ.get('STATUS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'trace_id': {'()': 'posting.utils.tracing.TraceIdFilter'},
+    },
+    'formatters': {
+        'traced': {'format': '%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['trace_id'],
+            'formatter': 'traced',
+        },
+    },
+    'loggers': {
+        'posting': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Edge cache policies (see posting/cache_policy.py), values in seconds
+CACHE_POLICIES = {
+    # Pages built from the Shopee catalog / Instagram feed
+    'catalog': {'s_maxage': 300, 'stale_while_revalidate': 600, 'stale_if_error': 86400,
+                'vary': ['Accept-Encoding']},
+    'instagram': {'s_maxage': 600, 'stale_while_revalidate': 1800, 'stale_if_error': 86400,
+                  'vary': ['Accept-Encoding']},
+    # Pages without API data (about, contact)
+    'static_page': {'s_maxage': 86400, 'stale_while_revalidate': 604800, 'stale_if_error': 604800,
+                    'vary': ['Accept-Encoding']},
+    # Data-free page shells (homepage in 'fragments' mode)
+    'shell': {'s_maxage': 86400, 'stale_while_revalidate': 604800, 'stale_if_error': 604800,
+              'vary': ['Accept-Encoding']},
+    # Served placeholder/fallback data: retry upstream soon
+    'degraded': {'s_maxage': 30, 'stale_while_revalidate': 30},
+    # Streamed homepage: headers leave before we know whether the data is
+    # fresh, stale or fallback, so it is cached as briefly as degraded pages
+    'stream': {'s_maxage': 30, 'stale_while_revalidate': 30, 'vary': ['Accept-Encoding']},
+    # 404s returned by views (product pages past the end of the catalog)
+    'not_found': {'s_maxage': 60},
+}
+CACHE_POLICY_ROUTES = {}  # URL name -> policy name overrides
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+
+# Templates compiled at startup (see settings_storefront)
+PRELOAD_TEMPLATES = []
+
+# Connection pool size of the async upstream client (per event loop)
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get('UPSTREAM_MAX_CONNECTIONS', '100'))
 
 # Cache configuration
 CACHES = {
@@ -141,6 +295,22 @@ except:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Local copies of Instagram media, written during feed sync (needs a writable disk)
+INSTAGRAM_MIRROR = os.environ.get('INSTAGRAM_MIRROR', 'False') == 'True'
+INSTAGRAM_MIRROR_ROOT = os.path.join(MEDIA_ROOT, 'instagram')
+INSTAGRAM_MIRROR_URL = MEDIA_URL + 'instagram/'
+INSTAGRAM_THUMBNAIL_SIZE = 480  # Square grid thumbnails (px)
+
+# Size and inline preview of card images, measured once per image at sync
+# time (see posting/utils/placeholders.py)
+IMAGE_PLACEHOLDERS = os.environ.get('IMAGE_PLACEHOLDERS', 'True') == 'True'
+IMAGE_PLACEHOLDER_MAX_NEW = 200  # Images downloaded per refresh, the rest next time
+IMAGE_PLACEHOLDER_CONCURRENCY = 8
+
+# Rendered product cards kept per process, reused while the product is
+# unchanged (see posting/utils/card_cache.py); 0 disables
+CARD_CACHE_SIZE = int(os.environ.get('CARD_CACHE_SIZE', '5000'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
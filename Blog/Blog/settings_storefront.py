@@ -0,0 +1,60 @@
+"""
+Lean settings profile for the stateless storefront
+
+The read-only views in posting/views.py use no sessions, messages, CSRF
+forms or translations, so this profile drops those apps and middleware to
+keep serverless cold starts short. Select it with:
+
+    DJANGO_SETTINGS_MODULE=Blog.settings_storefront
+
+Check the cold-start budget with `python manage.py startup_profile`.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'posting',
+    'django.contrib.staticfiles',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'posting.middleware.tracing.TracingMiddleware',
+    'posting.middleware.profiler.ProfilerMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'template'],  # noqa: F405
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+            # Compiled templates are kept for the life of the process
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+if STOREFRONT_TEMPLATE_ENGINE == 'jinja2':  # noqa: F405
+    TEMPLATES.append(JINJA2_TEMPLATES)  # noqa: F405
+
+USE_I18N = False
+
+# Compile the storefront templates while the app loads, not on first request
+PRELOAD_TEMPLATES = [
+    'base.html',
+    'posting/homepage.html',
+    'posting/product_list.html',
+    'posting/instagram.html',
+    'posting/about_us.html',
+    'posting/contact.html',
+]
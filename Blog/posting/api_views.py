@@ -0,0 +1,344 @@
+"""
+JSON API and sitemap views
+Serialized from the in-memory catalog and Instagram snapshots
+
+Response bodies are built once per data version and kept in memory with
+their ETag, so a repeated request costs a dictionary lookup and a write.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.urls import reverse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+from .cache_policy import cache_policy
+from .utils.bulkhead import get_bulkhead_stats
+from .utils.card_cache import get_card_cache_stats
+from .utils.hedging import get_upstream_stats
+from .utils.prefetch import get_prefetch_stats
+from .utils.catalog import SHOPEE_SNAPSHOT, get_catalog, get_instagram_payload, PRODUCTS_PER_PAGE
+from .utils.related import related_positions
+from .utils.snapshot import load_snapshot
+from .views import product_list_url
+from .utils.suggest import SuggestIndex, normalize
+import logging
+
+logger = logging.getLogger(__name__)
+
+API_MAX_LIMIT = 100
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MAX_QUERY = 64
+MAX_MEMO_ENTRIES = 512
+
+# kind -> {'version': str, 'entries': {key: (body, etag)}}
+_memo = {}
+
+# (catalog version, {itemid: index}) used to resolve cursors
+_positions = (None, {})
+
+# (catalog version, SuggestIndex)
+_suggest_index = (None, None)
+
+
+def memoized_body(kind, version, key, build):
+    """
+    Body and ETag for a response, built at most once per data version
+
+    Args:
+        kind: Response family ('products', 'instagram', 'sitemap')
+        version: Version of the data the body is built from
+        key: Variant within the version (cursor, limit...)
+        build: Callable returning the body bytes
+
+    Returns:
+        tuple: (body bytes, quoted ETag)
+    """
+    memo = _memo.get(kind)
+    if memo is None or memo['version'] != version or len(memo['entries']) >= MAX_MEMO_ENTRIES:
+        memo = _memo[kind] = {'version': version, 'entries': {}}
+
+    entry = memo['entries'].get(key)
+    if entry is None:
+        body = build()
+        entry = memo['entries'][key] = (body, f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+    return entry
+
+
+def respond(request, body, etag, content_type):
+    """
+    Serve a precomputed body, or 304 when the client already has it
+    """
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type=content_type)
+    response['ETag'] = etag
+    return response
+
+
+def dump_json(data):
+    """
+    Compact UTF-8 JSON bytes
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_cursor(itemid):
+    """
+    Opaque cursor pointing after the given item
+    """
+    return base64.urlsafe_b64encode(str(itemid).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Item ID a cursor points after, None if the cursor is malformed
+    """
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def parse_limit(value, default, maximum):
+    """
+    Clamp a ``limit`` query param to 1..maximum
+    """
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+@require_GET
+@cache_policy('catalog', keys=('catalog',))
+def products_api(request):
+    """
+    Cursor-paginated product list
+
+    Query params:
+        limit: Products per page (1-100, default 50)
+        cursor: ``next_cursor`` of the previous page
+    """
+    payload = get_catalog()
+    if payload is None:
+        return JsonResponse({'error': 'Catalog not available'}, status=503)
+
+    products = payload['data']['products']
+    limit = parse_limit(request.GET.get('limit'), PRODUCTS_PER_PAGE, API_MAX_LIMIT)
+    cursor = request.GET.get('cursor', '')
+
+    start = 0
+    if cursor:
+        after = decode_cursor(cursor)
+        positions = catalog_positions(payload)
+        if after not in positions:
+            return JsonResponse({'error': 'Invalid or expired cursor'}, status=400)
+        start = positions[after] + 1
+
+    def build():
+        page = [
+            dict(product, related=[products[other]['itemid'] for other in related_positions(payload, position)])
+            for position, product in enumerate(products[start:start + limit], start)
+        ]
+        has_next = bool(page) and start + limit < len(products)
+        return dump_json({
+            'version': payload['version'],
+            'total': len(products),
+            'count': len(page),
+            'products': page,
+            'next_cursor': encode_cursor(page[-1]['itemid']) if has_next else None,
+        })
+
+    body, etag = memoized_body('products', payload['version'], (start, limit), build)
+    return respond(request, body, etag, 'application/json')
+
+
+def catalog_positions(payload):
+    """
+    itemid -> index in the catalog, built once per version
+    """
+    global _positions
+
+    version, index = _positions
+    if version != payload['version']:
+        index = {product['itemid']: i for i, product in enumerate(payload['data']['products'])}
+        _positions = (payload['version'], index)
+    return index
+
+
+def catalog_suggest_index(payload):
+    """
+    Suggestion index of the catalog, built once per version
+    """
+    global _suggest_index
+
+    version, index = _suggest_index
+    if version != payload['version']:
+        started = time.perf_counter()
+        index = SuggestIndex(payload['data']['products'])
+        _suggest_index = (payload['version'], index)
+        logger.info(
+            f"Suggest index for catalog {payload['version']}: {len(index.tokens)} tokens "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+    return index
+
+
+@require_GET
+@cache_policy('catalog', keys=('catalog',))
+def related_products_api(request, itemid):
+    """
+    Precomputed similar products ("produk serupa") of one product
+    """
+    payload = get_catalog()
+    if payload is None:
+        return JsonResponse({'error': 'Catalog not available'}, status=503)
+
+    position = catalog_positions(payload).get(itemid)
+    if position is None:
+        return JsonResponse({'error': 'Product not found'}, status=404)
+
+    def build():
+        products = payload['data']['products']
+        return dump_json({
+            'itemid': itemid,
+            'related': [products[other] for other in related_positions(payload, position)],
+        })
+
+    body, etag = memoized_body('related', payload['version'], itemid, build)
+    return respond(request, body, etag, 'application/json')
+
+
+@require_GET
+@cache_policy('catalog', keys=('catalog',))
+def product_suggest(request):
+    """
+    Search-as-you-type suggestions, best sellers first
+
+    Query params:
+        q: What the customer typed so far
+        limit: Maximum suggestions (1-20, default 8)
+    """
+    payload = get_catalog()
+    if payload is None:
+        return JsonResponse({'error': 'Catalog not available'}, status=503)
+
+    query = normalize(request.GET.get('q', '')[:SUGGEST_MAX_QUERY])
+    limit = parse_limit(request.GET.get('limit'), 8, SUGGEST_MAX_LIMIT)
+    index = catalog_suggest_index(payload)
+
+    def build():
+        return dump_json(dict(q=query, **index.suggest(query, limit)))
+
+    body, etag = memoized_body('suggest', payload['version'], (query, limit), build)
+    return respond(request, body, etag, 'application/json')
+
+
+@require_GET
+@cache_policy('instagram', keys=('instagram',))
+def instagram_api(request):
+    """
+    Stored Instagram feed
+
+    Query params:
+        limit: Number of posts (default 24)
+    """
+    payload = get_instagram_payload()
+    if payload is None:
+        return JsonResponse({'error': 'Instagram feed not available'}, status=503)
+
+    media = payload['data']['media']
+    limit = parse_limit(request.GET.get('limit'), 24, max(len(media), 1))
+
+    def build():
+        return dump_json({
+            'version': payload['version'],
+            'count': len(media[:limit]),
+            'media': media[:limit],
+        })
+
+    body, etag = memoized_body('instagram', payload['version'], limit, build)
+    return respond(request, body, etag, 'application/json')
+
+
+@require_GET
+@cache_policy('catalog', keys=('catalog',))
+def sitemap(request):
+    """
+    sitemap.xml with the storefront pages and every product_list page
+
+    Without a catalog snapshot only the fixed pages are listed.
+    """
+    payload = get_catalog()
+    total = len(payload['data']['products']) if payload else 0
+    version = payload['version'] if payload else 'empty'
+    base_url = settings.SITE_URL
+
+    def build():
+        lastmod = None
+        if payload:
+            lastmod = datetime.fromtimestamp(payload['fetched_at'], tz=timezone.utc).strftime('%Y-%m-%d')
+
+        paths = [reverse('homepage'), reverse('product_list')]
+        total_pages = (total + PRODUCTS_PER_PAGE - 1) // PRODUCTS_PER_PAGE
+        paths += [product_list_url(page) for page in range(2, total_pages + 1)]
+        paths += [reverse('instagram_gallery'), reverse('about_us'), reverse('contact')]
+
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for path in paths:
+            entry = f'<url><loc>{escape(base_url + path)}</loc>'
+            if lastmod:
+                entry += f'<lastmod>{lastmod}</lastmod>'
+            lines.append(entry + '</url>')
+        lines.append('</urlset>')
+        return '\n'.join(lines).encode('utf-8')
+
+    body, etag = memoized_body('sitemap', version, None, build)
+    response = respond(request, body, etag, 'application/xml')
+    if payload is None:
+        # Storefront pages only until the refresher has stored a catalog
+        response.cache_policy = 'degraded'
+    return response
+
+
+def has_status_token(request):
+    """
+    Whether a request carries STATUS_TOKEN (never true without one set)
+    """
+    token = settings.STATUS_TOKEN
+    given = request.headers.get('X-Status-Token', '')
+    return bool(token) and hmac.compare_digest(given.encode(), token.encode())
+
+
+@require_GET
+def status_api(request):
+    """
+    Liveness, plus for requests with X-Status-Token (see STATUS_TOKEN):
+    upstream bulkhead counters of this process (active, queued, rejected),
+    hedge/retry counters and latency percentiles per upstream, product card
+    cache hit rate, product page prefetch hit rate, and the state of each
+    Shopee shop at the last catalog refresh
+    """
+    status = {'ok': True}
+    if has_status_token(request):
+        catalog = load_snapshot(SHOPEE_SNAPSHOT)
+        status.update({
+            'bulkheads': get_bulkhead_stats(),
+            'upstreams': get_upstream_stats(),
+            'cards': get_card_cache_stats(),
+            'prefetch': get_prefetch_stats(),
+            'shops': catalog['data'].get('shops', {}) if catalog else {},
+        })
+    response = JsonResponse(status)
+    response['Cache-Control'] = 'private, no-store'
+    return response
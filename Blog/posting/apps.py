@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PostingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'posting'
\ No newline at end of file
+    name = 'posting'
+
+    def ready(self):
+        # Connect catalog_changed receivers
+        from .utils import catalog  # noqa: F401
+
+        if settings.PRELOAD_TEMPLATES:
+            from django.template import TemplateDoesNotExist
+            from django.template.loader import get_template
+            for name in settings.PRELOAD_TEMPLATES:
+                get_template(name)
+                if settings.STOREFRONT_TEMPLATE_ENGINE != 'django':
+                    try:
+                        get_template(name, using=settings.STOREFRONT_TEMPLATE_ENGINE)
+                    except TemplateDoesNotExist:
+                        pass  # Page without a Jinja2 version
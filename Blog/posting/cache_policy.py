@@ -0,0 +1,98 @@
+"""
+Edge cache policies
+Cache-Control and surrogate-key headers so Vercel's CDN can serve pages
+
+Views declare a named policy from settings.CACHE_POLICIES with the
+@cache_policy decorator; CACHE_POLICY_ROUTES can override it per URL name.
+A view that had to fall back to placeholder data sets
+``response.cache_policy = 'degraded'`` so the fallback is not cached long;
+the streamed homepage, whose data is unknown when its headers leave, uses
+'stream'.
+404s a view returns (e.g. a page past the end of the catalog) get 'not_found'.
+"""
+import asyncio
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from .utils.catalog import current_version
+
+
+def build_cache_control(policy):
+    """
+    Cache-Control value for a policy dict
+    """
+    parts = ['public', f"max-age={policy.get('max_age', 0)}"]
+    for key in ('s_maxage', 'stale_while_revalidate', 'stale_if_error'):
+        if policy.get(key) is not None:
+            parts.append(f"{key.replace('_', '-')}={policy[key]}")
+    return ', '.join(parts)
+
+
+def surrogate_keys(request, keys):
+    """
+    Surrogate keys for a response: the route plus each data source, both
+    unversioned (purge everything from a source) and versioned (purge one
+    catalog/feed version)
+    """
+    match = request.resolver_match
+    tags = [f'page-{match.url_name}'] if match and match.url_name else []
+    for name in keys:
+        tags.append(name)
+        version = current_version(name)
+        if version:
+            tags.append(f'{name}-{version}')
+    return tags
+
+
+def apply_cache_policy(request, response, name, keys=()):
+    """
+    Set cache headers on a response unless the view already did
+    """
+    if response.has_header('Cache-Control') or response.status_code not in (200, 304, 404):
+        return response
+
+    match = request.resolver_match
+    if match and match.url_name in settings.CACHE_POLICY_ROUTES:
+        name = settings.CACHE_POLICY_ROUTES[match.url_name]
+    name = getattr(response, 'cache_policy', None) or name
+    if response.status_code == 404:
+        name = 'not_found'
+    policy = settings.CACHE_POLICIES[name]
+
+    response['Cache-Control'] = build_cache_control(policy)
+    if policy.get('vary'):
+        patch_vary_headers(response, policy['vary'])
+    tags = surrogate_keys(request, keys)
+    if tags:
+        response[settings.SURROGATE_KEY_HEADER] = ' '.join(tags)
+    return response
+
+
+def cache_policy(name, keys=()):
+    """
+    Decorator applying a named edge cache policy to a sync or async view
+
+    Args:
+        name: Key of settings.CACHE_POLICIES
+        keys: Data sources the page is built from ('catalog', 'instagram'),
+              emitted as surrogate keys for targeted purges
+
+    Usage:
+        @cache_policy('catalog', keys=('catalog',))
+        async def product_list(request): ...
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                response = await view(request, *args, **kwargs)
+                return apply_cache_policy(request, response, name, keys)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            return apply_cache_policy(request, response, name, keys)
+        return wrapper
+    return decorator
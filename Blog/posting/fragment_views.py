@@ -0,0 +1,100 @@
+"""
+HTML fragment views
+The product grid and the Instagram strip as separately cached fragments
+
+In 'fragments' render mode the homepage is a data-free shell that loads these
+lazily, so the shell can be cached for a long time while each fragment follows
+its own data's cache policy. Fragments carry an ETag of their content.
+"""
+import hashlib
+
+from django.conf import settings
+from django.views.decorators.http import require_GET
+from .api_views import parse_limit, respond
+from .cache_policy import cache_policy
+from .rendering import render_fragment
+from .utils.catalog import aget_products, aget_instagram_feed, PRODUCTS_PER_PAGE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def fragment_response(request, html):
+    """
+    HTML fragment with a content ETag (304 when the client has it)
+    """
+    body = html.encode('utf-8')
+    etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+    return respond(request, body, etag, 'text/html; charset=utf-8')
+
+
+@require_GET
+@cache_policy('catalog', keys=('catalog',))
+async def products_fragment(request):
+    """
+    Product grid for any slice of the catalog
+
+    Query params:
+        offset: Index of the first product (default 0)
+        limit: Number of products (1-50, default 8)
+    """
+    limit = parse_limit(request.GET.get('limit'), 8, PRODUCTS_PER_PAGE)
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+    except ValueError:
+        offset = 0
+
+    context = {'shopee_url': settings.SHOPEE_STORE_URL}
+    try:
+        shopee_data = await aget_products(limit=limit, offset=offset)
+        products = shopee_data.get('products', [])
+        context.update({
+            'products': products,
+            'has_products': len(products) > 0,
+            'shopee_error': shopee_data.get('error'),
+        })
+        degraded = shopee_data.get('error') or shopee_data.get('stale')
+    except Exception as e:
+        logger.error(f"Error in products fragment: {e}")
+        context.update({
+            'products': [],
+            'has_products': False,
+            'error': 'Mohon maaf, terjadi kesalahan saat memuat data.',
+        })
+        degraded = True
+
+    html = render_fragment(request, 'posting/partials/product_grid.html', context)
+    response = fragment_response(request, html)
+    if degraded:
+        response.cache_policy = 'degraded'
+    return response
+
+
+@require_GET
+@cache_policy('instagram', keys=('instagram',))
+async def instagram_fragment(request):
+    """
+    Instagram strip of the homepage (empty when there are no posts)
+
+    Query params:
+        limit: Number of posts (1-24, default 6)
+    """
+    limit = parse_limit(request.GET.get('limit'), 6, settings.INSTAGRAM_SNAPSHOT_LIMIT)
+    try:
+        instagram_data = await aget_instagram_feed(limit=limit)
+        degraded = bool(instagram_data.get('error')) and instagram_data.get('has_token', False)
+    except Exception as e:
+        logger.error(f"Error in Instagram fragment: {e}")
+        instagram_data = {}
+        degraded = True
+
+    instagram_posts = instagram_data.get('media', [])
+    html = render_fragment(request, 'posting/partials/home_instagram.html', {
+        'instagram_posts': instagram_posts,
+        'has_instagram': len(instagram_posts) > 0,
+    })
+
+    response = fragment_response(request, html)
+    if degraded:
+        response.cache_policy = 'degraded'
+    return response
@@ -0,0 +1,76 @@
+"""
+Jinja2 environment for the storefront templates
+Used when STOREFRONT_TEMPLATE_ENGINE = 'jinja2'
+
+The templates in jinja2/ mirror the storefront pages in template/ (base,
+homepage, product_list, instagram, about_us, contact and their partials)
+and render the same HTML.
+The api_filters filters are registered under the same names; its tags and
+{% url %} / {% static %} become globals:
+
+    {{ url('product_list') }}
+    {{ get_setting('SHOPEE_STORE_URL') }}
+    <img ... {{ image_placeholder(product.placeholder) }}>
+    {{ product_card(product, 'list') }}
+
+Values are printed as the Django engine prints them (localized, escaped by
+django.utils.html), so quotes come out as &quot; and &#x27; rather than
+markupsafe's &#34; and &#39;.
+
+Jinja compiles each template to Python once and keeps it in the environment,
+which is much cheaper per card than the Django template engine.
+"""
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.formats import localize
+from django.utils.html import conditional_escape
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+from .templatetags.api_filters import (
+    format_price, truncate_text, shopee_image, format_number, rating_stars,
+    instagram_type_icon, shopee_product_url, get_setting, image_placeholder, product_card,
+)
+
+
+def url(name, *args, **kwargs):
+    """
+    {% url %}: ``url('product_list_page', 2)``
+    """
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def finalize(value):
+    """
+    Render ``{{ value }}`` like Django's render_value_in_context
+
+    The result is safe, so Jinja's autoescape leaves it alone.
+    """
+    return conditional_escape(localize(template_localtime(value)))
+
+
+def environment(**options):
+    """
+    Environment factory named in the Jinja2 TEMPLATES OPTIONS
+    """
+    # Django templates keep the final newline, so must Jinja for the same HTML
+    options.setdefault('keep_trailing_newline', True)
+    options.setdefault('finalize', finalize)
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'static': static,
+        'get_setting': get_setting,
+        'shopee_product_url': shopee_product_url,
+        'image_placeholder': image_placeholder,
+        'product_card': product_card,
+    })
+    env.filters.update({
+        'format_price': format_price,
+        'truncate_text': truncate_text,
+        'shopee_image': shopee_image,
+        'format_number': format_number,
+        'rating_stars': rating_stars,
+        'instagram_type_icon': instagram_type_icon,
+    })
+    return env
@@ -0,0 +1,122 @@
+import re
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.loader import get_template
+from django.test import RequestFactory, override_settings
+from posting.utils.card_cache import CARD_TEMPLATE, clear_card_cache, get_card_cache_stats
+from posting.utils.catalog import SHOPEE_SNAPSHOT, PRODUCTS_PER_PAGE
+from posting.utils.shopee_api import get_static_products
+from posting.utils.snapshot import load_snapshot
+
+PAGE_TEMPLATE = 'posting/product_list.html'
+
+# How product_list includes a card, per template engine
+CARD_CALLS = {
+    'django': "{% product_card product 'list' %}",
+    'jinja2': "{{ product_card(product, 'list') }}",
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare render times of a product_list page with its cards inline (as before the card '
+            'cache) and through the product card cache')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50,
+                            help='Renders per scenario')
+        parser.add_argument('--cards', type=int, default=PRODUCTS_PER_PAGE,
+                            help='Cards on the page')
+
+    def handle(self, *args, **options):
+        engine = settings.STOREFRONT_TEMPLATE_ENGINE
+        products = self.products(options['cards'])
+        request = RequestFactory().get('/products/')
+        runs = options['runs']
+        inline_page = self.inline_template(engine)
+        page_template = get_template(PAGE_TEMPLATE, using=engine)
+
+        def context(page):
+            return {
+                'products': page,
+                'has_products': True,
+                'page_number': 1,
+                'total_pages': 1,
+                'total_products': len(page),
+            }
+
+        def render(page):
+            return page_template.render(context(page), request)
+
+        def changed(run):
+            # One product whose stock changed between renders
+            page = list(products)
+            page[run % len(page)] = dict(page[run % len(page)], stock=1000 + run)
+            return page
+
+        self.stdout.write(f"product_list ({engine} templates), "
+                          f"{len(products)} cards, {runs} runs per scenario (ms)")
+        self.stdout.write(f"{'scenario':<16} {'median':>8} {'p95':>8}")
+        inline = self.measure('inline loop', runs, lambda run: inline_page.render(context(products), request))
+        with override_settings(CARD_CACHE_SIZE=0):
+            self.measure('tags, no cache', runs, lambda run: render(products))
+        # Measured even if CARD_CACHE_SIZE disables the cache here
+        with override_settings(CARD_CACHE_SIZE=max(settings.CARD_CACHE_SIZE, 2 * len(products))):
+            clear_card_cache()
+            self.measure('cold', runs, lambda run: (clear_card_cache(), render(products)))
+            clear_card_cache()
+            warm = self.measure('warm', runs, lambda run: render(products))
+            self.measure('1 card changed', runs, lambda run: render(changed(run)))
+
+        stats = get_card_cache_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"warm is {inline / warm:.1f}x faster than the inline loop; "
+            f"hit rate {stats['hit_rate']:.1%}, {stats['size']} cards cached"
+        ))
+
+    def inline_template(self, engine):
+        """
+        product_list with the card markup pasted into its loop, the way the
+        page rendered before cards went through the cache
+        """
+        def source(name):
+            with open(get_template(name, using=engine).origin.name, encoding='utf-8') as f:
+                return f.read()
+
+        card = re.sub(r'{% load [^%]*%}', '', source(CARD_TEMPLATE))
+        page = source(PAGE_TEMPLATE).replace(
+            CARD_CALLS[engine], "{% with variant='list' %}" + card + '{% endwith %}',
+        )
+        return engines[engine].from_string(page)
+
+    def products(self, count):
+        """
+        Products of the catalog snapshot, or the static ones repeated
+        """
+        catalog = load_snapshot(SHOPEE_SNAPSHOT)
+        products = catalog['data']['products'][:count] if catalog else []
+        if not products:
+            static = get_static_products()
+            products = [dict(static[i % len(static)], itemid=i) for i in range(count)]
+        return products
+
+    def measure(self, name, runs, render):
+        """
+        Time ``render(run)`` and print the median and p95
+
+        Returns:
+            float: Median ms
+        """
+        timings = []
+        for run in range(runs):
+            started = time.perf_counter()
+            render(run)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        median = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"{name:<16} {median:8.2f} {p95:8.2f}")
+        return median
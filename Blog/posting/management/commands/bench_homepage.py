@@ -0,0 +1,89 @@
+import html
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from wsgiref.util import setup_testing_defaults
+
+
+class Command(BaseCommand):
+    help = 'Compare time-to-first-byte and first paint of the homepage render modes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', choices=['full', 'stream', 'fragments'],
+                            help='Render mode to measure (can be repeated, default: all)')
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Requests per mode')
+        parser.add_argument('--url', default='/',
+                            help='Page to request')
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the cache between runs (default: clear it before each request)')
+
+    def handle(self, *args, **options):
+        application = get_wsgi_application()
+        modes = options['mode'] or ['full', 'stream', 'fragments']
+
+        self.stdout.write(f"{options['url']}, {options['runs']} runs per mode, "
+                          f"{'warm' if options['warm'] else 'cold'} cache (median ms)")
+        self.stdout.write(f"{'mode':<10} {'ttfb':>8} {'head':>8} {'complete':>9} {'bytes':>8}")
+        for mode in modes:
+            timings = []
+            with override_settings(HOMEPAGE_RENDER_MODE=mode):
+                for _ in range(options['runs']):
+                    if not options['warm']:
+                        cache.clear()
+                    timings.append(self.measure(application, options['url']))
+
+            ttfb, head, complete, size = (statistics.median(column) for column in zip(*timings))
+            self.stdout.write(f"{mode:<10} {ttfb:8.1f} {head:8.1f} {complete:9.1f} {size:8.0f}")
+
+        self.stdout.write(self.style.SUCCESS(
+            'ttfb: first byte, head: </head> sent (browser starts loading CSS and fonts), '
+            'complete: last byte'
+        ))
+
+    def measure(self, application, url):
+        """
+        Request a page through the WSGI handler, timing each chunk
+
+        In fragments mode, ``complete`` includes loading the page's fragments
+        in parallel, as a browser would.
+
+        Returns:
+            tuple: (ttfb ms, head ms, complete ms, bytes)
+        """
+        path, _, query = url.partition('?')
+        environ = {'PATH_INFO': path, 'QUERY_STRING': query}
+        setup_testing_defaults(environ)
+
+        started = time.perf_counter()
+        ttfb = head = None
+        body = b''
+        result = application(environ, lambda status, headers, exc_info=None: None)
+        try:
+            for chunk in result:
+                now = (time.perf_counter() - started) * 1000
+                if ttfb is None and chunk:
+                    ttfb = now
+                body += chunk
+                if head is None and b'</head>' in body:
+                    head = now
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        complete = (time.perf_counter() - started) * 1000
+
+        # Fragments mode: the browser then loads the fragments in parallel
+        fragment_urls = [html.unescape(url) for url in re.findall(r'data-fragment="([^"]+)"', body.decode())]
+        if fragment_urls:
+            with ThreadPoolExecutor(max_workers=len(fragment_urls)) as pool:
+                fragments = list(pool.map(lambda url: self.measure(application, url), fragment_urls))
+            complete += max(fragment[2] for fragment in fragments)
+            body_size = len(body) + sum(fragment[3] for fragment in fragments)
+            return ttfb or complete, head or complete, complete, body_size
+        return ttfb or complete, head or complete, complete, len(body)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from posting.utils.catalog import SHOPEE_SNAPSHOT, PRODUCTS_PER_PAGE
+from posting.utils.instagram_api import INSTAGRAM_SNAPSHOT
+from posting.utils.snapshot import load_snapshot
+from posting.views import product_list_url
+
+# Manifest written inside the output by earlier versions, where WhiteNoise
+# served it to anyone
+OLD_MANIFEST = '.export-manifest.json'
+
+
+def setup_worker(site_url):
+    """
+    Worker process: render from snapshots only, never call upstream
+    """
+    import django
+    django.setup()
+    settings.CATALOG_READ_ONLY = True
+    settings.HOMEPAGE_RENDER_MODE = 'full'
+    settings.SITE_URL = site_url
+
+
+def render_path(path):
+    """
+    Render one URL through the full Django stack
+
+    Returns:
+        tuple: (path, status code, body bytes)
+    """
+    from django.test import Client
+
+    site = urlparse(settings.SITE_URL)
+    client = Client(HTTP_HOST=site.netloc)
+    response = client.get(path, secure=site.scheme == 'https')
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    return path, response.status_code, body
+
+
+def output_file(output, path):
+    """
+    File serving a URL path: /products/ -> products/index.html
+    """
+    relative = path.lstrip('/')
+    if not relative or relative.endswith('/'):
+        relative += 'index.html'
+    return os.path.join(output, relative)
+
+
+def manifest_file(output):
+    """
+    Manifest of an export, next to the output directory and never served
+    from it: export/ -> export.manifest.json
+    """
+    return os.path.normpath(output) + '.manifest.json'
+
+
+def fingerprint(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Render every storefront page from the snapshots into static HTML files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.STATIC_EXPORT_DIR,
+                            help='Directory to write the site to')
+        parser.add_argument('--site-url', default=settings.SITE_URL,
+                            help='Public address of the site, used for absolute URLs (sitemap.xml)')
+        parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                            help='Render processes')
+        parser.add_argument('--force', action='store_true',
+                            help='Render every page, even if its inputs did not change')
+
+    def handle(self, *args, **options):
+        catalog = load_snapshot(SHOPEE_SNAPSHOT)
+        if catalog is None:
+            raise CommandError('No catalog snapshot, run `manage.py refresh_catalog --once` first')
+        feed = load_snapshot(INSTAGRAM_SNAPSHOT)
+
+        output = options['output']
+        manifest_path = manifest_file(output)
+        old_manifest_path = os.path.join(output, OLD_MANIFEST)
+        manifest = {}
+        for path in (manifest_path, old_manifest_path):
+            try:
+                with open(path) as f:
+                    manifest = json.load(f)
+                break
+            except (FileNotFoundError, ValueError):
+                pass
+
+        site_url = options['site_url'].rstrip('/')
+        pages = self.page_inputs(catalog, feed, site_url)
+        stale = {
+            path: inputs for path, inputs in pages.items()
+            if options['force'] or manifest.get(path) != inputs
+            or not os.path.exists(output_file(output, path))
+        }
+
+        started = time.perf_counter()
+        failed = []
+        if stale:
+            jobs = max(1, min(options['jobs'], len(stale)))
+            with ProcessPoolExecutor(max_workers=jobs, initializer=setup_worker,
+                                     initargs=(site_url,)) as pool:
+                for path, status, body in pool.map(render_path, sorted(stale), chunksize=4):
+                    if status != 200:
+                        failed.append(f'{path} ({status})')
+                        stale.pop(path)
+                        continue
+                    self.write(output_file(output, path), body)
+        elapsed = time.perf_counter() - started
+
+        # Pages that no longer exist (e.g. the catalog shrank)
+        removed = [path for path in manifest if path not in pages]
+        for path in removed:
+            try:
+                os.remove(output_file(output, path))
+            except FileNotFoundError:
+                pass
+
+        manifest = {path: inputs for path, inputs in manifest.items() if path in pages}
+        manifest.update(stale)
+        self.write(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode())
+        if os.path.exists(old_manifest_path):
+            os.remove(old_manifest_path)
+
+        rate = len(stale) / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{len(pages)} pages: {len(stale)} rendered in {elapsed:.2f}s ({rate:.1f} pages/s), "
+            f"{len(pages) - len(stale) - len(failed)} unchanged, {len(removed)} removed"
+        )
+        if failed:
+            raise CommandError(f"Failed to render: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f'Site exported to {output}'))
+
+    def page_inputs(self, catalog, feed, site_url):
+        """
+        Every exported URL with a fingerprint of what its HTML depends on
+
+        Returns:
+            dict: {path: fingerprint}
+        """
+        products = catalog['data']['products']
+        total = catalog['data']['total']
+        media = feed['data']['media'] if feed else []
+        templates = self.templates_fingerprint()
+
+        pages = {
+            reverse('homepage'): fingerprint(templates, products[:12], total, media[:6]),
+            reverse('instagram_gallery'): fingerprint(templates, media[:24]),
+            reverse('about_us'): fingerprint(templates),
+            reverse('contact'): fingerprint(templates),
+            reverse('sitemap'): fingerprint(site_url, catalog['version'], catalog['fetched_at'] // 86400),
+        }
+        total_pages = max(1, (total + PRODUCTS_PER_PAGE - 1) // PRODUCTS_PER_PAGE)
+        for page in range(1, total_pages + 1):
+            window = products[(page - 1) * PRODUCTS_PER_PAGE:page * PRODUCTS_PER_PAGE]
+            pages[product_list_url(page)] = fingerprint(templates, window, total, page)
+        return pages
+
+    def templates_fingerprint(self):
+        """
+        Hash of the templates and template tags every page is built with
+        """
+        digest = hashlib.sha1()
+        roots = [str(directory) for engine in settings.TEMPLATES for directory in engine['DIRS']]
+        roots.append(os.path.join(settings.BASE_DIR, 'posting', 'templatetags'))
+        for root in roots:
+            for directory, _, files in sorted(os.walk(root)):
+                for name in sorted(files):
+                    if name.endswith(('.html', '.py')):
+                        with open(os.path.join(directory, name), 'rb') as f:
+                            digest.update(name.encode() + f.read())
+        return digest.hexdigest()
+
+    def write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from posting.utils.profiler import list_profiles, load_profile, format_summary
+
+
+class Command(BaseCommand):
+    help = 'List stored request profiles or summarize one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?',
+                            help='Profile file to summarize (default: list all, "latest" for the newest)')
+        parser.add_argument('--top', type=int, default=25,
+                            help='Number of functions in the summary')
+        parser.add_argument('--collapsed', action='store_true',
+                            help='Print collapsed stacks for flame graph tools instead of a summary')
+
+    def handle(self, *args, **options):
+        names = list_profiles()
+        name = options['name']
+
+        if not name:
+            if not names:
+                self.stdout.write('No profiles stored')
+                return
+            for name in names:
+                profile = load_profile(name)
+                self.stdout.write(
+                    f"{name}  {profile['method']} {profile['url']}  "
+                    f"{profile['status']}  {profile['wall_ms']} ms"
+                )
+            return
+
+        if name == 'latest':
+            if not names:
+                raise CommandError('No profiles stored')
+            name = names[0]
+
+        try:
+            profile = load_profile(name)
+        except FileNotFoundError:
+            raise CommandError(f'Profile not found: {name}')
+
+        if options['collapsed']:
+            for stack, count in profile['stacks'].items():
+                self.stdout.write(f'{stack} {count}')
+            return
+
+        self.stdout.write(format_summary(profile, options['top']))
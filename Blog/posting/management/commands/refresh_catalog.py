@@ -0,0 +1,114 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posting.utils.catalog import (
+    RefreshError, refresh_shopee_catalog, refresh_instagram_feed,
+)
+from posting.utils.snapshot import load_snapshot, save_snapshot
+
+REFRESHERS = {
+    'shopee': refresh_shopee_catalog,
+    'instagram': refresh_instagram_feed,
+}
+
+STATUS_SNAPSHOT = 'refresh_status'
+
+
+class Command(BaseCommand):
+    help = 'Keep the Shopee catalog and Instagram feed snapshots fresh (runs until stopped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Refresh every source once and exit')
+        parser.add_argument('--interval', type=float, default=settings.CATALOG_REFRESH_INTERVAL,
+                            help='Seconds between successful refreshes')
+        parser.add_argument('--jitter', type=float, default=settings.CATALOG_REFRESH_JITTER,
+                            help='Random spread applied to every delay (fraction of the delay)')
+        parser.add_argument('--max-backoff', type=float, default=settings.CATALOG_REFRESH_MAX_BACKOFF,
+                            help='Upper bound in seconds for the delay while a source keeps failing')
+        parser.add_argument('--source', action='append', choices=sorted(REFRESHERS),
+                            help='Only refresh this source (can be repeated)')
+
+    def handle(self, *args, **options):
+        sources = options['source'] or sorted(REFRESHERS)
+        status = (load_snapshot(STATUS_SNAPSHOT) or {}).get('data', {})
+        next_run = {source: 0.0 for source in sources}
+
+        try:
+            while True:
+                now = time.monotonic()
+                for source in sources:
+                    if next_run[source] > now:
+                        continue
+                    entry = self.refresh(source, status.get(source, {}))
+                    status[source] = entry
+                    save_snapshot(STATUS_SNAPSHOT, status)
+                    next_run[source] = time.monotonic() + self.next_delay(entry, options)
+
+                if options['once']:
+                    break
+
+                time.sleep(max(0.0, min(next_run.values()) - time.monotonic()))
+        except KeyboardInterrupt:
+            self.stdout.write('Refresher stopped')
+
+        if options['once'] and any(not status[source]['ok'] for source in sources):
+            # Non-zero exit so cron/CI notices a failed one-shot refresh
+            raise SystemExit(1)
+
+    def refresh(self, source, previous):
+        """
+        Run one refresh and return the status entry for the source
+        """
+        started = time.time()
+        entry = {
+            'last_attempt': started,
+            'last_success': previous.get('last_success'),
+            'consecutive_failures': previous.get('consecutive_failures', 0),
+            'version': previous.get('version'),
+        }
+
+        try:
+            payload = REFRESHERS[source]()
+        except RefreshError as e:
+            entry.update(ok=False, error=str(e))
+        except Exception as e:
+            entry.update(ok=False, error=f'Unexpected error: {e}')
+        else:
+            entry.update(ok=True, error=None, version=payload['version'], consecutive_failures=0,
+                         last_success=payload.get('checked_at', payload['fetched_at']))
+
+        entry['duration'] = round(time.time() - started, 3)
+        if entry['last_success']:
+            entry['data_age'] = round(time.time() - entry['last_success'], 1)
+        else:
+            entry['data_age'] = None
+
+        if entry['ok']:
+            self.stdout.write(self.style.SUCCESS(
+                f"{source}: refreshed in {entry['duration']}s (version {entry['version']})"
+            ))
+        else:
+            entry['consecutive_failures'] += 1
+            age = 'unknown' if entry['data_age'] is None else f"{entry['data_age']:.0f}s"
+            self.stderr.write(self.style.ERROR(
+                f"{source}: refresh failed in {entry['duration']}s "
+                f"({entry['consecutive_failures']} in a row, data age {age}): {entry['error']}"
+            ))
+
+        return entry
+
+    def next_delay(self, entry, options):
+        """
+        Delay until the next refresh: fixed interval on success, exponential
+        backoff while failing, both spread by jitter so workers do not align
+        """
+        delay = options['interval']
+        if not entry['ok']:
+            delay = min(delay * 2 ** (entry['consecutive_failures'] - 1), options['max_backoff'])
+
+        spread = delay * options['jitter']
+        return max(1.0, delay + random.uniform(-spread, spread))
+
@@ -0,0 +1,320 @@
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posting.utils.shopee_api import compact_search_items, get_item_basics
+
+SHOPEE_SEARCH_URL = 'https://shopee.co.id/api/v4/search/search_items'
+
+# Same browser-like headers as cloudflare-worker/shopee-proxy.js
+UPSTREAM_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Language': 'id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Referer': 'https://shopee.co.id/',
+    'Origin': 'https://shopee.co.id',
+    'X-Requested-With': 'XMLHttpRequest',
+    'X-Api-Source': 'pc',
+}
+
+FAKE_WORDS = [
+    'gamis', 'hijab', 'kemeja', 'rok', 'celana', 'tunik', 'blouse', 'dress',
+    'syari', 'motif', 'polos', 'batik', 'katun', 'rayon', 'premium', 'wanita',
+]
+
+
+class ProxyError(Exception):
+    """
+    Raised when a page can be served neither from upstream nor from the cache
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ShopeeProxy:
+    """
+    The Cloudflare Worker contract (shopid, limit, offset) with a cache
+
+    Upstream pages are stored compacted, in memory and as JSON files in
+    ``cache_dir``, so a recorded session can be replayed offline.
+
+    Args:
+        cache_dir: Directory of recorded pages
+        ttl: Seconds a cached page is served without asking upstream
+        offline: Serve recorded (or fake) pages only, never call Shopee
+        fake: Items per shop of a generated catalog (0: disabled)
+        delay: Seconds added to every upstream or fake call
+    """
+
+    def __init__(self, cache_dir, ttl, offline=False, fake=0, delay=0.0):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+        self.fake = fake
+        self.delay = delay
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'hits': 0, 'misses': 0, 'stale': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def cache_path(self, key):
+        return os.path.join(self.cache_dir, '{}_{}_{}.json'.format(*key))
+
+    def cached(self, key):
+        """
+        Recorded page for a key
+
+        Returns:
+            tuple or None: (fetched_at, compact payload)
+        """
+        entry = self.memory.get(key)
+        if entry is None:
+            try:
+                with open(self.cache_path(key), encoding='utf-8') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                return None
+            entry = self.memory[key] = (stored['fetched_at'], stored['data'])
+        return entry
+
+    def store(self, key, data):
+        fetched_at = time.time()
+        self.memory[key] = (fetched_at, data)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{self.cache_path(key)}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': fetched_at, 'data': data}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path(key))
+        except OSError:
+            pass
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def get_page(self, shop_id, limit, offset):
+        """
+        Compact search_items page, from the cache when fresh enough
+
+        Returns:
+            tuple: (compact payload, 'hit' | 'miss' | 'stale' | 'fake')
+
+        Raises:
+            ProxyError: If upstream failed and nothing is cached
+        """
+        if self.fake:
+            return self.fake_page(shop_id, limit, offset), 'fake'
+
+        key = (shop_id, limit, offset)
+        entry = self.cached(key)
+        if entry and (self.offline or time.time() - entry[0] < self.ttl):
+            self.count('hits')
+            return entry[1], 'hit'
+        if self.offline:
+            raise ProxyError(404, f'Not recorded: shopid={shop_id} limit={limit} offset={offset}')
+
+        try:
+            data = self.fetch_upstream(shop_id, limit, offset)
+        except ProxyError:
+            if entry is None:
+                raise
+            # Upstream failing: an old page is better than none
+            self.count('stale')
+            return entry[1], 'stale'
+
+        self.count('misses')
+        self.store(key, data)
+        return data, 'miss'
+
+    def fetch_upstream(self, shop_id, limit, offset):
+        import requests
+
+        params = {
+            'by': 'relevancy',
+            'limit': limit,
+            'match_id': shop_id,
+            'newest': offset,
+            'order': 'desc',
+            'page_type': 'shop',
+            'scenario': 'PAGE_OTHERS',
+            'version': 2,
+        }
+        time.sleep(self.delay)
+        try:
+            response = requests.get(SHOPEE_SEARCH_URL, params=params, headers=UPSTREAM_HEADERS, timeout=15)
+            self.count('bytes_in', len(response.content))
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None) or 502
+            raise ProxyError(status, f'Failed to fetch from Shopee: {e}')
+
+        if data.get('error') not in (0, None):
+            raise ProxyError(502, f"Shopee error: {data.get('error_msg') or data.get('error')}")
+        data['error'] = 0
+        return compact_search_items(data)
+
+    def fake_page(self, shop_id, limit, offset):
+        """
+        Deterministic generated page, for development and benchmarks
+        """
+        time.sleep(self.delay)
+        items = []
+        for index in range(offset, min(offset + limit, self.fake)):
+            rng = random.Random(f'{shop_id}-{index}')
+            itemid = int(shop_id) * 100000 + index if str(shop_id).isdigit() else index
+            items.append({'item_basic': {
+                'itemid': itemid,
+                'shopid': int(shop_id) if str(shop_id).isdigit() else 0,
+                'name': ' '.join(rng.sample(FAKE_WORDS, 4)).title() + f' {index}',
+                'catid': rng.randint(1, 6),
+                'price': rng.randint(3, 60) * 5000 * 100000,
+                'price_min': 0,
+                'price_max': 0,
+                'image': f'fake{itemid}',
+                'images': [f'fake{itemid}'],
+                'stock': rng.randint(0, 100),
+                'sold': rng.randint(0, 300),
+                'historical_sold': rng.randint(0, 5000),
+                'liked_count': rng.randint(0, 500),
+                'item_rating': {'rating_star': round(rng.uniform(4, 5), 1), 'rating_count': [0] * 6},
+            }})
+        return compact_search_items({
+            'error': 0,
+            'total_count': self.fake,
+            'nomore': offset + limit >= self.fake,
+            'items': items,
+        })
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """
+    GET /?shopid=&limit=&offset=[&format=compact], like the Worker
+    """
+    proxy = None
+    output = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_OPTIONS(self):
+        self.send_json(204, None)
+
+    def do_GET(self):
+        started = time.perf_counter()
+        query = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        shop_id = query.get('shopid')
+        self.proxy.count('requests')
+
+        if urlparse(self.path).path == '/stats':
+            self.send_json(200, self.proxy.stats)
+            return
+        if not shop_id:
+            self.send_json(400, {'error': 'Missing shopid parameter'})
+            return
+
+        try:
+            limit = max(1, min(100, int(query.get('limit', 50))))
+            offset = max(0, int(query.get('offset', 0)))
+        except ValueError:
+            self.send_json(400, {'error': 'Invalid limit or offset'})
+            return
+
+        try:
+            data, source = self.proxy.get_page(shop_id, limit, offset)
+        except ProxyError as e:
+            self.send_json(e.status, {'error': 'Failed to fetch from Shopee', 'message': str(e)})
+            return
+
+        if query.get('format') != 'compact':
+            # Same contract for clients that expect item_basic objects
+            items = [{'item_basic': item_basic} for item_basic in get_item_basics(data)]
+            data = {key: value for key, value in data.items() if key not in ('fields', 'rows')}
+            data['items'] = items
+        size = self.send_json(200, data, {'X-Cache': source.upper()})
+
+        self.output.write(
+            f"{shop_id} limit={limit} offset={offset} {source} {size} bytes "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    def send_json(self, status, data, headers=None):
+        """
+        Send a JSON response, gzipped when the client accepts it
+
+        Returns:
+            int: Bytes sent in the body
+        """
+        body = b'' if data is None else json.dumps(data, separators=(',', ':')).encode('utf-8')
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '') and len(body) > 200
+        if gzipped:
+            body = gzip.compress(body, compresslevel=6)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Vary', 'Accept-Encoding')
+        if status == 200:
+            self.send_header('Cache-Control', f'public, max-age={self.proxy.ttl}')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.proxy.count('bytes_out', len(body))
+        return len(body)
+
+
+class Command(BaseCommand):
+    help = 'Run the Shopee proxy locally (SHOPEE_PROXY=http://HOST:PORT/), trimmed and gzipped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8787)
+        parser.add_argument('--cache-dir', default=settings.SHOPEE_PROXY_CACHE_DIR,
+                            help='Where upstream pages are recorded')
+        parser.add_argument('--ttl', type=int, default=600,
+                            help='Seconds a recorded page is served without asking Shopee')
+        parser.add_argument('--offline', action='store_true',
+                            help='Only serve recorded pages, never call Shopee')
+        parser.add_argument('--fake', type=int, default=0, metavar='N',
+                            help='Serve a generated catalog of N items per shop instead of Shopee')
+        parser.add_argument('--delay', type=float, default=0.0,
+                            help='Seconds of added latency per upstream (or fake) page')
+
+    def handle(self, *args, **options):
+        proxy = ShopeeProxy(options['cache_dir'], options['ttl'], options['offline'],
+                            options['fake'], options['delay'])
+        handler = type('Handler', (ProxyHandler,), {'proxy': proxy, 'output': self.stdout})
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+        server.daemon_threads = True
+
+        if options['fake']:
+            mode = f"fake catalog of {options['fake']} items per shop"
+        elif options['offline']:
+            mode = f"offline, recorded pages from {options['cache_dir']}"
+        else:
+            mode = f"Shopee, pages recorded to {options['cache_dir']} (ttl {options['ttl']}s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"Shopee proxy on http://{options['host']}:{options['port']}/ ({mode})"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'Stats: {proxy.stats}')
@@ -0,0 +1,111 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is imported yet
+PROBE = '''
+import json, sys, time
+sys.path.insert(0, {base_dir!r})
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+startup_ms = (time.perf_counter() - started) * 1000
+
+from wsgiref.util import setup_testing_defaults
+first_requests = []
+for url in {urls!r}:
+    path, _, query = url.partition('?')
+    environ = {{'PATH_INFO': path, 'QUERY_STRING': query}}
+    setup_testing_defaults(environ)
+    status = []
+    started = time.perf_counter()
+    body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+    first_requests.append({{
+        'url': url,
+        'status': status[0],
+        'bytes': len(body),
+        'ms': (time.perf_counter() - started) * 1000,
+    }})
+print(json.dumps({{'startup_ms': startup_ms, 'first_requests': first_requests}}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure import time per module and first-request time in a fresh process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'Blog.settings'),
+                            help='Settings module to start with (e.g. Blog.settings_storefront)')
+        parser.add_argument('--url', action='append',
+                            help='URL requested after startup (can be repeated, default: / and /about/)')
+        parser.add_argument('--top', type=int, default=20,
+                            help='Number of modules to list')
+        parser.add_argument('--budget-ms', type=float,
+                            help='Fail when startup plus the first request exceeds this many ms')
+
+    def handle(self, *args, **options):
+        urls = options['url'] or ['/', '/about/']
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=options['profile'])
+        probe = PROBE.format(base_dir=str(settings.BASE_DIR), urls=urls)
+
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', probe],
+            capture_output=True, text=True, env=env, cwd=str(settings.BASE_DIR),
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Probe process failed:\n{result.stderr[-2000:]}')
+
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules, packages = self.parse_importtime(result.stderr)
+        import_ms = sum(self_us for self_us, _ in modules.values()) / 1000
+
+        self.stdout.write(f"Settings profile: {options['profile']}")
+        self.stdout.write(f"Modules imported: {len(modules)} in {import_ms:.1f} ms")
+
+        self.stdout.write(f"\nTop {options['top']} packages by import time (ms):")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}  {package}")
+
+        self.stdout.write(f"\nTop {options['top']} modules by cumulative import time (ms):")
+        ranked = sorted(modules.items(), key=lambda item: -item[1][1])[:options['top']]
+        for module, (self_us, cumulative_us) in ranked:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f}  (self {self_us / 1000:6.1f})  {module}")
+
+        self.stdout.write(f"\nStartup (get_wsgi_application): {report['startup_ms']:.1f} ms")
+        for request in report['first_requests']:
+            self.stdout.write(
+                f"First request {request['url']}: {request['ms']:.1f} ms "
+                f"({request['status']}, {request['bytes']} bytes)"
+            )
+
+        cold_start_ms = report['startup_ms'] + report['first_requests'][0]['ms']
+        self.stdout.write(f"Cold start (startup + first request): {cold_start_ms:.1f} ms")
+
+        budget = options['budget_ms']
+        if budget is not None:
+            if cold_start_ms > budget:
+                raise CommandError(f'Cold start {cold_start_ms:.1f} ms exceeds budget {budget:.0f} ms')
+            self.stdout.write(self.style.SUCCESS(f'Within budget of {budget:.0f} ms'))
+
+    def parse_importtime(self, stderr):
+        """
+        Parse `python -X importtime` output
+
+        Returns:
+            tuple: ({module: (self_us, cumulative_us)}, {top-level package: self_us})
+        """
+        modules = {}
+        packages = defaultdict(int)
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            name = name.strip()
+            modules[name] = (int(self_us), int(cumulative_us))
+            packages[name.split('.')[0]] += int(self_us)
+        return modules, packages
@@ -0,0 +1,63 @@
+import hmac
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+from ..utils.profiler import SamplingProfiler, build_profile, save_profile, format_summary
+
+
+@sync_and_async_middleware
+def ProfilerMiddleware(get_response):
+    """
+    Profile single requests on demand
+
+    A request is profiled when it carries PROFILER_TOKEN in the X-Profile
+    header or the ``profile`` query param. The profile is saved to
+    PROFILER_DIR (see `manage.py profiles`); with ``profile_mode=summary``
+    (or X-Profile-Mode: summary) a text report replaces the page.
+
+    Without PROFILER_TOKEN the middleware removes itself at startup.
+    """
+    token = settings.PROFILER_TOKEN
+    if not token:
+        raise MiddlewareNotUsed
+
+    def wants_profile(request):
+        given = request.headers.get('X-Profile') or request.GET.get('profile')
+        return bool(given) and hmac.compare_digest(given.encode(), token.encode())
+
+    def start():
+        profiler = SamplingProfiler(settings.PROFILER_INTERVAL)
+        profiler.start()
+        return profiler, time.perf_counter()
+
+    def finish(request, response, profiler, started):
+        wall_time = time.perf_counter() - started
+        profiler.stop()
+        profile = build_profile(request, response, profiler, wall_time)
+        name = save_profile(profile)
+
+        mode = request.headers.get('X-Profile-Mode') or request.GET.get('profile_mode')
+        if mode == 'summary':
+            response = HttpResponse(format_summary(profile), content_type='text/plain; charset=utf-8')
+        response['Cache-Control'] = 'private, no-store'
+        if name:
+            response['X-Profile-Name'] = name
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not wants_profile(request):
+                return await get_response(request)
+            profiler, started = start()
+            return finish(request, await get_response(request), profiler, started)
+    else:
+        def middleware(request):
+            if not wants_profile(request):
+                return get_response(request)
+            profiler, started = start()
+            return finish(request, get_response(request), profiler, started)
+    return middleware
@@ -0,0 +1,28 @@
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+from ..utils.tracing import trace
+
+
+@sync_and_async_middleware
+def TracingMiddleware(get_response):
+    """
+    Run every request inside a trace with a root 'view' span
+
+    The trace ID is returned in the X-Trace-Id header so a slow or failed
+    page can be matched with its log lines and exported spans.
+    """
+    def finish(request, root, response):
+        match = request.resolver_match
+        root.set(status=response.status_code, route=match.url_name if match else None)
+        response['X-Trace-Id'] = root.trace_id
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with trace('view', method=request.method, path=request.path) as root:
+                return finish(request, root, await get_response(request))
+    else:
+        def middleware(request):
+            with trace('view', method=request.method, path=request.path) as root:
+                return finish(request, root, get_response(request))
+    return middleware
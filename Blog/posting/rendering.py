@@ -0,0 +1,28 @@
+"""
+Template rendering
+Render storefront templates with the configured engine inside 'render' spans
+
+Pages, streamed homepage sections and HTML fragments all go through these, so
+traces show template time wherever HTML is produced.
+"""
+from django.conf import settings
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from .utils.tracing import span
+
+
+def render_page(request, template_name, context):
+    """
+    render() inside a 'render' trace span, with the storefront template engine
+    """
+    with span('render', template=template_name):
+        return render(request, template_name, context, using=settings.STOREFRONT_TEMPLATE_ENGINE)
+
+
+def render_fragment(request, template_name, context):
+    """
+    render_to_string() inside a 'render' trace span, with the storefront
+    template engine
+    """
+    with span('render', template=template_name):
+        return render_to_string(template_name, context, request, using=settings.STOREFRONT_TEMPLATE_ENGINE)
@@ -0,0 +1,12 @@
+"""
+Signals for posting app
+"""
+from django.dispatch import Signal
+
+# Sent when a process sees a new Shopee catalog version. Receivers get
+# ``diff`` (see utils.catalog_diff.diff_catalogs, possibly empty when only shop
+# status changed) plus the ``old`` (None for the first catalog) and ``new``
+# snapshot payloads, and invalidate only what they derived from the items or
+# windows in the diff. The sender is utils.catalog.refresh_shopee_catalog in
+# the process that saved the version, observe_catalog in the others.
+catalog_changed = Signal()
@@ -0,0 +1,159 @@
+"""
+Streaming homepage
+Flush the page shell at once, then each data section as its data arrives
+
+The homepage template is rendered with ``stream_slots``, which puts a marker
+where the product grid and Instagram section go. Everything before the first
+marker (head, CSS, navigation, hero) is sent immediately so the browser starts
+loading assets while Shopee and Instagram are still being fetched. The
+sections are rendered from the same partials the regular view includes.
+
+The Cache-Control header is sent with the shell, before the data is known to
+be good, so streamed pages get the short 'stream' cache policy.
+
+Under WSGI the response iterates a plain generator that fetches through a
+small thread pool (Django would buffer an async iterator before sending it);
+under ASGI it is an async generator. Either runs after the view returned, so
+fetches and renders re-enter the view's contextvars to stay in its trace.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.safestring import mark_safe
+from .rendering import render_fragment
+from .utils.catalog import get_products, aget_products, get_instagram_feed, aget_instagram_feed
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAM_SLOTS = {
+    'products': mark_safe('<!--stream:products-->'),
+    'instagram': mark_safe('<!--stream:instagram-->'),
+}
+
+
+def render_shell(request):
+    """
+    Homepage split around the data sections
+
+    Returns:
+        list: [before products, between products and Instagram, after Instagram]
+    """
+    shell = render_fragment(request, 'posting/homepage.html', {
+        'stream_slots': STREAM_SLOTS,
+        'shopee_url': settings.SHOPEE_STORE_URL,
+        'instagram_url': settings.INSTAGRAM_PROFILE_URL,
+    })
+    head, rest = shell.split(STREAM_SLOTS['products'])
+    middle, tail = rest.split(STREAM_SLOTS['instagram'])
+    return [head, middle, tail]
+
+
+def render_products(request, shopee_data):
+    """
+    Product grid section, None data meaning the fetch failed
+    """
+    context = {'shopee_url': settings.SHOPEE_STORE_URL}
+    if shopee_data is None:
+        context.update({
+            'products': [],
+            'has_products': False,
+            'error': 'Mohon maaf, terjadi kesalahan saat memuat data.',
+        })
+    else:
+        products = shopee_data.get('products', [])
+        context.update({
+            'products': products[:8],  # Show only 8 on homepage
+            'has_products': len(products) > 0,
+            'shopee_error': shopee_data.get('error'),
+        })
+    return render_fragment(request, 'posting/partials/home_products.html', context)
+
+
+def render_instagram(request, instagram_data):
+    """
+    Instagram section, None data meaning the fetch failed
+    """
+    instagram_posts = instagram_data.get('media', []) if instagram_data else []
+    return render_fragment(request, 'posting/partials/home_instagram.html', {
+        'instagram_posts': instagram_posts,
+        'has_instagram': len(instagram_posts) > 0,
+    })
+
+
+def outcome(future):
+    """
+    Result of a fetch, None (logged) if it raised
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f"Error in homepage view: {e}")
+        return None
+
+
+async def aoutcome(task):
+    """
+    Async version of outcome
+    """
+    try:
+        return await task
+    except Exception as e:
+        logger.error(f"Error in homepage view: {e}")
+        return None
+
+
+def iter_homepage(request, shell, context):
+    """
+    Homepage chunks for WSGI, fetching both sources in parallel threads
+
+    Args:
+        context: contextvars of the view; a context can only be entered by
+                 one thread at a time, so each fetch runs in its own copy
+    """
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='homepage') as pool:
+        products = pool.submit(context.copy().run, get_products, limit=12)
+        instagram = pool.submit(context.copy().run, get_instagram_feed, limit=6)
+        yield shell[0]
+        yield context.run(render_products, request, outcome(products))
+        yield shell[1]
+        yield context.run(render_instagram, request, outcome(instagram))
+        yield shell[2]
+
+
+async def aiter_homepage(request, shell, context):
+    """
+    Homepage chunks for ASGI (see iter_homepage)
+    """
+    # Tasks copy the context they are created in
+    products = context.run(asyncio.ensure_future, aget_products(limit=12))
+    instagram = context.run(asyncio.ensure_future, aget_instagram_feed(limit=6))
+    try:
+        yield shell[0]
+        yield context.run(render_products, request, await aoutcome(products))
+        yield shell[1]
+        yield context.run(render_instagram, request, await aoutcome(instagram))
+        yield shell[2]
+    finally:
+        # Client went away before the end
+        products.cancel()
+        instagram.cancel()
+
+
+def stream_homepage(request):
+    """
+    Streaming response for the homepage
+    """
+    shell = render_shell(request)
+    context = contextvars.copy_context()
+    if isinstance(request, ASGIRequest):
+        chunks = aiter_homepage(request, shell, context)
+    else:
+        chunks = iter_homepage(request, shell, context)
+    response = StreamingHttpResponse(chunks, content_type='text/html; charset=utf-8')
+    # The sections may still turn out stale or fallback
+    response.cache_policy = 'stream'
+    return response
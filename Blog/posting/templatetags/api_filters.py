@@ -3,6 +3,8 @@ Custom template tags for Model Manis
 """
 from django import template
 from django.conf import settings
+from django.utils.html import format_html
+from ..utils.card_cache import render_card
 
 register = template.Library()
 
@@ -102,13 +104,27 @@ def rating_stars(rating):
         return "☆☆☆☆☆"
 
 
-@register.inclusion_tag('posting/components/product_card.html')
-def product_card(product):
+@register.simple_tag
+def image_placeholder(placeholder):
+    """
+    Size and inline preview attributes of a card image
+    Usage: <img src="..." {% image_placeholder product.placeholder %}>
+    """
+    if not placeholder:
+        return ''
+    return format_html(
+        'width="{}" height="{}" style="background: {} url({}) center / cover no-repeat"',
+        placeholder['width'], placeholder['height'], placeholder['color'], placeholder['lqip'],
+    )
+
+
+@register.simple_tag
+def product_card(product, variant='grid'):
     """
-    Render product card component
-    Usage: {% product_card product %}
+    Render product card component, cached per product (see utils/card_cache.py)
+    Usage: {% product_card product 'list' %}
     """
-    return {'product': product}
+    return render_card(product, variant)
 
 
 @register.filter(name='instagram_type_icon')
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+
+def catalog_payload(count, version='v1'):
+    products = [{'itemid': 100 + i, 'name': f'Gamis {i}', 'price': 100.0} for i in range(count)]
+    return {'version': version, 'fetched_at': 0, 'data': {'products': products, 'total': count}}
+
+
+@override_settings(TRACE_SAMPLE_RATE=0)
+class ProductsApiTests(SimpleTestCase):
+
+    def get(self, payload, **params):
+        with mock.patch('posting.api_views.get_catalog', return_value=payload):
+            return self.client.get('/api/products', params)
+
+    def test_cursor_walks_the_catalog(self):
+        payload = catalog_payload(5, version='cursor')
+        seen = []
+        params = {'limit': 2}
+        while True:
+            data = self.get(payload, **params).json()
+            seen += [product['itemid'] for product in data['products']]
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(seen, [100, 101, 102, 103, 104])
+
+    def test_cursor_survives_new_products(self):
+        first = self.get(catalog_payload(5, version='before'), limit=2).json()
+        grown = catalog_payload(5, version='after')
+        grown['data']['products'].insert(0, {'itemid': 1, 'name': 'New', 'price': 1.0})
+        data = self.get(grown, limit=2, cursor=first['next_cursor']).json()
+        self.assertEqual([product['itemid'] for product in data['products']], [102, 103])
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage!', 'OTk5'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.get(catalog_payload(3), cursor=cursor).status_code, 400)
+
+    def test_etag_revalidation(self):
+        payload = catalog_payload(3, version='etag')
+        response = self.get(payload)
+        etag = response['ETag']
+        with mock.patch('posting.api_views.get_catalog', return_value=payload):
+            cached = self.client.get('/api/products', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+        # A new version is a new body
+        self.assertNotEqual(self.get(catalog_payload(4, version='etag2'))['ETag'], etag)
+
+    def test_no_catalog(self):
+        self.assertEqual(self.get(None).status_code, 503)
+
+
+@override_settings(TRACE_SAMPLE_RATE=0)
+class InstagramApiTests(SimpleTestCase):
+
+    def test_served_from_the_snapshot_without_syncing(self):
+        payload = {'version': 'ig', 'fetched_at': 0,
+                   'data': {'media': [{'id': str(i)} for i in range(3)], 'after': None, 'complete': True}}
+        with mock.patch('posting.utils.catalog.load_snapshot', return_value=payload), \
+                mock.patch('posting.utils.instagram_api.sync_instagram_feed') as sync:
+            data = self.client.get('/api/instagram', {'limit': 2}).json()
+        sync.assert_not_called()
+        self.assertEqual([item['id'] for item in data['media']], ['0', '1'])
+
+
+@override_settings(TRACE_SAMPLE_RATE=0, STATUS_TOKEN='secret')
+class StatusApiTests(SimpleTestCase):
+
+    def test_liveness_only_without_token(self):
+        for headers in ({}, {'HTTP_X_STATUS_TOKEN': 'wrong'}, {'HTTP_X_STATUS_TOKEN': 'é'}):
+            with self.subTest(headers=headers):
+                response = self.client.get('/api/status', **headers)
+                self.assertEqual(response.json(), {'ok': True})
+                self.assertEqual(response['Cache-Control'], 'private, no-store')
+
+    def test_counters_with_token(self):
+        data = self.client.get('/api/status', HTTP_X_STATUS_TOKEN='secret').json()
+        self.assertTrue({'bulkheads', 'upstreams', 'cards', 'prefetch', 'shops'} <= set(data))
+
+    @override_settings(STATUS_TOKEN='')
+    def test_no_token_configured(self):
+        self.assertEqual(self.client.get('/api/status', HTTP_X_STATUS_TOKEN='').json(), {'ok': True})
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from posting.utils.bulkhead import Bulkhead, BulkheadFull
+
+
+class BulkheadTests(SimpleTestCase):
+
+    def test_full_bulkhead_rejects_after_queue_timeout(self):
+        bulkhead = Bulkhead('test', limit=1, queue_timeout=0.05)
+        with bulkhead.slot():
+            started = time.monotonic()
+            with self.assertRaises(BulkheadFull):
+                with bulkhead.slot():
+                    pass
+            self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        stats = bulkhead.stats()
+        self.assertEqual((stats['active'], stats['queued'], stats['rejected'], stats['completed']), (0, 0, 1, 1))
+
+    def test_waiter_gets_a_released_slot(self):
+        bulkhead = Bulkhead('test', limit=1, queue_timeout=1)
+        entered = threading.Event()
+
+        def hold():
+            with bulkhead.slot():
+                entered.set()
+                time.sleep(0.05)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        entered.wait()
+        with bulkhead.slot():
+            self.assertEqual(bulkhead.stats()['active'], 1)
+        holder.join()
+        self.assertEqual(bulkhead.stats()['rejected'], 0)
+
+    def test_async_slot_times_out_without_blocking_the_loop(self):
+        bulkhead = Bulkhead('test', limit=1, queue_timeout=0.05)
+
+        async def main():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            ticker = asyncio.ensure_future(tick())
+            try:
+                async with bulkhead.aslot():
+                    with self.assertRaises(BulkheadFull):
+                        async with bulkhead.aslot():
+                            pass
+            finally:
+                ticker.cancel()
+            return ticks
+
+        self.assertGreater(asyncio.run(main()), 3)
+        self.assertEqual(bulkhead.stats()['rejected'], 1)
+
+    def test_try_slot_never_waits(self):
+        bulkhead = Bulkhead('test', limit=1, queue_timeout=10)
+        self.assertTrue(bulkhead.try_slot())
+        started = time.monotonic()
+        self.assertFalse(bulkhead.try_slot())
+        self.assertLess(time.monotonic() - started, 0.01)
+        bulkhead.release_slot()
+        self.assertEqual(bulkhead.stats()['active'], 0)
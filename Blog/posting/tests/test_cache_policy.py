@@ -0,0 +1,83 @@
+import asyncio
+from unittest import mock
+
+from django.http import HttpResponse, HttpResponseNotFound, HttpResponseRedirect
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from posting.cache_policy import build_cache_control, cache_policy
+
+POLICIES = {
+    'catalog': {'s_maxage': 300, 'stale_while_revalidate': 600, 'stale_if_error': 86400,
+                'vary': ['Accept-Encoding']},
+    'degraded': {'s_maxage': 30, 'stale_while_revalidate': 30},
+    'not_found': {'s_maxage': 60},
+    'long': {'s_maxage': 3600},
+}
+
+
+def request_for(path):
+    request = RequestFactory().get(path)
+    request.resolver_match = resolve(path)
+    return request
+
+
+@override_settings(CACHE_POLICIES=POLICIES, CACHE_POLICY_ROUTES={}, SURROGATE_KEY_HEADER='Surrogate-Key')
+class CachePolicyTests(SimpleTestCase):
+
+    def setUp(self):
+        patch = mock.patch('posting.cache_policy.current_version', return_value='abc123')
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def serve(self, response, path='/products/', keys=('catalog',)):
+        view = cache_policy('catalog', keys=keys)(lambda request: response)
+        return view(request_for(path))
+
+    def test_headers(self):
+        response = self.serve(HttpResponse('page'))
+        self.assertEqual(response['Cache-Control'],
+                         'public, max-age=0, s-maxage=300, stale-while-revalidate=600, stale-if-error=86400')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Surrogate-Key'], 'page-product_list catalog catalog-abc123')
+
+    def test_async_view(self):
+        async def view(request):
+            return HttpResponse('page')
+
+        response = asyncio.run(cache_policy('catalog')(view)(request_for('/products/')))
+        self.assertIn('s-maxage=300', response['Cache-Control'])
+
+    def test_vary_is_added_to_existing_values(self):
+        response = HttpResponse('page')
+        response['Vary'] = 'Cookie'
+        self.assertEqual(self.serve(response)['Vary'], 'Cookie, Accept-Encoding')
+
+    def test_degraded_response(self):
+        response = HttpResponse('fallback')
+        response.cache_policy = 'degraded'
+        response = self.serve(response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, s-maxage=30, stale-while-revalidate=30')
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_not_found(self):
+        self.assertIn('s-maxage=60', self.serve(HttpResponseNotFound())['Cache-Control'])
+
+    def test_route_override(self):
+        with override_settings(CACHE_POLICY_ROUTES={'product_list': 'long'}):
+            self.assertIn('s-maxage=3600', self.serve(HttpResponse())['Cache-Control'])
+
+    def test_view_headers_and_other_statuses_are_left_alone(self):
+        response = HttpResponse()
+        response['Cache-Control'] = 'private, no-store'
+        self.assertEqual(self.serve(response)['Cache-Control'], 'private, no-store')
+        self.assertFalse(self.serve(HttpResponseRedirect('/')).has_header('Cache-Control'))
+        self.assertFalse(self.serve(HttpResponse(status=500)).has_header('Cache-Control'))
+
+    def test_unversioned_source(self):
+        with mock.patch('posting.cache_policy.current_version', return_value=None):
+            response = self.serve(HttpResponse(), keys=('catalog', 'instagram'))
+        self.assertEqual(response['Surrogate-Key'], 'page-product_list catalog instagram')
+
+    def test_build_cache_control_skips_missing_values(self):
+        self.assertEqual(build_cache_control({'max_age': 10}), 'public, max-age=10')
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from posting.utils import card_cache
+from posting.utils.card_cache import CardCache, get_card_cache_stats, render_card
+
+
+def product(**fields):
+    return dict({'itemid': 1, 'name': 'Gamis Syari', 'price': 100000.0, 'stock': 3, 'sold': 10,
+                 'image': 'https://cf.shopee.co.id/file/abc', 'url': 'https://shopee.co.id/p/1'}, **fields)
+
+
+@override_settings(CARD_CACHE_SIZE=100)
+class CardCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        patch = mock.patch.object(card_cache, '_cards', CardCache())
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def assert_counts(self, hits, misses):
+        stats = get_card_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (hits, misses))
+
+    def test_unchanged_product_is_rendered_once(self):
+        first = render_card(product())
+        self.assertIn('Gamis Syari', first)
+        self.assertEqual(render_card(product()), first)
+        self.assert_counts(hits=1, misses=1)
+        self.assertEqual(get_card_cache_stats()['hit_rate'], 0.5)
+
+    def test_displayed_fields_are_part_of_the_key(self):
+        render_card(product())
+        changed = render_card(product(name='Gamis Baru'))
+        self.assertIn('Gamis Baru', changed)
+        render_card(product(), variant='list')
+        render_card(product(placeholder={'width': 1, 'height': 1, 'color': '#000000', 'lqip': 'data:x'}))
+        self.assert_counts(hits=0, misses=4)
+
+    def test_other_fields_reuse_the_card(self):
+        render_card(product())
+        render_card(product(shop='second', description='not on the card'))
+        self.assert_counts(hits=1, misses=1)
+
+    def test_least_recently_used_card_is_evicted(self):
+        with override_settings(CARD_CACHE_SIZE=2):
+            for itemid in (1, 2, 1, 3):
+                render_card(product(itemid=itemid))
+            render_card(product(itemid=1))
+            render_card(product(itemid=2))
+        stats = get_card_cache_stats()
+        self.assertEqual((stats['size'], stats['evictions']), (2, 2))
+        self.assert_counts(hits=2, misses=4)
+
+    def test_template_change_empties_the_cache(self):
+        render_card(product())
+        card_cache._cards.use_template(object())
+        self.assertEqual(get_card_cache_stats()['size'], 0)
+        render_card(product())
+        self.assert_counts(hits=0, misses=2)
+
+    def test_disabled(self):
+        with override_settings(CARD_CACHE_SIZE=0):
+            self.assertIn('Gamis Syari', render_card(product()))
+        self.assertEqual(get_card_cache_stats()['size'], 0)
+
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+
+from posting.utils.catalog_diff import affected_offsets, diff_catalogs, has_changes
+
+
+def catalog(*itemids, **changes):
+    return [dict({'itemid': itemid, 'price': 10.0, 'stock': 5}, **changes.get(str(itemid), {}))
+            for itemid in itemids]
+
+
+class DiffCatalogsTests(SimpleTestCase):
+
+    def test_added_removed_changed(self):
+        diff = diff_catalogs(catalog(1, 2, 3), catalog(1, 3, 4, **{'3': {'stock': 0}}))
+        self.assertEqual(diff['added'], [4])
+        self.assertEqual(diff['removed'], [2])
+        self.assertEqual(diff['changed'], {3: ['stock']})
+        self.assertEqual((diff['old_ids'], diff['new_ids']), ([1, 2, 3], [1, 3, 4]))
+
+    def test_new_fields_count_as_changes(self):
+        diff = diff_catalogs(catalog(1), catalog(1, **{'1': {'placeholder': {'width': 1}}}))
+        self.assertEqual(diff['changed'], {1: ['placeholder']})
+
+    def test_unchanged(self):
+        diff = diff_catalogs(catalog(1, 2), catalog(1, 2))
+        self.assertFalse(has_changes(diff))
+
+    def test_reorder_is_a_change(self):
+        diff = diff_catalogs(catalog(1, 2), catalog(2, 1))
+        self.assertEqual((diff['added'], diff['removed'], diff['changed']), ([], [], {}))
+        self.assertTrue(has_changes(diff))
+
+
+class AffectedOffsetsTests(SimpleTestCase):
+
+    def test_changed_item_touches_its_window_only(self):
+        diff = diff_catalogs(catalog(*range(10)), catalog(*range(10), **{'6': {'price': 9.0}}))
+        self.assertEqual(affected_offsets(diff, 3), {6})
+
+    def test_removal_shifts_every_later_window(self):
+        diff = diff_catalogs(catalog(*range(10)), catalog(*range(10))[:4] + catalog(*range(5, 10)))
+        self.assertEqual(affected_offsets(diff, 3), {3, 6, 9})
+
+    def test_growth_adds_a_window(self):
+        diff = diff_catalogs(catalog(*range(6)), catalog(*range(7)))
+        self.assertEqual(affected_offsets(diff, 3), {6})
+
+    def test_no_change(self):
+        diff = diff_catalogs(catalog(*range(6)), catalog(*range(6)))
+        self.assertEqual(affected_offsets(diff, 3), set())
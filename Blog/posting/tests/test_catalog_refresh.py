@@ -0,0 +1,125 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from posting.signals import catalog_changed
+from posting.utils import catalog
+from posting.utils.catalog import SHOPEE_SNAPSHOT, refresh_shopee_catalog
+from posting.utils.related import RELATED_SNAPSHOT
+from posting.utils.snapshot import load_snapshot, snapshot_age, snapshot_path
+
+SHOPS = [{'username': 'main', 'shopid': '1'}, {'username': 'second', 'shopid': '2'}]
+
+
+def product(itemid, shop='main', price=100.0):
+    return {'itemid': itemid, 'name': f'Gamis {itemid}', 'price': price, 'shop': shop,
+            'image': f'https://cf.shopee.co.id/file/{itemid}'}
+
+
+def crawl_result(shopid, products):
+    stats = {'pages': 1, 'bytes': 100, 'wall_time': 0.1, 'throttle_wait': 0.0, 'duplicates': 0}
+    return {'shopid': shopid, 'products': products, 'total': len(products), 'stats': stats}
+
+
+class CatalogRefreshTestCase(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(CATALOG_SNAPSHOT_DIR=directory.name, SHOPEE_SHOPS=SHOPS,
+                                      IMAGE_PLACEHOLDERS=False, RELATED_K=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patch = mock.patch.object(catalog, '_observed', None)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.signals = []
+        receiver = lambda sender, **kwargs: self.signals.append((sender, kwargs['diff']))  # noqa: E731
+        catalog_changed.connect(receiver, weak=False)
+        self.addCleanup(catalog_changed.disconnect, receiver)
+
+    def refresh(self, results):
+        with mock.patch.object(catalog, 'crawl_shopee_shops', return_value=results):
+            return refresh_shopee_catalog()
+
+
+class RefreshShopeeCatalogTests(CatalogRefreshTestCase):
+
+    def results(self, *main):
+        return {'main': crawl_result('1', list(main)), 'second': crawl_result('2', [product(9, 'second')])}
+
+    def test_first_catalog_is_saved_with_related_products(self):
+        payload = self.refresh(self.results(product(1), product(2)))
+        self.assertEqual([item['itemid'] for item in payload['data']['products']], [1, 2, 9])
+        self.assertEqual(load_snapshot(RELATED_SNAPSHOT)['data']['catalog_version'], payload['version'])
+        self.assertEqual([sender for sender, _ in self.signals], [refresh_shopee_catalog])
+
+    def test_unchanged_catalog_is_only_touched(self):
+        first = self.refresh(self.results(product(1), product(2)))
+        mtime = os.stat(snapshot_path(SHOPEE_SNAPSHOT)).st_mtime_ns
+        related_mtime = os.stat(snapshot_path(RELATED_SNAPSHOT)).st_mtime_ns
+        self.signals.clear()
+
+        with mock.patch.object(catalog, 'add_placeholders') as measure, \
+                mock.patch.object(catalog, 'refresh_related') as related, \
+                mock.patch('time.time', return_value=time.time() + 600):
+            payload = self.refresh(self.results(product(1), product(2)))
+            age = snapshot_age(load_snapshot(SHOPEE_SNAPSHOT))
+
+        self.assertEqual(payload['version'], first['version'])
+        self.assertEqual(os.stat(snapshot_path(SHOPEE_SNAPSHOT)).st_mtime_ns, mtime)
+        self.assertEqual(os.stat(snapshot_path(RELATED_SNAPSHOT)).st_mtime_ns, related_mtime)
+        measure.assert_not_called()
+        related.assert_not_called()
+        self.assertEqual(self.signals, [])
+        # Confirmed current: the age restarts although the file was not rewritten
+        self.assertLess(age, 5)
+
+    def test_changed_catalog_recomputes_related_products(self):
+        self.refresh(self.results(product(1), product(2)))
+        self.signals.clear()
+        payload = self.refresh(self.results(product(1), product(2, price=90.0)))
+        self.assertEqual(load_snapshot(RELATED_SNAPSHOT)['data']['catalog_version'], payload['version'])
+        sender, diff = self.signals[0]
+        self.assertIs(sender, refresh_shopee_catalog)
+        self.assertEqual(diff['changed'], {2: ['price']})
+
+    def test_workers_do_not_recompute_related_products(self):
+        payload = self.refresh(self.results(product(1)))
+        with mock.patch.object(catalog, 'refresh_related') as related:
+            catalog.observe_catalog(dict(payload, version='other'))
+        related.assert_not_called()
+
+
+class MultiShopMergeTests(CatalogRefreshTestCase):
+
+    def test_shops_are_merged_in_order_without_duplicates(self):
+        payload = self.refresh({
+            'second': crawl_result('2', [product(3, 'second'), product(1, 'second')]),
+            'main': crawl_result('1', [product(1), product(2)]),
+        })
+        products = payload['data']['products']
+        self.assertEqual([(item['itemid'], item['shop']) for item in products],
+                         [(1, 'main'), (2, 'main'), (3, 'second')])
+        self.assertEqual(payload['data']['shops'], {'main': {'shopid': '1', 'total': 2},
+                                                    'second': {'shopid': '2', 'total': 2}})
+
+    def test_failed_shop_keeps_its_previous_products(self):
+        self.refresh({'main': crawl_result('1', [product(1)]),
+                      'second': crawl_result('2', [product(9, 'second')])})
+        payload = self.refresh({'main': crawl_result('1', [product(1), product(2)]),
+                                'second': {'error': 'blocked'}})
+        self.assertEqual([item['itemid'] for item in payload['data']['products']], [1, 2, 9])
+        self.assertEqual(payload['data']['shops']['second'], {'total': 1, 'error': 'blocked'})
+        self.assertEqual(load_snapshot(SHOPEE_SNAPSHOT)['version'], payload['version'])
+
+    def test_every_shop_failing_keeps_the_snapshot(self):
+        first = self.refresh({'main': crawl_result('1', [product(1)]),
+                              'second': crawl_result('2', [product(9, 'second')])})
+        with self.assertRaisesMessage(catalog.RefreshError, 'main: down; second: blocked'):
+            self.refresh({'main': {'error': 'down'}, 'second': {'error': 'blocked'}})
+        self.assertEqual(load_snapshot(SHOPEE_SNAPSHOT)['version'], first['version'])
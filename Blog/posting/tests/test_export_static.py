@@ -0,0 +1,136 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from posting.management.commands import export_static
+from posting.utils.catalog import PRODUCTS_PER_PAGE, SHOPEE_SNAPSHOT
+from posting.utils.snapshot import save_snapshot
+
+
+class InlinePool:
+    """
+    ProcessPoolExecutor stand-in rendering in the test process
+    """
+
+    def __init__(self, max_workers, initializer, initargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, iterable, chunksize=1):
+        return map(fn, iterable)
+
+
+def catalog_data(total):
+    products = [{'itemid': i, 'name': f'Gamis {i}', 'price': 100.0} for i in range(total)]
+    return {'products': products, 'total': total}
+
+
+class ExportStaticTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = os.path.join(directory.name, 'export')
+        overrides = override_settings(CATALOG_SNAPSHOT_DIR=os.path.join(directory.name, 'snapshots'))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        save_snapshot(SHOPEE_SNAPSHOT, catalog_data(PRODUCTS_PER_PAGE * 2))
+
+        self.rendered = []
+        self.failing = set()
+        for patch in (mock.patch.object(export_static, 'ProcessPoolExecutor', InlinePool),
+                      mock.patch.object(export_static, 'render_path', side_effect=self.render)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def render(self, path):
+        self.rendered.append(path)
+        if path in self.failing:
+            return path, 500, b''
+        return path, 200, f'page {path}'.encode()
+
+    def export(self):
+        self.rendered.clear()
+        call_command('export_static', '--output', self.output, stdout=io.StringIO())
+
+    def read(self, relative):
+        with open(os.path.join(self.output, relative)) as f:
+            return f.read()
+
+    def manifest(self):
+        with open(self.output + '.manifest.json') as f:
+            return json.load(f)
+
+    def test_pages_are_written(self):
+        self.export()
+        self.assertEqual(self.read('index.html'), 'page /')
+        self.assertEqual(self.read('products/index.html'), 'page /products/')
+        self.assertEqual(self.read('products/page/2/index.html'), 'page /products/page/2/')
+        self.assertEqual(self.read('sitemap.xml'), 'page /sitemap.xml')
+        self.assertEqual(set(self.manifest()), set(self.rendered))
+
+    def test_manifest_is_not_in_the_served_directory(self):
+        os.makedirs(self.output)
+        with open(os.path.join(self.output, export_static.OLD_MANIFEST), 'w') as f:
+            json.dump({}, f)
+        self.export()
+        served = [name for _, _, files in os.walk(self.output) for name in files]
+        self.assertFalse([name for name in served if 'manifest' in name])
+        self.assertTrue(os.path.exists(self.output + '.manifest.json'))
+
+    def test_only_changed_pages_are_rendered_again(self):
+        self.export()
+        self.export()
+        self.assertEqual(self.rendered, [])
+
+        data = catalog_data(PRODUCTS_PER_PAGE * 2)
+        data['products'][-1]['price'] = 90.0
+        save_snapshot(SHOPEE_SNAPSHOT, data)
+        self.export()
+        self.assertEqual(sorted(self.rendered), ['/products/page/2/', '/sitemap.xml'])
+
+    def test_removed_pages_are_deleted(self):
+        self.export()
+        save_snapshot(SHOPEE_SNAPSHOT, catalog_data(PRODUCTS_PER_PAGE))
+        self.export()
+        self.assertFalse(os.path.exists(os.path.join(self.output, 'products', 'page', '2', 'index.html')))
+        self.assertNotIn('/products/page/2/', self.manifest())
+
+    def test_failed_page_is_reported_and_retried(self):
+        self.failing.add('/contact/')
+        with self.assertRaisesMessage(CommandError, '/contact/ (500)'):
+            self.export()
+        self.assertNotIn('/contact/', self.manifest())
+
+        self.failing.clear()
+        self.export()
+        self.assertEqual(self.rendered, ['/contact/'])
+
+    def test_no_catalog_snapshot(self):
+        with override_settings(CATALOG_SNAPSHOT_DIR=os.path.join(self.output, 'empty')):
+            with self.assertRaises(CommandError):
+                self.export()
+
+
+@override_settings(SITE_URL='https://testserver', TRACE_SAMPLE_RATE=0)
+class RenderPathTests(SimpleTestCase):
+
+    def test_page_is_rendered_through_django(self):
+        path, status, body = export_static.render_path('/about/')
+        self.assertEqual((path, status), ('/about/', 200))
+        self.assertIn(b'</html>', body)
+
+    def test_output_paths(self):
+        self.assertEqual(export_static.output_file('export', '/products/'), os.path.join('export', 'products/index.html'))
+        self.assertEqual(export_static.output_file('export', '/sitemap.xml'), os.path.join('export', 'sitemap.xml'))
+        self.assertEqual(export_static.manifest_file('site/export/'), os.path.join('site', 'export.manifest.json'))
@@ -0,0 +1,38 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from posting.utils.catalog import PRODUCTS_PER_PAGE
+from .test_views import products_result
+
+
+@override_settings(STOREFRONT_TEMPLATE_ENGINE='django', TRACE_SAMPLE_RATE=0)
+class ProductsFragmentTests(SimpleTestCase):
+
+    def get(self, result, headers=None, **params):
+        fetch = mock.AsyncMock(return_value=result)
+        with mock.patch('posting.fragment_views.aget_products', fetch):
+            response = self.client.get('/fragments/products', params, **(headers or {}))
+        return response, fetch
+
+    def test_slice_of_the_catalog(self):
+        response, fetch = self.get(products_result(10, 4, 120), offset=10, limit=4)
+        self.assertEqual(response.status_code, 200)
+        fetch.assert_awaited_once_with(limit=4, offset=10)
+        self.assertContains(response, 'Gamis 13')
+        self.assertIn('s-maxage=300', response['Cache-Control'])
+
+    def test_params_are_clamped(self):
+        _, fetch = self.get(products_result(0, 8, 120), offset='-5', limit='1000')
+        fetch.assert_awaited_once_with(limit=PRODUCTS_PER_PAGE, offset=0)
+        _, fetch = self.get(products_result(0, 8, 120), offset='x', limit='x')
+        fetch.assert_awaited_once_with(limit=8, offset=0)
+
+    def test_etag_revalidation(self):
+        response, _ = self.get(products_result(0, 8, 120))
+        cached, _ = self.get(products_result(0, 8, 120), {'HTTP_IF_NONE_MATCH': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_fallback_data_is_degraded(self):
+        response, _ = self.get(products_result(0, 3, 3, error='timeout'))
+        self.assertIn('s-maxage=30', response['Cache-Control'])
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from email.utils import formatdate
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from posting.utils import hedging
+from posting.utils.bulkhead import Bulkhead
+from posting.utils.hedging import UpstreamTracker, ahedged, hedged, parse_retry_after, should_retry
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, retry_after=None, name=''):
+        self.status_code = status_code
+        self.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+        self.name = name
+
+    def close(self):
+        pass
+
+
+class ParseRetryAfterTests(SimpleTestCase):
+
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after('2'), 2.0)
+        self.assertEqual(parse_retry_after('0.5'), 0.5)
+        self.assertEqual(parse_retry_after('-3'), 0.0)
+
+    def test_http_date(self):
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+        self.assertEqual(parse_retry_after(formatdate(time.time() - 30, usegmt=True)), 0.0)
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after(''))
+        self.assertIsNone(parse_retry_after('soon'))
+
+
+@override_settings(UPSTREAM_HEDGING={'test': {'max_retries': 2, 'backoff': 0.25, 'max_wait': 2.0}})
+class ShouldRetryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tracker = UpstreamTracker('test')
+
+    def test_success_and_client_errors_are_returned(self):
+        self.assertIsNone(should_retry(self.tracker, FakeResponse(200), 0))
+        self.assertIsNone(should_retry(self.tracker, FakeResponse(404), 0))
+
+    def test_backoff_with_jitter(self):
+        for retry in (0, 1):
+            delay = should_retry(self.tracker, FakeResponse(503), retry)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, 0.25 * 2 ** retry)
+        self.assertEqual((self.tracker.retries, self.tracker.retry_after), (2, 0))
+
+    def test_retry_after_header(self):
+        self.assertEqual(should_retry(self.tracker, FakeResponse(429, '1.5'), 0), 1.5)
+        self.assertEqual(self.tracker.retry_after, 1)
+
+    def test_gives_up_on_long_waits(self):
+        self.assertIsNone(should_retry(self.tracker, FakeResponse(429, '30'), 0))
+        self.assertEqual((self.tracker.gave_up, self.tracker.retries), (1, 0))
+
+    def test_max_retries(self):
+        self.assertIsNone(should_retry(self.tracker, FakeResponse(503), 2))
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+@override_settings(
+    UPSTREAM_HEDGING={'test': {'budget': 0.5, 'min_delay': 0.05, 'percentile': 95}},
+    UPSTREAM_BULKHEADS={'test': {'limit': 1, 'queue_timeout': 0.1}},
+)
+class HedgedTests(SimpleTestCase):
+    """
+    First attempt slow (blocked until released), the hedge answers at once
+    """
+
+    def setUp(self):
+        self.tracker = UpstreamTracker('test')
+        for _ in range(hedging.MIN_SAMPLES):
+            self.tracker.record(0.01)
+        self.tracker.count(requests=1)
+        self.bulkhead = Bulkhead('test', 1, 0.1)
+        patch = mock.patch.object(hedging, 'get_bulkhead', return_value=self.bulkhead)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.release_first = threading.Event()
+        self.addCleanup(self.release_first.set)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send(self):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            self.release_first.wait(2)
+            return FakeResponse(200, name='first')
+        return FakeResponse(200, name='hedge')
+
+    def test_hedge_fires_after_the_delay_and_wins(self):
+        started = time.monotonic()
+        response = hedged(self.tracker, self.send)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(response.name, 'hedge')
+        self.assertEqual((self.tracker.attempts, self.tracker.hedges, self.tracker.hedge_wins), (2, 1, 1))
+
+    def test_fast_first_attempt_sends_no_hedge(self):
+        self.release_first.set()
+        self.assertEqual(hedged(self.tracker, self.send).name, 'first')
+        self.assertEqual((self.tracker.attempts, self.tracker.hedges), (1, 0))
+
+    def test_slot_released_after_both_attempts(self):
+        hedged(self.tracker, self.send)
+        # The slow first attempt still runs: the hedge's slot stays taken
+        self.assertEqual(self.bulkhead.stats()['active'], 1)
+        self.release_first.set()
+        self.assertTrue(wait_until(lambda: self.bulkhead.stats()['active'] == 0))
+
+    def test_budget_caps_hedges(self):
+        # One hedge for one request is the whole 50% budget
+        self.tracker.count(hedges=1)
+        threading.Timer(0.1, self.release_first.set).start()
+        self.assertEqual(hedged(self.tracker, self.send).name, 'first')
+        self.assertEqual((self.tracker.attempts, self.tracker.hedges), (1, 1))
+
+    def test_full_bulkhead_skips_the_hedge(self):
+        self.bulkhead.try_slot()
+        threading.Timer(0.1, self.release_first.set).start()
+        self.assertEqual(hedged(self.tracker, self.send).name, 'first')
+        self.assertEqual((self.tracker.hedges, self.tracker.hedges_skipped), (0, 1))
+
+    def test_throttle_wait_is_not_latency(self):
+        tracker = UpstreamTracker('test')
+        throttled = []
+
+        def throttle():
+            throttled.append(1)
+            time.sleep(0.1)
+
+        hedged(tracker, lambda: FakeResponse(200), throttle)
+        self.assertEqual(len(throttled), 1)
+        self.assertLess(tracker.percentile(50), 0.05)
+
+    def test_async_hedge_wins_and_cancels_the_first(self):
+        cancelled = []
+
+        async def send():
+            self.calls += 1
+            if self.calls == 1:
+                try:
+                    await asyncio.sleep(2)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+                return FakeResponse(200, name='first')
+            return FakeResponse(200, name='hedge')
+
+        response = asyncio.run(ahedged(self.tracker, send))
+        self.assertEqual(response.name, 'hedge')
+        self.assertEqual(cancelled, [True])
+        self.assertEqual((self.tracker.hedges, self.tracker.hedge_wins), (1, 1))
+        self.assertEqual(self.bulkhead.stats()['active'], 0)
+
+    def test_async_budget_caps_hedges(self):
+        self.tracker.count(hedges=1)
+
+        async def send():
+            await asyncio.sleep(0.1)
+            return FakeResponse(200)
+
+        asyncio.run(ahedged(self.tracker, send))
+        self.assertEqual((self.tracker.attempts, self.tracker.hedges), (1, 1))
@@ -0,0 +1,147 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from posting.utils import instagram_api
+from posting.utils.instagram_api import sync_steps
+
+
+def post(number, caption='', url=None):
+    return {
+        'id': str(number),
+        'caption': caption,
+        'media_type': 'IMAGE',
+        'media_url': url or f'https://cdn.example/{number}.jpg?oe=old',
+        'permalink': f'https://instagram.example/p/{number}/',
+        'timestamp': f'2026-10-{number:02d}T10:00:00+0000',
+    }
+
+
+class FakeInstagram:
+    """
+    Newest-first media history served in pages of INSTAGRAM_PAGE_SIZE
+    """
+
+    def __init__(self, posts, page_size=2):
+        self.posts = sorted(posts, key=lambda media: media['timestamp'], reverse=True)
+        self.page_size = page_size
+        self.requests = []
+
+    def page(self, url, params):
+        self.requests.append(params.get('after'))
+        start = int(params.get('after') or 0)
+        end = start + self.page_size
+        after = str(end) if end < len(self.posts) else None
+        return [dict(media) for media in self.posts[start:end]], after
+
+    async def apage(self, client, url, params):
+        return self.page(url, params)
+
+
+def run_steps(feed, upstream, limit):
+    steps = sync_steps(feed, 'token', limit)
+    try:
+        request = next(steps)
+        while True:
+            request = steps.send(upstream.page(*request))
+    except StopIteration as done:
+        return done.value
+
+
+def stored_feed(posts, after=None, complete=False):
+    return {'media': list(reversed(posts)), 'after': after, 'complete': complete}
+
+
+@override_settings(INSTAGRAM_PAGE_SIZE=2, INSTAGRAM_SYNC_MAX_PAGES=10)
+class SyncStepsTests(SimpleTestCase):
+
+    def test_first_sync_backfills_to_limit(self):
+        upstream = FakeInstagram([post(n) for n in range(1, 8)])
+        feed, fresh = run_steps(stored_feed([]), upstream, 3)
+        self.assertEqual([media['id'] for media in feed['media']], ['7', '6', '5', '4'])
+        self.assertEqual(feed['after'], '4')
+        self.assertFalse(feed['complete'])
+        self.assertEqual(upstream.requests, [None, '2'])
+        self.assertEqual(len(fresh), 4)
+
+    def test_new_posts_are_prepended(self):
+        upstream = FakeInstagram([post(n) for n in range(1, 6)])
+        feed, fresh = run_steps(stored_feed([post(n) for n in range(1, 4)], after=None, complete=True), upstream, 2)
+        self.assertEqual([media['id'] for media in feed['media']], ['5', '4', '3', '2', '1'])
+        self.assertEqual([media['id'] for media in fresh], ['5', '4'])
+        self.assertTrue(feed['complete'])
+
+    def test_stops_at_first_page_of_stored_posts(self):
+        posts = [post(n) for n in range(1, 11)]
+        upstream = FakeInstagram(posts)
+        feed, fresh = run_steps(stored_feed(posts[:9], after='cursor'), upstream, 2)
+        # Page 1 holds the new post 10, page 2 only stored posts
+        self.assertEqual(upstream.requests, [None, '2'])
+        self.assertEqual([media['id'] for media in fresh], ['10'])
+        self.assertEqual(len(feed['media']), 10)
+        self.assertEqual(feed['after'], 'cursor')
+
+    def test_refreshes_stored_posts(self):
+        stored = [post(n) for n in range(1, 5)]
+        upstream = FakeInstagram([
+            post(1), post(2), post(3, caption='edited'), post(4, url='https://cdn.example/4.jpg?oe=new'),
+        ])
+        feed, fresh = run_steps(stored_feed(stored, complete=True), upstream, 2)
+        by_id = {media['id']: media for media in feed['media']}
+        self.assertEqual(by_id['3']['caption'], 'edited')
+        self.assertEqual(by_id['4']['media_url'], 'https://cdn.example/4.jpg?oe=new')
+        self.assertEqual(fresh, [])
+
+    def test_mirrored_posts_keep_local_urls(self):
+        mirrored = dict(post(2), media_url='/media/instagram/abc.jpg', remote_media_url='old')
+        upstream = FakeInstagram([post(1), post(2, url='https://cdn.example/2.jpg?oe=new')])
+        with override_settings(INSTAGRAM_MIRROR_URL='/media/instagram/'):
+            feed, _ = run_steps(stored_feed([post(1), mirrored], complete=True), upstream, 2)
+        self.assertEqual(feed['media'][0]['media_url'], '/media/instagram/abc.jpg')
+        self.assertEqual(feed['media'][0]['remote_media_url'], 'https://cdn.example/2.jpg?oe=new')
+
+    def test_drops_posts_deleted_inside_the_window(self):
+        stored = [post(n) for n in range(1, 7)]
+        # Post 5 was deleted on Instagram
+        upstream = FakeInstagram([post(n) for n in range(1, 7) if n != 5])
+        feed, _ = run_steps(stored_feed(stored, after='cursor'), upstream, 2)
+        ids = [media['id'] for media in feed['media']]
+        self.assertNotIn('5', ids)
+        # Older than the re-fetched window: kept untouched
+        self.assertIn('1', ids)
+
+    def test_drops_deleted_posts_from_a_complete_history(self):
+        stored = [post(n) for n in range(1, 4)]
+        upstream = FakeInstagram([post(1), post(3)])
+        feed, _ = run_steps(stored_feed(stored, complete=True), upstream, 2)
+        self.assertEqual([media['id'] for media in feed['media']], ['3', '1'])
+
+
+@override_settings(INSTAGRAM_PAGE_SIZE=2, INSTAGRAM_SYNC_MAX_PAGES=10,
+                   INSTAGRAM_MIRROR=False, IMAGE_PLACEHOLDERS=False)
+class SyncInstagramFeedTests(SimpleTestCase):
+
+    def setUp(self):
+        stored = {'data': stored_feed([post(1), post(2, caption='old')], complete=True)}
+        self.upstream = FakeInstagram([post(1), post(2, caption='new'), post(3)])
+        patches = [
+            mock.patch.object(instagram_api, 'load_snapshot', return_value=stored),
+            mock.patch.object(instagram_api, 'save_snapshot', side_effect=lambda name, data: {'data': data}),
+            mock.patch.object(instagram_api, 'get_media_page', side_effect=self.upstream.page),
+            mock.patch.object(instagram_api, 'aget_media_page', side_effect=self.upstream.apage),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def assert_synced(self, payload):
+        media = payload['data']['media']
+        self.assertEqual([item['id'] for item in media], ['3', '2', '1'])
+        self.assertEqual(media[1]['caption'], 'new')
+
+    def test_sync(self):
+        self.assert_synced(instagram_api.sync_instagram_feed('token', limit=2))
+
+    def test_async_sync(self):
+        self.assert_synced(async_to_sync(instagram_api.async_sync_instagram_feed)('token', limit=2))
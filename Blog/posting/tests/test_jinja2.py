@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posting.jinja2 import finalize
+
+# Names and captions with every character the two escapers treat differently
+PRODUCTS = [
+    {
+        'itemid': itemid,
+        'name': f'Gamis "Syar\'i" <Premium> & Co {itemid}',
+        'price': 125000.5 + itemid,
+        'stock': itemid % 3,
+        'sold': 1234 * itemid,
+        'image': f'https://cf.shopee.co.id/file/img{itemid}',
+        'url': f'https://shopee.co.id/product/1/{itemid}?a=1&b="2"',
+        'placeholder': {'width': 800, 'height': 600, 'color': '#c8643c', 'lqip': 'data:image/jpeg;base64,AAAA'},
+    }
+    for itemid in range(1, 6)
+]
+MEDIA = [
+    {
+        'id': str(post),
+        'caption': f'Koleksi "baru" <b>Raya</b> & it\'s {post}',
+        'media_type': 'IMAGE',
+        'media_url': f'https://example.com/{post}.jpg?x=1&y=2',
+        'permalink': f'https://instagram.com/p/{post}',
+    }
+    for post in range(4)
+]
+CONTEXT = {
+    'products': PRODUCTS,
+    'has_products': True,
+    'instagram_posts': MEDIA,
+    'has_instagram': True,
+    'media_items': MEDIA,
+    'has_media': True,
+    'has_token': True,
+    'shopee_url': 'https://shopee.co.id/modelmanis?ref="home"&x=1',
+    'instagram_url': 'https://instagram.com/modelmanis_rtl',
+    'profile_url': 'https://instagram.com/modelmanis_rtl',
+    'shopee_error': "Can't reach \"Shopee\"",
+    'page_number': 2,
+    'total_pages': 3,
+    'total_products': 130,
+    'has_previous': True,
+    'has_next': True,
+    'previous_page_url': '/products/',
+    'next_page_url': '/products/page/3/',
+}
+PAGES = [
+    'posting/homepage.html',
+    'posting/product_list.html',
+    'posting/instagram.html',
+    'posting/about_us.html',
+    'posting/contact.html',
+    'posting/partials/home_products.html',
+    'posting/partials/home_instagram.html',
+    'posting/partials/product_grid.html',
+]
+
+
+# Both engines, whichever STOREFRONT_TEMPLATE_ENGINE the settings picked
+BOTH_ENGINES = [
+    engine for engine in settings.TEMPLATES if engine is not settings.JINJA2_TEMPLATES
+] + [settings.JINJA2_TEMPLATES]
+
+
+@override_settings(TEMPLATES=BOTH_ENGINES)
+class JinjaParityTests(SimpleTestCase):
+    """
+    The Jinja2 storefront templates render the same HTML as the Django ones
+    """
+
+    def render(self, engine, template_name, context):
+        request = RequestFactory().get('/products/page/2/')
+        with override_settings(STOREFRONT_TEMPLATE_ENGINE=engine, CARD_CACHE_SIZE=0):
+            return render_to_string(template_name, context, request, using=engine)
+
+    def test_pages_render_identically(self):
+        for template_name in PAGES:
+            with self.subTest(template=template_name):
+                self.assertEqual(
+                    self.render('jinja2', template_name, CONTEXT),
+                    self.render('django', template_name, CONTEXT),
+                )
+
+    def test_error_pages_render_identically(self):
+        context = dict(
+            CONTEXT, products=[], has_products=False, media_items=[], has_media=False,
+            error='Mohon maaf, "data" tidak bisa dimuat & coba lagi',
+            last_page_url='/products/page/3/',
+        )
+        for template_name in ('posting/homepage.html', 'posting/product_list.html', 'posting/instagram.html'):
+            with self.subTest(template=template_name):
+                self.assertEqual(
+                    self.render('jinja2', template_name, context),
+                    self.render('django', template_name, context),
+                )
+
+    def test_cards_render_identically(self):
+        for variant in ('grid', 'list'):
+            with self.subTest(variant=variant):
+                context = {'product': PRODUCTS[0], 'variant': variant}
+                self.assertEqual(
+                    self.render('jinja2', 'posting/components/product_card.html', context),
+                    self.render('django', 'posting/components/product_card.html', context),
+                )
+
+    def test_finalize_escapes_like_django(self):
+        self.assertEqual(finalize('"a" & \'b\' <c>'), '&quot;a&quot; &amp; &#x27;b&#x27; &lt;c&gt;')
+        self.assertEqual(finalize(None), 'None')
@@ -0,0 +1,68 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from posting.utils.media_mirror import mirror_feed
+
+
+def image_bytes(size=(800, 600), color=(200, 100, 60)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def fake_get(content):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    return mock.Mock(return_value=response)
+
+
+def post(number):
+    return {'id': str(number), 'media_type': 'IMAGE', 'media_url': f'https://cdn.example/{number}.jpg?oe=1'}
+
+
+class MirrorFeedTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        overrides = override_settings(INSTAGRAM_MIRROR_ROOT=self.root, INSTAGRAM_MIRROR_URL='/media/instagram/',
+                                      INSTAGRAM_THUMBNAIL_SIZE=120)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_item_is_rewritten_to_local_files(self):
+        with mock.patch('requests.get', fake_get(image_bytes())):
+            item, = mirror_feed([post(1)])
+        self.assertTrue(item['media_url'].startswith('/media/instagram/'))
+        self.assertTrue(item['media_url'].endswith('.png'))
+        self.assertEqual(item['remote_media_url'], 'https://cdn.example/1.jpg?oe=1')
+        self.assertEqual(item['placeholder']['width'], 120)
+
+        thumbnail = os.path.join(self.root, os.path.basename(item['thumbnail_url']))
+        with Image.open(thumbnail) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (120, 120)))
+
+    def test_same_content_same_files(self):
+        with mock.patch('requests.get', fake_get(image_bytes())):
+            first, second = mirror_feed([post(1), post(2)])
+        self.assertEqual(first['media_url'], second['media_url'])
+        self.assertEqual(len(os.listdir(self.root)), 2)
+
+    def test_mirrored_items_are_not_downloaded_again(self):
+        with mock.patch('requests.get', fake_get(image_bytes())) as get:
+            mirrored = mirror_feed([post(1)])
+            self.assertEqual(mirror_feed(mirrored), mirrored)
+        self.assertEqual(get.call_count, 1)
+
+    def test_failed_download_keeps_the_instagram_url(self):
+        with mock.patch('requests.get', side_effect=requests.exceptions.ConnectionError('down')):
+            item, = mirror_feed([post(1)])
+        self.assertEqual(item, post(1))
@@ -0,0 +1,132 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from posting.templatetags.api_filters import image_placeholder
+from posting.utils import placeholders
+from posting.utils.placeholders import (
+    add_placeholders, apply_placeholders, has_unmeasured, measure, shopee_image_id,
+)
+from posting.utils.snapshot import load_snapshot
+from .test_media_mirror import image_bytes
+
+
+def product(number):
+    return {'itemid': number, 'image': f'https://cf.shopee.co.id/file/img{number}'}
+
+
+def image_of(item):
+    return item.get('image')
+
+
+class MeasureTests(SimpleTestCase):
+
+    def test_size_color_and_preview(self):
+        placeholder = measure(image_bytes(size=(800, 600), color=(200, 100, 60)))
+        self.assertEqual((placeholder['width'], placeholder['height']), (800, 600))
+        self.assertEqual(placeholder['color'], '#c8643c')
+        self.assertTrue(placeholder['lqip'].startswith('data:image/jpeg;base64,'))
+
+    def test_rotated_jpeg_is_measured_as_displayed(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600)).save(buffer, 'JPEG', exif=exif)
+        placeholder = measure(buffer.getvalue())
+        self.assertEqual((placeholder['width'], placeholder['height']), (600, 800))
+
+    def test_template_tag(self):
+        html = image_placeholder({'width': 8, 'height': 6, 'color': '#000000', 'lqip': 'data:x'})
+        self.assertEqual(html, 'width="8" height="6" style="background: #000000 url(data:x) center / cover no-repeat"')
+        self.assertEqual(image_placeholder(None), '')
+
+
+class PlaceholdersTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(CATALOG_SNAPSHOT_DIR=directory.name, IMAGE_PLACEHOLDERS=True,
+                                      IMAGE_PLACEHOLDER_MAX_NEW=200)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        failed = mock.patch.dict(placeholders._failed, clear=True)
+        failed.start()
+        self.addCleanup(failed.stop)
+
+        self.fetched = []
+        self.broken = set()
+        fetch = mock.patch.object(placeholders, 'fetch_placeholder', side_effect=self.fetch)
+        fetch.start()
+        self.addCleanup(fetch.stop)
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        if url in self.broken:
+            return None
+        return {'width': 10, 'height': 10, 'color': '#ffffff', 'lqip': url}
+
+    def add(self, items):
+        self.fetched.clear()
+        return add_placeholders(items, 'shopee', shopee_image_id, image_of)
+
+    def test_new_images_are_measured_once(self):
+        items = self.add([product(1), product(2), {'itemid': 3}])
+        self.assertEqual([item.get('placeholder', {}).get('lqip') for item in items],
+                         [product(1)['image'], product(2)['image'], None])
+        self.assertEqual(set(load_snapshot('image_meta_shopee')['data']), {'img1', 'img2'})
+
+        items = self.add([product(1), product(2)])
+        self.assertEqual(self.fetched, [])
+        self.assertIn('placeholder', items[1])
+
+    def test_new_images_are_limited_per_call(self):
+        with override_settings(IMAGE_PLACEHOLDER_MAX_NEW=2):
+            items = self.add([product(number) for number in range(5)])
+            self.assertEqual(len(self.fetched), 2)
+            self.assertTrue(has_unmeasured(items, shopee_image_id, image_of))
+            self.add(items)
+            self.assertEqual(len(self.fetched), 2)
+
+    def test_failed_image_is_retried_after_an_hour(self):
+        self.broken.add(product(1)['image'])
+        items = self.add([product(1)])
+        self.assertNotIn('placeholder', items[0])
+        self.assertFalse(has_unmeasured(items, shopee_image_id, image_of))
+        self.add([product(1)])
+        self.assertEqual(self.fetched, [])
+
+        placeholders._failed['img1'] -= placeholders.RETRY_FAILED_AFTER
+        self.assertTrue(has_unmeasured(items, shopee_image_id, image_of))
+        self.add([product(1)])
+        self.assertEqual(self.fetched, [product(1)['image']])
+
+    def test_measured_on_the_way_in(self):
+        item = dict(product(1), placeholder={'width': 1, 'height': 1, 'color': '#000000', 'lqip': 'mirror'})
+        self.add([item])
+        self.assertEqual(self.fetched, [])
+        self.assertEqual(load_snapshot('image_meta_shopee')['data']['img1']['lqip'], 'mirror')
+
+    def test_images_no_longer_used_are_dropped(self):
+        self.add([product(1), product(2)])
+        self.add([product(2)])
+        self.assertEqual(list(load_snapshot('image_meta_shopee')['data']), ['img2'])
+
+    def test_apply_never_downloads(self):
+        self.add([product(1)])
+        self.fetched.clear()
+        items = apply_placeholders([product(1), product(2)], 'shopee', shopee_image_id, image_of)
+        self.assertEqual(self.fetched, [])
+        self.assertIn('placeholder', items[0])
+        self.assertNotIn('placeholder', items[1])
+        self.assertTrue(has_unmeasured(items, shopee_image_id, image_of))
+
+    def test_disabled(self):
+        with override_settings(IMAGE_PLACEHOLDERS=False):
+            items = [product(1)]
+            self.assertEqual(self.add(items), items)
+            self.assertFalse(has_unmeasured(items, shopee_image_id, image_of))
+        self.assertEqual(self.fetched, [])
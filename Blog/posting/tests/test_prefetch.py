@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posting.utils import prefetch
+from posting.utils.prefetch import get_prefetch_stats, is_browser_prefetch, note_request
+
+
+@override_settings(PREFETCH_WINDOW=4, PREFETCH_MIN_HIT_RATE=0.5, PREFETCH_COOLDOWN=600,
+                   API_CACHE_TIMEOUT=300)
+class PrefetchTrackerTests(SimpleTestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(prefetch, '_pending', set()),
+            mock.patch.object(prefetch, '_prefetched', {}),
+            mock.patch.object(prefetch, '_outcomes', prefetch.deque()),
+            mock.patch.object(prefetch, '_paused_until', 0.0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def warm(self, offset, age=0):
+        prefetch._prefetched[(20, offset)] = prefetch.time.monotonic() - age
+
+    def test_requested_window_is_a_hit(self):
+        self.warm(20)
+        note_request(20, 20)
+        self.assertEqual(get_prefetch_stats()['hit_rate'], 1.0)
+        self.assertEqual(get_prefetch_stats()['warm'], 0)
+
+    def test_expired_window_is_a_miss(self):
+        self.warm(40, age=301)
+        note_request(20, 0)
+        stats = get_prefetch_stats()
+        self.assertEqual((stats['hit_rate'], stats['warm']), (0.0, 0))
+
+    def test_low_hit_rate_pauses(self):
+        for offset in range(4):
+            self.warm(offset, age=301)
+        note_request(20, 100)
+        self.assertTrue(get_prefetch_stats()['paused'])
+        with override_settings(PREFETCH_ENABLED=True), \
+                mock.patch.object(prefetch, 'get_usable_snapshot', return_value=None):
+            self.assertFalse(prefetch.schedule_prefetch(20, 20))
+
+
+class BrowserPrefetchTests(SimpleTestCase):
+
+    def test_purpose_headers(self):
+        factory = RequestFactory()
+        for headers, expected in (
+            ({'HTTP_SEC_PURPOSE': 'prefetch'}, True),
+            ({'HTTP_SEC_PURPOSE': 'prefetch;prerender'}, True),
+            ({'HTTP_PURPOSE': 'prefetch'}, True),
+            ({}, False),
+        ):
+            with self.subTest(headers=headers):
+                self.assertEqual(is_browser_prefetch(factory.get('/products/', **headers)), expected)
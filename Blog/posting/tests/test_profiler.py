@@ -0,0 +1,75 @@
+import contextvars
+import tempfile
+import threading
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posting.middleware.profiler import ProfilerMiddleware
+from posting.utils.profiler import SamplingProfiler, profile_thread
+
+
+def spin_unrelated(stop):
+    while not stop.is_set():
+        pass
+
+
+def spin_registered(stop):
+    profile_thread()
+    while not stop.is_set():
+        pass
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SamplingProfilerTests(SimpleTestCase):
+
+    def sample(self, target, context=None):
+        stop = threading.Event()
+        profiler = SamplingProfiler(0.002)
+        profiler.start()
+        if context is None:
+            context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(target, stop), daemon=True)
+        thread.start()
+        busy(0.1)
+        profiler.stop()
+        stop.set()
+        thread.join()
+        return '\n'.join(profiler.stacks)
+
+    def test_samples_the_request_thread(self):
+        self.assertIn('busy (', self.sample(spin_unrelated))
+
+    def test_skips_threads_of_other_work(self):
+        # Started outside the profiled context, like another request
+        self.assertNotIn('spin_unrelated', self.sample(spin_unrelated, contextvars.Context()))
+
+    def test_samples_threads_the_request_hands_work_to(self):
+        self.assertIn('spin_registered', self.sample(spin_registered))
+
+    def test_registration_needs_the_request_context(self):
+        self.assertNotIn('spin_registered', self.sample(spin_registered, contextvars.Context()))
+
+
+@override_settings(PROFILER_TOKEN='secret')
+class ProfilerMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.middleware = ProfilerMiddleware(lambda request: HttpResponse('page'))
+
+    def test_non_ascii_token_is_not_profiled(self):
+        response = self.middleware(RequestFactory().get('/about/', {'profile': 'é'}))
+        self.assertEqual(response.content, b'page')
+        self.assertNotIn('X-Profile-Name', response)
+
+    def test_matching_token_saves_a_profile(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILER_DIR=directory):
+            response = self.middleware(RequestFactory().get('/about/', HTTP_X_PROFILE='secret'))
+        self.assertIn('X-Profile-Name', response)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
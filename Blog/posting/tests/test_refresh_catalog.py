@@ -0,0 +1,70 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from posting.management.commands import refresh_catalog
+from posting.utils.catalog import RefreshError
+from posting.utils.snapshot import load_snapshot
+
+
+class RefreshCatalogCommandTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(CATALOG_SNAPSHOT_DIR=directory.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def run_once(self, refresher):
+        with mock.patch.dict(refresh_catalog.REFRESHERS, {'shopee': refresher}):
+            call_command('refresh_catalog', '--once', '--source', 'shopee',
+                         stdout=io.StringIO(), stderr=io.StringIO())
+        return load_snapshot(refresh_catalog.STATUS_SNAPSHOT)['data']['shopee']
+
+    def test_success_is_recorded(self):
+        entry = self.run_once(lambda: {'version': 'v1', 'fetched_at': 1000.0})
+        self.assertTrue(entry['ok'])
+        self.assertEqual((entry['version'], entry['last_success']), ('v1', 1000.0))
+        self.assertEqual(entry['consecutive_failures'], 0)
+
+    def test_unchanged_refresh_counts_from_the_check(self):
+        entry = self.run_once(lambda: {'version': 'v1', 'fetched_at': 1000.0, 'checked_at': 2000.0})
+        self.assertEqual(entry['last_success'], 2000.0)
+
+    def test_failures_are_counted_and_exit_non_zero(self):
+        self.run_once(lambda: {'version': 'v1', 'fetched_at': 1000.0})
+
+        def fail():
+            raise RefreshError('Shopee crawl failed')
+
+        for failures in (1, 2):
+            with self.assertRaises(SystemExit):
+                self.run_once(fail)
+            entry = load_snapshot(refresh_catalog.STATUS_SNAPSHOT)['data']['shopee']
+            self.assertEqual(entry['consecutive_failures'], failures)
+        self.assertFalse(entry['ok'])
+        self.assertEqual(entry['error'], 'Shopee crawl failed')
+        # The last good data is still known
+        self.assertEqual((entry['version'], entry['last_success']), ('v1', 1000.0))
+
+
+class NextDelayTests(SimpleTestCase):
+
+    options = {'interval': 300, 'jitter': 0.1, 'max_backoff': 1800}
+
+    def delay(self, ok, failures=0):
+        entry = {'ok': ok, 'consecutive_failures': failures}
+        return refresh_catalog.Command().next_delay(entry, self.options)
+
+    def test_interval_with_jitter(self):
+        for _ in range(20):
+            self.assertTrue(270 <= self.delay(True) <= 330)
+
+    def test_backoff_while_failing(self):
+        with mock.patch('random.uniform', return_value=0):
+            self.assertEqual([self.delay(False, failures) for failures in (1, 2, 3, 4, 5)],
+                             [300, 600, 1200, 1800, 1800])
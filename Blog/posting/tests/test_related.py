@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase, override_settings
+
+from posting.utils.related import compute_related
+
+
+def product(name, catid=1, price=100000.0, historical_sold=0):
+    return {'name': name, 'catid': catid, 'price': price, 'historical_sold': historical_sold}
+
+
+@override_settings(RELATED_MAX_DF=0.1)
+class ComputeRelatedTests(SimpleTestCase):
+
+    def neighbors(self, products, k):
+        flat = compute_related(products, k)
+        return [list(flat[position * k:(position + 1) * k]) for position in range(len(products))]
+
+    def test_shared_name_tokens_rank_first(self):
+        products = [
+            product('gamis syari motif bunga'),
+            product('gamis syari motif bunga premium'),
+            product('kemeja batik pria'),
+            product('gamis polos'),
+        ]
+        self.assertEqual(self.neighbors(products, 1)[0], [1])
+        self.assertEqual(self.neighbors(products, 1)[1], [0])
+
+    def test_never_its_own_neighbor(self):
+        products = [product(f'kaos polos {i}') for i in range(5)]
+        for position, related in enumerate(self.neighbors(products, 4)):
+            self.assertNotIn(position, related)
+            self.assertEqual(len(set(related)), 4)
+
+    def test_same_category_and_price_break_ties(self):
+        products = [
+            product('alpha', catid=1, price=100000.0),
+            product('beta', catid=2, price=100000.0),
+            product('gamma', catid=1, price=900000.0),
+            product('delta', catid=1, price=105000.0),
+        ]
+        # No shared tokens: same category and closest price wins
+        self.assertEqual(self.neighbors(products, 1)[0], [3])
+
+    def test_topped_up_with_category_best_sellers(self):
+        products = [
+            product('alpha', catid=1),
+            product('beta', catid=1, historical_sold=5),
+            product('gamma', catid=1, historical_sold=50),
+            product('delta', catid=2, historical_sold=500),
+        ]
+        # Same price band: category (then popularity order of the bucket) decides
+        self.assertEqual(self.neighbors(products, 2)[0][:2], [2, 1])
+
+    def test_missing_neighbors_are_minus_one(self):
+        products = [product('alpha', catid=1), product('beta', catid=2)]
+        self.assertEqual(self.neighbors(products, 3)[0], [-1, -1, -1])
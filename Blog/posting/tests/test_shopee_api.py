@@ -0,0 +1,300 @@
+import asyncio
+import json
+import threading
+import time
+from unittest import mock
+
+import httpx
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from posting.utils.http_client import get_async_client
+from posting.utils.shopee_api import (
+    ITEM_BASIC_FIELDS, TokenBucket, afetch_shopee_products, canonical_windows, compact_search_items,
+    crawl_shopee_catalog, crawl_shopee_shops, get_item_basics, merge_windows,
+)
+
+
+def item(itemid, **fields):
+    return {'item_basic': dict({'itemid': itemid, 'name': f'Gamis {itemid}', 'price': 100000 * itemid}, **fields)}
+
+
+def search_response(items, total=None, nomore=None):
+    data = {'error': 0, 'items': items}
+    if total is not None:
+        data['total_count'] = total
+    if nomore is not None:
+        data['nomore'] = nomore
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(data).encode()
+    return response
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_burst_is_free(self):
+        bucket = TokenBucket(rate=10, capacity=3)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    def test_waits_for_the_next_token(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        bucket.acquire()
+        started = time.monotonic()
+        waited = bucket.acquire()
+        self.assertAlmostEqual(waited, 0.05, delta=0.01)
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+    def test_waiters_queue_up(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        waits = [bucket.acquire() for _ in range(4)]
+        self.assertEqual(waits[0], 0.0)
+        # Each waiter reserved its token, none waits for more than one interval
+        for waited in waits[1:]:
+            self.assertLess(waited, 0.011)
+
+
+@override_settings(SHOPEE_PROXY='http://proxy.test/', SHOPEE_CRAWL_MAX_PAGES=200)
+class CrawlTests(SimpleTestCase):
+    """
+    crawl_shopee_catalog against a fake proxy (offset -> page)
+    """
+
+    def crawl(self, pages, **kwargs):
+        requested = []
+
+        def get(session, url, params=None, **_):
+            requested.append(params['offset'])
+            return pages(params['offset'])
+
+        with mock.patch.object(requests.Session, 'get', get):
+            result = crawl_shopee_catalog(shop_id=1, page_size=2, concurrency=2, rate=1000, **kwargs)
+        return result, sorted(requested)
+
+    def test_total_count_bounds_the_pages(self):
+        def pages(offset):
+            return search_response([item(i) for i in range(offset, min(offset + 2, 5))], total=5)
+
+        result, requested = self.crawl(pages)
+        self.assertEqual([product['itemid'] for product in result['products']], [0, 1, 2, 3, 4])
+        self.assertEqual(requested, [0, 2, 4])
+
+    def test_duplicates_from_shifted_offsets_are_dropped(self):
+        # A product was added mid-crawl: item 1 shows up on two pages
+        layout = {0: [0, 1], 2: [1, 2], 4: [3]}
+
+        def pages(offset):
+            return search_response([item(i) for i in layout[offset]], total=5)
+
+        result, _ = self.crawl(pages)
+        self.assertEqual([product['itemid'] for product in result['products']], [0, 1, 2, 3])
+        self.assertEqual(result['stats']['duplicates'], 1)
+
+    def test_has_more_drives_the_crawl_without_total(self):
+        def pages(offset):
+            items = [item(i) for i in range(offset, min(offset + 2, 7))]
+            return search_response(items, nomore=offset + 2 >= 7)
+
+        result, requested = self.crawl(pages)
+        self.assertEqual(result['total'], 7)
+        self.assertEqual(requested, [0, 2, 4, 6])
+
+    def test_shop_grown_past_total_count(self):
+        # total_count is out of date: the shop has 6 products, not 4
+        def pages(offset):
+            items = [item(i) for i in range(offset, min(offset + 2, 6))]
+            return search_response(items, total=4, nomore=offset + 2 >= 6)
+
+        result, _ = self.crawl(pages)
+        self.assertEqual(result['total'], 6)
+
+    def test_short_page_ends_the_crawl(self):
+        def pages(offset):
+            return search_response([item(offset)] if offset == 0 else [])
+
+        result, requested = self.crawl(pages)
+        self.assertEqual(result['total'], 1)
+        self.assertEqual(requested, [0])
+
+
+@override_settings(TRACE_SAMPLE_RATE=0)
+class CrawlShopsTests(SimpleTestCase):
+    """
+    crawl_shopee_shops with crawl_shopee_catalog faked per shop id
+    """
+
+    shops = [{'username': 'main', 'shopid': '1'}, {'username': 'second', 'shopid': '2'}]
+
+    def crawl(self, catalog_of, timeout=5):
+        with mock.patch('posting.utils.shopee_api.resolve_shop_id', side_effect=lambda shopid, username: int(shopid)), \
+                mock.patch('posting.utils.shopee_api.crawl_shopee_catalog', side_effect=catalog_of):
+            return crawl_shopee_shops(self.shops, timeout=timeout)
+
+    def test_products_are_tagged_with_their_shop(self):
+        results = self.crawl(lambda shop_id: {'products': [{'itemid': shop_id}], 'total': 1})
+        self.assertEqual(results['second'], {'products': [{'itemid': 2, 'shop': 'second'}], 'total': 1,
+                                             'shopid': '2'})
+
+    def test_failed_shop_does_not_fail_the_others(self):
+        def catalog_of(shop_id):
+            if shop_id == 2:
+                raise requests.exceptions.ConnectionError('blocked')
+            return {'products': [{'itemid': 1}], 'total': 1}
+
+        results = self.crawl(catalog_of)
+        self.assertEqual(results['main']['total'], 1)
+        self.assertEqual(results['second'], {'error': 'blocked'})
+
+    def test_slow_shop_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def catalog_of(shop_id):
+            if shop_id == 2:
+                release.wait(5)
+            return {'products': [], 'total': 0}
+
+        started = time.monotonic()
+        results = self.crawl(catalog_of, timeout=0.1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(results['main']['total'], 0)
+        self.assertEqual(results['second'], {'error': 'timed out after 0.1s'})
+
+
+class CompactFormatTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        data = {
+            'error': 0,
+            'total_count': 2,
+            'nomore': True,
+            'items': [
+                item(1, stock=3, item_rating={'rating_star': 4.5, 'rating_count': [1, 2]}, extra='dropped'),
+                item(2),
+            ],
+        }
+        compact = compact_search_items(data)
+        self.assertEqual(compact['fields'], list(ITEM_BASIC_FIELDS))
+        self.assertEqual((compact['total_count'], compact['nomore']), (2, True))
+
+        basics = get_item_basics(json.loads(json.dumps(compact)))
+        self.assertEqual(basics[0]['stock'], 3)
+        self.assertEqual(basics[0]['item_rating'], {'rating_star': 4.5})
+        self.assertNotIn('extra', basics[0])
+        # Missing fields are left out, not sent as None
+        self.assertEqual(basics[1], {'itemid': 2, 'name': 'Gamis 2', 'price': 200000})
+
+    def test_full_format(self):
+        self.assertEqual(get_item_basics({'items': [item(1), {}]}),
+                         [item(1)['item_basic'], {}])
+        self.assertEqual(get_item_basics({'items': None}), [])
+
+
+def window(offset, count, **flags):
+    return dict({'products': [{'itemid': i} for i in range(offset, offset + count)],
+                 'total': 120, 'has_more': True}, **flags)
+
+
+@override_settings(SHOPEE_CRAWL_MAX_PAGES=200)
+class WindowTests(SimpleTestCase):
+
+    def test_slice_inside_one_window(self):
+        self.assertEqual(canonical_windows(10, 60), (10, 60, [50], False))
+
+    def test_slice_across_windows(self):
+        self.assertEqual(canonical_windows(50, 30), (50, 30, [0, 50], False))
+
+    def test_limit_and_offset_are_clamped(self):
+        self.assertEqual(canonical_windows(500, -5), (50, 0, [0], False))
+        self.assertEqual(canonical_windows(0, 0), (1, 0, [0], False))
+
+    def test_windows_stop_at_total(self):
+        self.assertEqual(canonical_windows(50, 30, total=60), (50, 30, [0, 50], False))
+        self.assertEqual(canonical_windows(50, 30, total=40), (50, 30, [0], False))
+
+    def test_past_end(self):
+        self.assertEqual(canonical_windows(50, 100, total=100), (50, 100, [], True))
+        with override_settings(SHOPEE_CRAWL_MAX_PAGES=2):
+            self.assertEqual(canonical_windows(50, 100), (50, 100, [], True))
+
+    def test_merge_cuts_the_slice(self):
+        merged = merge_windows([window(0, 50), window(50, 50)], 50, 30)
+        self.assertEqual([product['itemid'] for product in merged['products']], list(range(30, 80)))
+        self.assertTrue(merged['has_more'])
+
+    def test_merge_last_window(self):
+        merged = merge_windows([window(100, 20, has_more=False)], 50, 100)
+        self.assertEqual(len(merged['products']), 20)
+        self.assertFalse(merged['has_more'])
+
+    def test_merge_keeps_error_and_stale_flags(self):
+        merged = merge_windows([window(0, 50), window(50, 50, stale=True, error='timeout')], 50, 30)
+        self.assertTrue(merged['stale'])
+        self.assertEqual(merged['error'], 'timeout')
+
+
+@override_settings(SHOPEE_PROXY='http://proxy.test/', IMAGE_PLACEHOLDERS=False)
+class AsyncFetchTests(SimpleTestCase):
+    """
+    afetch_shopee_products against a fake proxy on a mocked httpx transport
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.requested = []
+        self.status = 200
+
+    def handler(self, request):
+        offset = int(request.url.params['offset'])
+        self.requested.append(offset)
+        if self.status != 200:
+            return httpx.Response(self.status)
+        items = [item(i) for i in range(offset + 1, min(offset + 50, 120) + 1)]
+        return httpx.Response(200, json={'error': 0, 'items': items, 'total_count': 120})
+
+    def fetch(self, **kwargs):
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+            with mock.patch('posting.utils.shopee_api.get_async_client', return_value=client):
+                try:
+                    return await afetch_shopee_products(shop_id='1', **kwargs)
+                finally:
+                    await client.aclose()
+        return asyncio.run(run())
+
+    def test_window_is_fetched_once(self):
+        first = self.fetch(limit=10, offset=0)
+        second = self.fetch(limit=10, offset=10)
+        self.assertEqual(self.requested, [0])
+        self.assertEqual([product['itemid'] for product in first['products']], list(range(1, 11)))
+        self.assertEqual([product['itemid'] for product in second['products']], list(range(11, 21)))
+        self.assertEqual(first['total'], 120)
+
+    def test_slice_across_windows_fetches_both(self):
+        result = self.fetch(limit=10, offset=45)
+        self.assertEqual(sorted(self.requested), [0, 50])
+        self.assertEqual([product['itemid'] for product in result['products']], list(range(46, 56)))
+
+    def test_failure_is_served_from_fallback_and_marks_the_shop_down(self):
+        self.status = 404
+        result = self.fetch(limit=10, offset=0)
+        self.assertTrue(result['products'])
+        self.assertIn('error', result)
+        self.fetch(limit=10, offset=0)
+        # Down: the second request is not sent upstream
+        self.assertEqual(self.requested, [0])
+
+
+class AsyncClientTests(SimpleTestCase):
+
+    def test_one_client_per_loop_closed_with_it(self):
+        async def clients():
+            return get_async_client(), get_async_client()
+
+        first, same = asyncio.run(clients())
+        self.assertIs(first, same)
+        self.assertTrue(first.is_closed)
+        other, _ = asyncio.run(clients())
+        self.assertIsNot(other, first)
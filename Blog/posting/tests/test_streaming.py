@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, override_settings
+
+from posting.streaming import stream_homepage
+from posting.utils.tracing import current_trace_id, trace
+from .test_views import products_result
+
+
+@override_settings(STOREFRONT_TEMPLATE_ENGINE='django', TRACE_SAMPLE_RATE=0, HOMEPAGE_RENDER_MODE='stream')
+class StreamHomepageTests(SimpleTestCase):
+
+    def test_shell_is_sent_before_the_data(self):
+        fetched = threading.Event()
+
+        def get_products(limit):
+            fetched.wait(5)
+            return products_result(0, limit, 120)
+
+        with mock.patch('posting.streaming.get_products', side_effect=get_products), \
+                mock.patch('posting.streaming.get_instagram_feed', return_value={'media': []}):
+            chunks = iter(stream_homepage(RequestFactory().get('/')).streaming_content)
+            head = next(chunks).decode()
+            fetched.set()
+            rest = [chunk.decode() for chunk in chunks]
+        self.assertIn('<head', head)
+        self.assertNotIn('Gamis', head)
+        self.assertEqual(len(rest), 4)
+        self.assertIn('Gamis 7', rest[0])
+        self.assertNotIn('Gamis 8', rest[0])  # Only 8 on the homepage
+        self.assertIn('</html>', rest[3])
+
+    def test_failed_fetch_renders_the_error_section(self):
+        with mock.patch('posting.streaming.get_products', side_effect=RuntimeError('down')), \
+                mock.patch('posting.streaming.get_instagram_feed', return_value={'media': []}):
+            response = self.client.get('/')
+            body = b''.join(response.streaming_content).decode()
+        self.assertIn('Mohon maaf, terjadi kesalahan saat memuat data.', body)
+        self.assertIn('</html>', body)
+
+    def test_stream_cache_policy(self):
+        with mock.patch('posting.streaming.get_products', return_value=products_result(0, 12, 120)), \
+                mock.patch('posting.streaming.get_instagram_feed', return_value={'media': []}):
+            response = self.client.get('/')
+            b''.join(response.streaming_content)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, s-maxage=30, stale-while-revalidate=30')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+
+# Spans are collected in memory, never written to TRACE_FILE
+@override_settings(STOREFRONT_TEMPLATE_ENGINE='django', TRACE_SAMPLE_RATE=1)
+class StreamHomepageTracingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.spans = []
+        self.fetch_traces = []
+        patch = mock.patch('posting.utils.tracing.export_span',
+                           side_effect=lambda current, duration: self.spans.append(current))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def fetched(self, result):
+        self.fetch_traces.append(current_trace_id())
+        return result
+
+    def render_spans(self):
+        return {current.attrs['template']: current for current in self.spans if current.name == 'render'}
+
+    def assert_in_trace(self, trace_id, body):
+        self.assertIn('Gamis 3', body)
+        self.assertEqual(self.fetch_traces, [trace_id, trace_id])
+        spans = self.render_spans()
+        for template in ('posting/homepage.html', 'posting/partials/home_products.html',
+                         'posting/partials/home_instagram.html'):
+            self.assertEqual(spans[template].trace_id, trace_id)
+
+    def test_wsgi_chunks_stay_in_the_view_trace(self):
+        with mock.patch('posting.streaming.get_products',
+                        side_effect=lambda limit: self.fetched(products_result(0, limit, 120))), \
+                mock.patch('posting.streaming.get_instagram_feed',
+                           side_effect=lambda limit: self.fetched({'media': []})):
+            with trace('view') as root:
+                response = stream_homepage(RequestFactory().get('/'))
+            # Iterated by the server after the view span ended
+            body = b''.join(response.streaming_content).decode()
+        self.assert_in_trace(root.trace_id, body)
+
+    def test_asgi_chunks_stay_in_the_view_trace(self):
+        async def get_products(limit):
+            return self.fetched(products_result(0, limit, 120))
+
+        async def get_instagram_feed(limit):
+            return self.fetched({'media': []})
+
+        async def serve():
+            with trace('view') as root:
+                response = stream_homepage(AsyncRequestFactory().get('/'))
+            chunks = [chunk async for chunk in response.streaming_content]
+            return root, b''.join(chunks).decode()
+
+        with mock.patch('posting.streaming.aget_products', get_products), \
+                mock.patch('posting.streaming.aget_instagram_feed', get_instagram_feed):
+            root, body = asyncio.run(serve())
+        self.assert_in_trace(root.trace_id, body)
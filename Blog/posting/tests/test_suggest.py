@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from posting.utils.suggest import SuggestIndex, normalize
+
+
+def product(itemid, name, historical_sold=0):
+    return {'itemid': itemid, 'name': name, 'price': 100.0, 'url': f'/p/{itemid}',
+            'historical_sold': historical_sold}
+
+
+INDEX = SuggestIndex([
+    product(1, 'Kaos Polos Hitam', historical_sold=50),
+    product(2, 'Kaos Polo Putih', historical_sold=200),
+    product(3, 'Gamis Polkadot', historical_sold=10),
+    product(4, 'Hijab Pashmina Café', historical_sold=500),
+])
+
+
+class SuggestTests(SimpleTestCase):
+
+    def ids(self, result):
+        return [product['id'] for product in result['products']]
+
+    def test_every_term_is_a_prefix(self):
+        self.assertEqual(self.ids(INDEX.suggest('kaos pol')), [2, 1])
+        self.assertEqual(self.ids(INDEX.suggest('pol hit')), [1])
+
+    def test_best_sellers_first(self):
+        self.assertEqual(self.ids(INDEX.suggest('pol')), [2, 1, 3])
+
+    def test_no_match(self):
+        self.assertEqual(INDEX.suggest('kaos gamis'), {'products': [], 'terms': []})
+        self.assertEqual(INDEX.suggest('  '), {'products': [], 'terms': []})
+
+    def test_completions_of_the_last_term(self):
+        self.assertEqual(INDEX.suggest('kaos pol')['terms'], ['kaos polo', 'kaos polos', 'kaos polkadot'])
+
+    def test_limit(self):
+        result = INDEX.suggest('pol', limit=1)
+        self.assertEqual(self.ids(result), [2])
+        self.assertEqual(len(result['terms']), 1)
+
+    def test_accents_and_case(self):
+        self.assertEqual(normalize('Café, HIJAB!'), 'cafe hijab')
+        self.assertEqual(self.ids(INDEX.suggest('CAFÉ')), [4])
@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from posting.utils.catalog import PRODUCTS_PER_PAGE
+from posting.utils.shopee_api import out_of_range_result
+
+
+def products_result(offset, count, total, **flags):
+    products = [
+        {'itemid': i, 'name': f'Gamis {i}', 'price': 100.0, 'stock': 1, 'sold': 0,
+         'image': f'https://cf.shopee.co.id/file/{i}', 'url': f'https://shopee.co.id/p/{i}'}
+        for i in range(offset, offset + count)
+    ]
+    return dict({'products': products, 'total': total, 'has_more': offset + count < total}, **flags)
+
+
+# response.context is only recorded for Django templates; no span files
+@override_settings(STOREFRONT_TEMPLATE_ENGINE='django', TRACE_SAMPLE_RATE=0)
+class ProductListRoutingTests(SimpleTestCase):
+    """
+    One URL per product_list page, 404 only past a known catalog end
+    """
+
+    def get(self, path, result):
+        fetch = mock.AsyncMock(return_value=result)
+        with mock.patch('posting.views.aget_products', fetch), \
+                mock.patch('posting.views.schedule_prefetch'):
+            response = self.client.get(path)
+        return response, fetch
+
+    def test_first_page(self):
+        response, fetch = self.get('/products/', products_result(0, PRODUCTS_PER_PAGE, 120))
+        self.assertEqual(response.status_code, 200)
+        fetch.assert_awaited_once_with(limit=PRODUCTS_PER_PAGE, offset=0)
+        self.assertEqual(len(response.context['products']), PRODUCTS_PER_PAGE)
+        self.assertEqual(response.context['next_page_url'], '/products/page/2/')
+
+    def test_page_path(self):
+        response, fetch = self.get('/products/page/3/', products_result(100, 20, 120))
+        self.assertEqual(response.status_code, 200)
+        fetch.assert_awaited_once_with(limit=PRODUCTS_PER_PAGE, offset=100)
+        self.assertFalse(response.context['has_next'])
+
+    def test_query_page_redirects(self):
+        for query, location in (('?page=2', '/products/page/2/'), ('?page=1', '/products/'),
+                                ('?page=abc', '/products/')):
+            with self.subTest(query=query):
+                response, fetch = self.get(f'/products/{query}', None)
+                self.assertEqual((response.status_code, response['Location']), (301, location))
+                fetch.assert_not_awaited()
+
+    def test_page_one_path_redirects(self):
+        response, _ = self.get('/products/page/1/', None)
+        self.assertEqual((response.status_code, response['Location']), (301, '/products/'))
+
+    def test_past_the_end_is_not_found(self):
+        response, _ = self.get('/products/page/9/', out_of_range_result(120))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.context['last_page_url'], '/products/page/3/')
+        self.assertIn('s-maxage=60', response['Cache-Control'])
+
+    def test_fallback_data_is_never_not_found(self):
+        # Static fallback products: total says nothing about the real catalog
+        response, _ = self.get('/products/page/9/', products_result(0, 3, 3, error='timeout'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('s-maxage=30', response['Cache-Control'])
+
+    def test_stale_data_is_never_not_found(self):
+        response, _ = self.get('/products/page/9/', products_result(0, 3, 3, stale=True))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(STOREFRONT_TEMPLATE_ENGINE='django', TRACE_SAMPLE_RATE=0)
+class ProductListPrefetchTests(SimpleTestCase):
+    """
+    Visits score and chain server-side prefetches, browser prefetches do not
+    """
+
+    def get(self, **headers):
+        fetch = mock.AsyncMock(return_value=products_result(0, PRODUCTS_PER_PAGE, 120))
+        with mock.patch('posting.views.aget_products', fetch), \
+                mock.patch('posting.views.note_request') as note, \
+                mock.patch('posting.views.schedule_prefetch') as schedule:
+            response = self.client.get('/products/', **headers)
+        self.assertEqual(response.status_code, 200)
+        return note, schedule
+
+    def test_visit_warms_the_next_page(self):
+        note, schedule = self.get()
+        note.assert_called_once_with(PRODUCTS_PER_PAGE, 0)
+        schedule.assert_called_once_with(PRODUCTS_PER_PAGE, PRODUCTS_PER_PAGE)
+
+    def test_browser_prefetch_is_not_a_visit(self):
+        for headers in ({'HTTP_SEC_PURPOSE': 'prefetch'}, {'HTTP_PURPOSE': 'prefetch'}):
+            with self.subTest(headers=headers):
+                note, schedule = self.get(**headers)
+                note.assert_not_called()
+                schedule.assert_not_called()
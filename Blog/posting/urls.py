@@ -2,12 +2,21 @@
 URL configuration for posting app
 """
 from django.urls import path
-from . import views
+from . import views, api_views, fragment_views
 
 urlpatterns = [
     path('', views.homepage, name='homepage'),
     path('products/', views.product_list, name='product_list'),
+    path('products/page/<int:page>/', views.product_list, name='product_list_page'),
+    path('products/suggest', api_views.product_suggest, name='product_suggest'),
     path('instagram/', views.instagram_gallery, name='instagram_gallery'),
     path('about/', views.about_us, name='about_us'),
     path('contact/', views.contact, name='contact'),
+    path('api/products', api_views.products_api, name='products_api'),
+    path('api/products/<int:itemid>/related', api_views.related_products_api, name='related_products_api'),
+    path('api/instagram', api_views.instagram_api, name='instagram_api'),
+    path('api/status', api_views.status_api, name='status_api'),
+    path('fragments/products', fragment_views.products_fragment, name='products_fragment'),
+    path('fragments/instagram', fragment_views.instagram_fragment, name='instagram_fragment'),
+    path('sitemap.xml', api_views.sitemap, name='sitemap'),
 ]
@@ -0,0 +1,175 @@
+"""
+Upstream Bulkheads
+Bounded concurrency per upstream with a short queue wait
+
+Each upstream (Shopee, Instagram) gets a fixed number of slots per process,
+configured in UPSTREAM_BULKHEADS. A caller that cannot get a slot within
+``queue_timeout`` seconds gets BulkheadFull and serves stale or fallback data
+at once, so a slow upstream cannot tie up every worker thread and pages that
+need no upstream data keep responding.
+
+One counter is shared by threads and event loops: sync callers block on a
+condition, async callers poll without blocking their loop.
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+ASYNC_POLL_INTERVAL = 0.01
+
+_bulkheads = {}
+_registry_lock = threading.Lock()
+
+
+class BulkheadFull(Exception):
+    """
+    Raised when no upstream slot became free within the queue timeout
+    """
+
+
+class Bulkhead:
+    """
+    Concurrency limit for one upstream
+
+    Usage:
+        with get_bulkhead('shopee').slot():
+            response = requests.get(...)
+
+        async with get_bulkhead('shopee').aslot():
+            response = await client.get(...)
+    """
+
+    def __init__(self, name, limit, queue_timeout):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self.completed = 0
+        self.peak_active = 0
+        self._condition = threading.Condition()
+
+    def _try_acquire(self):
+        """
+        Take a slot if one is free (caller holds the condition)
+        """
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        return True
+
+    def _reject(self):
+        self.rejected += 1
+        logger.warning(
+            f"Bulkhead {self.name} full ({self.active}/{self.limit} active, "
+            f"{self.queued} queued), rejected {self.rejected} so far"
+        )
+        raise BulkheadFull(f'{self.name} upstream busy')
+
+    def _release(self):
+        with self._condition:
+            self.active -= 1
+            self.completed += 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a slot for the duration of the block (blocking wait)
+
+        Raises:
+            BulkheadFull: No slot within queue_timeout
+        """
+        with self._condition:
+            if not self._try_acquire():
+                self.queued += 1
+                try:
+                    acquired = self._condition.wait_for(self._try_acquire, timeout=self.queue_timeout)
+                finally:
+                    self.queued -= 1
+                if not acquired:
+                    self._reject()
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """
+        Async version of slot(), waits without blocking the event loop
+        """
+        with self._condition:
+            acquired = self._try_acquire()
+            if not acquired:
+                self.queued += 1
+
+        if not acquired:
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while not acquired and time.monotonic() < deadline:
+                    await asyncio.sleep(ASYNC_POLL_INTERVAL)
+                    with self._condition:
+                        acquired = self._try_acquire()
+            finally:
+                with self._condition:
+                    self.queued -= 1
+            if not acquired:
+                with self._condition:
+                    self._reject()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def try_slot(self):
+        """
+        Take a slot only if one is free right now (hedges), never waits
+
+        Returns:
+            bool: True if taken; give it back with release_slot()
+        """
+        with self._condition:
+            return self._try_acquire()
+
+    def release_slot(self):
+        self._release()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'peak_active': self.peak_active,
+            }
+
+
+def get_bulkhead(name):
+    """
+    The process-wide bulkhead for an upstream, created from settings
+    """
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _registry_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                config = settings.UPSTREAM_BULKHEADS[name]
+                bulkhead = _bulkheads[name] = Bulkhead(name, config['limit'], config['queue_timeout'])
+    return bulkhead
+
+
+def get_bulkhead_stats():
+    """
+    Active/queued/rejected counts of every bulkhead used so far
+    """
+    return {name: bulkhead.stats() for name, bulkhead in list(_bulkheads.items())}
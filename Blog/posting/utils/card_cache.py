@@ -0,0 +1,143 @@
+"""
+Product Card Cache
+Rendered product card HTML, reused across pages and requests
+
+A card only changes when its product does, yet every grid page used to render
+all of its cards again. {% product_card %} renders through render_card, which
+keeps the HTML of each card in a process-local LRU keyed by
+
+    (variant, itemid, the CARD_FIELDS values, whether it has a placeholder)
+
+so a product whose card changed gets a new key and re-renders on its own,
+while its old entry simply ages out. Editing the card template (a new compiled template in
+this process) empties the cache.
+
+CARD_CACHE_SIZE bounds the entries (0 disables the cache);
+get_card_cache_stats reports the hit rate.
+"""
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+import logging
+
+logger = logging.getLogger(__name__)
+
+CARD_TEMPLATE = 'posting/components/product_card.html'
+
+# Product fields the card template prints; keep in sync with CARD_TEMPLATE
+CARD_FIELDS = ('url', 'image', 'name', 'price', 'stock', 'sold')
+
+
+class CardCache:
+    """
+    Bounded LRU of rendered cards with hit/miss counters
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.template = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            html = self.entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key, html, size):
+        with self.lock:
+            self.entries[key] = html
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def use_template(self, template):
+        """
+        Drop every card if the card template was (re)compiled
+        """
+        if template is not self.template:
+            with self.lock:
+                if self.entries:
+                    logger.info(f"Card template changed, dropping {len(self.entries)} cached cards")
+                self.entries.clear()
+                self.template = template
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': settings.CARD_CACHE_SIZE,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_cards = CardCache()
+
+
+def card_key(product, variant):
+    """
+    Cache key of a product's card, from the fields the card shows
+
+    A placeholder is measured once per image and never changes, so whether
+    the product has one is enough; its preview is not part of the key.
+    """
+    return (
+        (variant, product.get('itemid'))
+        + tuple(product.get(field) for field in CARD_FIELDS)
+        + (bool(product.get('placeholder')),)
+    )
+
+
+def render_card(product, variant='grid'):
+    """
+    HTML of one product card, from the cache when the product is unchanged
+
+    Args:
+        product: Product dict (as in the catalog)
+        variant: 'grid' (homepage) or 'list' (product_list)
+
+    Returns:
+        SafeString: Card markup
+    """
+    template = get_template(CARD_TEMPLATE, using=settings.STOREFRONT_TEMPLATE_ENGINE)
+    size = settings.CARD_CACHE_SIZE
+    if not size:
+        return mark_safe(template.render({'product': product, 'variant': variant}))
+
+    # The backend wrapper is new on every call, the compiled template is not
+    _cards.use_template(template.template)
+    key = card_key(product, variant)
+    html = _cards.get(key)
+    if html is None:
+        html = template.render({'product': product, 'variant': variant})
+        _cards.put(key, str(html), size)
+    return mark_safe(html)
+
+
+def get_card_cache_stats():
+    """
+    Entries and hit rate of this process's card cache
+    """
+    return _cards.stats()
+
+
+def clear_card_cache():
+    """
+    Drop every cached card (benchmarks)
+    """
+    with _cards.lock:
+        _cards.entries.clear()
+        _cards.hits = _cards.misses = _cards.evictions = 0
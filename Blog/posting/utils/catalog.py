@@ -0,0 +1,335 @@
+"""
+Catalog Utilities
+Refresh Shopee and Instagram data into snapshots and serve views from them
+
+The refresh_catalog management command keeps the snapshots current. Views
+read through get_products/get_instagram_feed (or their async versions), which
+only fall back to calling upstream when no usable snapshot exists and
+CATALOG_READ_ONLY is off.
+"""
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+from ..signals import catalog_changed
+from .catalog_diff import diff_catalogs, has_changes, affected_offsets, summarize_diff
+from .shopee_api import (
+    crawl_shopee_shops, fetch_shopee_products, afetch_shopee_products, get_fallback_result,
+    get_shops, resolve_shop_id, window_cache_key, out_of_range_result, WINDOW_SIZE,
+)
+from .instagram_api import (
+    INSTAGRAM_SNAPSHOT, InstagramAPIError, fetch_instagram_feed, afetch_instagram_feed,
+    sync_instagram_feed, build_feed_result, get_error_result,
+)
+from .snapshot import compute_version, save_snapshot, load_snapshot, snapshot_age, touch_snapshot
+from .placeholders import add_placeholders, apply_placeholders, has_unmeasured, shopee_image_id
+from .related import get_neighbors, refresh_related
+import logging
+
+logger = logging.getLogger(__name__)
+
+SHOPEE_SNAPSHOT = 'shopee_catalog'
+
+# Products per product_list page, one canonical upstream window
+PRODUCTS_PER_PAGE = WINDOW_SIZE
+
+# Catalog snapshot this process has seen last, to detect new versions
+_observed = None
+_observed_lock = threading.Lock()
+
+
+class RefreshError(Exception):
+    """
+    Raised when upstream data could not be refreshed
+    """
+
+
+def refresh_shopee_catalog():
+    """
+    Crawl every Shopee shop and store the merged catalog as a snapshot
+
+    Shops are crawled concurrently and merged in SHOPEE_SHOPS order, each
+    product tagged with its shop. A shop whose crawl fails keeps its products
+    from the previous snapshot, so one blocked shop never empties or holds up
+    the others.
+
+    A crawl that yields the stored version only touches the snapshot (see
+    touch_snapshot): nothing is rewritten, measured or recomputed.
+
+    Returns:
+        dict: Saved (or confirmed) snapshot payload
+
+    Raises:
+        RefreshError: If every shop fails (the previous snapshot is kept)
+    """
+    previous = load_snapshot(SHOPEE_SNAPSHOT)
+    observe_catalog(previous)
+
+    shops = get_shops()
+    results = crawl_shopee_shops(shops)
+    if all('error' in result for result in results.values()):
+        errors = '; '.join(f"{username}: {result['error']}" for username, result in results.items())
+        raise RefreshError(f'Shopee crawl failed: {errors}')
+
+    # Products of the previous snapshot by shop (untagged ones are the main shop's)
+    kept = {}
+    for product in (previous['data']['products'] if previous else []):
+        kept.setdefault(product.get('shop', shops[0]['username']), []).append(product)
+
+    products = []
+    seen = set()
+    status = {}
+    for shop in shops:
+        username = shop['username']
+        result = results[username]
+        if 'error' in result:
+            shop_products = kept.get(username, [])
+            status[username] = {'total': len(shop_products), 'error': result['error']}
+        else:
+            stats = result['stats']
+            logger.info(
+                f"Shopee crawl {username}: {result['total']} products, {stats['pages']} pages, "
+                f"{stats['bytes']} bytes in {stats['wall_time']}s "
+                f"(throttled {stats['throttle_wait']}s, {stats['duplicates']} duplicates)"
+            )
+            shop_products = result['products']
+            status[username] = {'shopid': result['shopid'], 'total': result['total']}
+
+        for product in shop_products:
+            if product['itemid'] not in seen:
+                seen.add(product['itemid'])
+                products.append(product)
+
+    def image_of(product):
+        return product.get('image')
+
+    # Stored placeholders only: measuring is needed only if the catalog changed
+    products = apply_placeholders(products, 'shopee', shopee_image_id, image_of)
+    data = {'products': products, 'total': len(products), 'shops': status}
+    if (previous and compute_version(data) == previous['version']
+            and not has_unmeasured(products, shopee_image_id, image_of)):
+        logger.info(f"Shopee catalog unchanged (version {previous['version']})")
+        if get_neighbors(previous)[1] is None:
+            # Saved before related products existed, or storing them failed
+            refresh_related(previous)
+        return touch_snapshot(SHOPEE_SNAPSHOT)
+
+    data['products'] = add_placeholders(products, 'shopee', shopee_image_id, image_of)
+    payload = save_snapshot(SHOPEE_SNAPSHOT, data)
+    observe_catalog(payload, sender=refresh_shopee_catalog)
+    return payload
+
+
+def observe_catalog(payload, sender=None):
+    """
+    Note the catalog version this process works with
+
+    The first time a process sees a new version it diffs it against the one
+    before and sends catalog_changed, so every process (the refresher and each
+    web worker) invalidates the caches it derived from the old catalog.
+
+    Args:
+        payload: Catalog snapshot payload (None is ignored)
+        sender: refresh_shopee_catalog for a version it has just saved, so
+                receivers deriving stored data run in the refresher only;
+                the first version it saves is diffed against no catalog
+    """
+    global _observed
+
+    with _observed_lock:
+        previous = _observed
+        if payload is None or (previous and previous['version'] == payload['version']):
+            return
+        _observed = payload
+
+    if previous is None and sender is None:
+        # A worker's first look at the catalog: it has derived nothing yet
+        return
+
+    old_products = previous['data']['products'] if previous else []
+    diff = diff_catalogs(old_products, payload['data']['products'])
+    if has_changes(diff):
+        old_version = previous['version'] if previous else 'none'
+        logger.info(f"Catalog {old_version} -> {payload['version']}: {summarize_diff(diff)}")
+    catalog_changed.send(sender=sender or observe_catalog, diff=diff, old=previous, new=payload)
+
+
+@receiver(catalog_changed)
+def invalidate_product_windows(sender, diff, **kwargs):
+    """
+    Drop cached product windows whose content changed, keep the rest
+    """
+    shop_id = resolve_shop_id()
+    if not shop_id:
+        return
+    keys = [
+        window_cache_key(shop_id, offset)
+        for offset in sorted(affected_offsets(diff, WINDOW_SIZE))
+    ]
+    if keys:
+        cache.delete_many(keys)
+        logger.info(f"Invalidated {len(keys)} product windows")
+
+
+@receiver(catalog_changed, sender=refresh_shopee_catalog)
+def store_related_products(sender, new, **kwargs):
+    """
+    Compute related products for every catalog version the refresher saves
+
+    Web workers only read them (see related.get_neighbors).
+    """
+    refresh_related(new)
+
+
+def refresh_instagram_feed(limit=None):
+    """
+    Incrementally sync the stored Instagram feed
+
+    Returns:
+        dict: Saved snapshot payload
+
+    Raises:
+        RefreshError: If the token is missing or the API call fails
+    """
+    import requests
+
+    if not settings.INSTAGRAM_ACCESS_TOKEN:
+        raise RefreshError('Instagram access token not configured')
+
+    try:
+        return sync_instagram_feed(limit=limit or settings.INSTAGRAM_SNAPSHOT_LIMIT, measure=True)
+    except (requests.exceptions.RequestException, InstagramAPIError) as e:
+        raise RefreshError(f'Instagram feed failed: {e}')
+
+
+def current_version(name):
+    """
+    Version of the stored catalog ('catalog') or Instagram feed ('instagram')
+
+    Returns:
+        str or None: None while the data is not backed by a snapshot
+    """
+    snapshot = {'catalog': SHOPEE_SNAPSHOT, 'instagram': INSTAGRAM_SNAPSHOT}[name]
+    payload = load_snapshot(snapshot)
+    return payload['version'] if payload else None
+
+
+def get_usable_snapshot(name):
+    """
+    Load a snapshot if views may serve it
+
+    In read-only mode any snapshot is served, however old. Otherwise it has to
+    be younger than CATALOG_SNAPSHOT_MAX_AGE, so a dead refresher degrades to
+    the old request-time fetching instead of serving stale data forever.
+    """
+    payload = load_snapshot(name)
+    if payload is None:
+        return None
+
+    if settings.CATALOG_READ_ONLY:
+        return payload
+
+    if snapshot_age(payload) > settings.CATALOG_SNAPSHOT_MAX_AGE:
+        return None
+    return payload
+
+
+def slice_products(payload, limit, offset):
+    """
+    Build a fetch_shopee_products-style result from a catalog snapshot
+    """
+    products = payload['data']['products']
+    total = payload['data']['total']
+    if offset and offset >= total:
+        return out_of_range_result(total)
+    return {
+        'products': products[offset:offset + limit],
+        'total': total,
+        'has_more': offset + limit < total,
+    }
+
+
+def get_catalog():
+    """
+    The whole normalized catalog snapshot for features that need every item
+
+    Never crawls: building the catalog is left to `manage.py refresh_catalog`,
+    callers answer 503 (or degrade) while there is no usable snapshot.
+
+    Returns:
+        dict or None: Snapshot payload, None if unavailable
+    """
+    payload = get_usable_snapshot(SHOPEE_SNAPSHOT)
+    if payload is not None:
+        observe_catalog(payload)
+    return payload
+
+
+def get_instagram_payload():
+    """
+    The stored Instagram feed snapshot
+
+    Never syncs: keeping it current is left to `manage.py refresh_catalog`,
+    so an API request never waits for Instagram.
+
+    Returns:
+        dict or None: Snapshot payload, None if no feed was ever stored
+    """
+    return load_snapshot(INSTAGRAM_SNAPSHOT)
+
+
+def get_products(limit=50, offset=0):
+    """
+    Products for a view, read from the catalog snapshot when possible
+    """
+    payload = get_usable_snapshot(SHOPEE_SNAPSHOT)
+    if payload is not None:
+        observe_catalog(payload)
+        return slice_products(payload, limit, offset)
+    if settings.CATALOG_READ_ONLY:
+        logger.warning("Catalog snapshot missing in read-only mode")
+        return get_fallback_result(limit)
+    # Several shops only exist as the refresher's merged catalog; until there
+    # is one, serve the main shop
+    return fetch_shopee_products(limit=limit, offset=offset)
+
+
+async def aget_products(limit=50, offset=0):
+    """
+    Async version of get_products
+    """
+    payload = get_usable_snapshot(SHOPEE_SNAPSHOT)
+    if payload is not None:
+        observe_catalog(payload)
+        return slice_products(payload, limit, offset)
+    if settings.CATALOG_READ_ONLY:
+        logger.warning("Catalog snapshot missing in read-only mode")
+        return get_fallback_result(limit)
+    return await afetch_shopee_products(limit=limit, offset=offset)
+
+
+def get_instagram_feed(limit=12):
+    """
+    Instagram posts for a view, all limits served from the one stored feed
+
+    The stored feed is itself a snapshot, so outside read-only mode this only
+    syncs with Instagram when the refresher has not done so recently.
+    """
+    if settings.CATALOG_READ_ONLY:
+        payload = load_snapshot(INSTAGRAM_SNAPSHOT)
+        if payload is None:
+            return get_error_result('Feed not available yet')
+        return build_feed_result(payload, limit)
+    return fetch_instagram_feed(limit=limit)
+
+
+async def aget_instagram_feed(limit=12):
+    """
+    Async version of get_instagram_feed
+    """
+    if settings.CATALOG_READ_ONLY:
+        payload = load_snapshot(INSTAGRAM_SNAPSHOT)
+        if payload is None:
+            return get_error_result('Feed not available yet')
+        return build_feed_result(payload, limit)
+    return await afetch_instagram_feed(limit=limit)
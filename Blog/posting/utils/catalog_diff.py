@@ -0,0 +1,97 @@
+"""
+Catalog Diff Utilities
+Compare two Shopee catalog snapshots by itemid
+"""
+
+# Fields whose changes are reported separately in the diff summary
+TRACKED_FIELDS = ('price', 'stock', 'sold')
+
+
+def diff_catalogs(old_products, new_products):
+    """
+    Compare two product lists
+
+    Args:
+        old_products: Products of the previous catalog
+        new_products: Products of the refreshed catalog
+
+    Returns:
+        dict: {
+            'added': [itemid, ...],
+            'removed': [itemid, ...],
+            'changed': {itemid: [field, ...]},
+            'old_ids': [itemid, ...],   # catalog order before
+            'new_ids': [itemid, ...],   # catalog order after
+        }
+    """
+    old_by_id = {product['itemid']: product for product in old_products}
+    new_by_id = {product['itemid']: product for product in new_products}
+
+    changed = {}
+    for itemid, product in new_by_id.items():
+        previous = old_by_id.get(itemid)
+        if previous is None or previous == product:
+            continue
+        fields = sorted(key for key in set(previous) | set(product)
+                        if previous.get(key) != product.get(key))
+        changed[itemid] = fields
+
+    return {
+        'added': [itemid for itemid in new_by_id if itemid not in old_by_id],
+        'removed': [itemid for itemid in old_by_id if itemid not in new_by_id],
+        'changed': changed,
+        'old_ids': [product['itemid'] for product in old_products],
+        'new_ids': [product['itemid'] for product in new_products],
+    }
+
+
+def has_changes(diff):
+    """
+    Whether anything visible changed, including the order of products
+    """
+    return bool(diff['added'] or diff['removed'] or diff['changed']
+                or diff['old_ids'] != diff['new_ids'])
+
+
+def affected_itemids(diff):
+    """
+    Items whose own data changed or that were added/removed
+    """
+    return set(diff['added']) | set(diff['removed']) | set(diff['changed'])
+
+
+def affected_offsets(diff, limit):
+    """
+    Offsets of the ``limit``-sized windows whose content changed
+
+    A window is affected when the items it shows differ (added, removed or
+    shifted products) or when one of its items changed.
+    """
+    old_ids, new_ids = diff['old_ids'], diff['new_ids']
+    touched = affected_itemids(diff)
+    offsets = set()
+
+    for offset in range(0, max(len(old_ids), len(new_ids)), limit):
+        window = new_ids[offset:offset + limit]
+        if window != old_ids[offset:offset + limit] or touched.intersection(window):
+            offsets.add(offset)
+    return offsets
+
+
+def summarize_diff(diff):
+    """
+    One-line summary for the logs
+    """
+    counts = {field: 0 for field in TRACKED_FIELDS}
+    for fields in diff['changed'].values():
+        for field in fields:
+            if field in counts:
+                counts[field] += 1
+
+    summary = (
+        f"+{len(diff['added'])} -{len(diff['removed'])} ~{len(diff['changed'])} "
+        f"({', '.join(f'{field} {count}' for field, count in counts.items())})"
+    )
+    if diff['old_ids'] != diff['new_ids'] and not (diff['added'] or diff['removed']):
+        summary += ', reordered'
+    return summary
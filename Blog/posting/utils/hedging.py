@@ -0,0 +1,403 @@
+"""
+Upstream Hedging and Retries
+Cut tail latency with hedged requests, back off politely on 429/5xx
+
+Every upstream GET goes through upstream_get (or aupstream_get):
+
+    - Hedging: when an attempt is slower than the upstream's recent
+      ``percentile`` latency, a second identical request is sent and the
+      first answer wins. Hedges are capped at ``budget`` (a fraction of
+      requests) so a slow upstream is not hit twice as hard. A hedge also
+      needs a free slot of the upstream's bulkhead, held until both attempts
+      are over; when the bulkhead is full the hedge is skipped.
+    - Retries: 429 and 5xx answers are retried up to ``max_retries`` times,
+      after ``Retry-After`` when the upstream sends it, otherwise after an
+      exponential backoff with full jitter. A wait longer than ``max_wait``
+      is not worth holding the request for; the error response is returned.
+
+A ``throttle`` callable (e.g. a token bucket) runs before every attempt,
+hedges and retries included, outside the measured latency and before the
+hedge delay starts counting, so waiting for our own rate limit never looks
+like a slow upstream.
+
+Settings per upstream are in UPSTREAM_HEDGING. get_upstream_stats reports
+the hedge rate and the extra upstream load they cause, for tuning.
+"""
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from bisect import insort
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+from django.conf import settings
+from .bulkhead import get_bulkhead
+from .profiler import profile_thread
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'percentile': 95,
+    'budget': 0.1,
+    'min_delay': 0.05,
+    'max_retries': 2,
+    'backoff': 0.25,
+    'max_wait': 2.0,
+}
+
+# Latency samples kept per upstream, and needed before hedging starts
+WINDOW = 200
+MIN_SAMPLES = 20
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+_trackers = {}
+_registry_lock = threading.Lock()
+
+
+class UpstreamTracker:
+    """
+    Recent latencies and hedge/retry counters of one upstream
+
+    Attributes:
+        requests: Calls to upstream_get
+        attempts: Requests actually sent (hedges and retries included)
+        hedges: Second requests sent because the first was slow
+        hedge_wins: Hedges that answered first
+        hedges_skipped: Hedges not sent because the bulkhead was full
+        retries: Requests repeated after a 429/5xx
+        retry_after: Retries that waited for a Retry-After header
+        gave_up: 429/5xx returned because the wait exceeded max_wait
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.config = dict(DEFAULTS, **settings.UPSTREAM_HEDGING.get(name, {}))
+        self.samples = deque(maxlen=WINDOW)
+        self.sorted = []
+        self.requests = 0
+        self.attempts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.retries = 0
+        self.retry_after = 0
+        self.gave_up = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        """
+        Add the latency of a successful attempt
+        """
+        with self.lock:
+            if len(self.samples) == self.samples.maxlen:
+                self.sorted.remove(self.samples[0])
+            self.samples.append(seconds)
+            insort(self.sorted, seconds)
+
+    def percentile(self, p):
+        with self.lock:
+            if not self.sorted:
+                return None
+            return self.sorted[min(len(self.sorted) - 1, int(len(self.sorted) * p / 100))]
+
+    def count(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def hedge_delay(self):
+        """
+        Seconds to wait before hedging, None if this request may not hedge
+        """
+        config = self.config
+        if not config['budget'] or len(self.samples) < MIN_SAMPLES:
+            return None
+        if self.hedges >= config['budget'] * self.requests:
+            return None
+        return max(config['min_delay'], self.percentile(config['percentile']))
+
+    def retry_delay(self, response, retry):
+        """
+        Wait before retry number ``retry`` (0-based) of a 429/5xx response
+        """
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is not None:
+            return retry_after, True
+        # Full jitter: anywhere between 0 and the exponential bound
+        return random.uniform(0, self.config['backoff'] * 2 ** retry), False
+
+    def stats(self):
+        with self.lock:
+            requests = self.requests or 1
+            stats = {
+                'requests': self.requests,
+                'attempts': self.attempts,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'hedges_skipped': self.hedges_skipped,
+                'retries': self.retries,
+                'retry_after': self.retry_after,
+                'gave_up': self.gave_up,
+                'hedge_rate': round(self.hedges / requests, 4),
+                'extra_load': round((self.attempts - self.requests) / requests, 4),
+            }
+        for p in (50, 95, 99):
+            latency = self.percentile(p)
+            stats[f'p{p}_ms'] = round(latency * 1000, 1) if latency is not None else None
+        return stats
+
+
+def get_tracker(name):
+    """
+    The process-wide tracker of an upstream
+    """
+    tracker = _trackers.get(name)
+    if tracker is None:
+        with _registry_lock:
+            tracker = _trackers.get(name)
+            if tracker is None:
+                tracker = _trackers[name] = UpstreamTracker(name)
+    return tracker
+
+
+def get_upstream_stats():
+    """
+    Hedge and retry counters of every upstream used so far
+    """
+    return {name: tracker.stats() for name, tracker in list(_trackers.items())}
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (seconds or HTTP date)
+
+    Returns:
+        float or None: None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def close(response):
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+def timed(tracker, send, throttle=None):
+    """
+    Send one attempt, recording its latency if it succeeded
+    """
+    tracker.count(attempts=1)
+    if throttle is not None:
+        throttle()
+    started = time.monotonic()
+    response = send()
+    if response.status_code < 400:
+        tracker.record(time.monotonic() - started)
+    return response
+
+
+def hedge_slot(tracker):
+    """
+    Take a bulkhead slot for a hedge without waiting
+
+    Returns:
+        Callable releasing the slot, None if the bulkhead is full
+    """
+    if tracker.name not in settings.UPSTREAM_BULKHEADS:
+        return lambda: None
+    bulkhead = get_bulkhead(tracker.name)
+    if not bulkhead.try_slot():
+        tracker.count(hedges_skipped=1)
+        return None
+    return bulkhead.release_slot
+
+
+def submit(tracker, send, throttle=None):
+    """
+    Run one attempt in a thread of its own
+
+    A pool would be tied up by slow losers; attempts are already bounded by
+    the bulkhead slots of their callers and hedges.
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def attempt():
+        profile_thread()
+        return timed(tracker, send, throttle)
+
+    def run():
+        try:
+            future.set_result(context.run(attempt))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f'upstream-{tracker.name}', daemon=True).start()
+    return future
+
+
+def hedged(tracker, send, throttle=None):
+    """
+    One attempt, plus a hedge if it is slower than the hedge delay
+    """
+    # The first attempt is throttled before the hedge delay starts
+    if throttle is not None:
+        throttle()
+    delay = tracker.hedge_delay()
+    if delay is None:
+        return timed(tracker, send)
+
+    first = submit(tracker, send)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    release = hedge_slot(tracker)
+    if release is None:
+        return first.result()
+    tracker.count(hedges=1)
+    second = submit(tracker, send, throttle)
+    # The hedge's slot stays taken until the slower attempt is over too
+    second.add_done_callback(lambda f: first.add_done_callback(lambda f: release()))
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            if future is second:
+                tracker.count(hedge_wins=1)
+            # The slower attempt finishes in the background, drop its response
+            for other in pending:
+                other.add_done_callback(lambda f: f.exception() is None and close(f.result()))
+            return future.result()
+    raise error
+
+
+async def atimed(tracker, send):
+    tracker.count(attempts=1)
+    started = time.monotonic()
+    try:
+        response = await send()
+    except asyncio.CancelledError:
+        # Lost to a hedge: it took at least this long, keep the slow tail visible
+        tracker.record(time.monotonic() - started)
+        raise
+    if response.status_code < 400:
+        tracker.record(time.monotonic() - started)
+    return response
+
+
+async def ahedged(tracker, send):
+    """
+    Async version of hedged(), the slower attempt is cancelled
+    """
+    delay = tracker.hedge_delay()
+    if delay is None:
+        return await atimed(tracker, send)
+
+    first = asyncio.ensure_future(atimed(tracker, send))
+    done, _ = await asyncio.wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    release = hedge_slot(tracker)
+    if release is None:
+        return await first
+    tracker.count(hedges=1)
+    second = asyncio.ensure_future(atimed(tracker, send))
+    pending = {first, second}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                if task is second:
+                    tracker.count(hedge_wins=1)
+                return task.result()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        release()
+
+
+def should_retry(tracker, response, retry):
+    """
+    Seconds to wait before retrying a response, None to return it as is
+    """
+    if response.status_code not in RETRY_STATUSES or retry >= tracker.config['max_retries']:
+        return None
+
+    delay, from_header = tracker.retry_delay(response, retry)
+    if delay > tracker.config['max_wait']:
+        tracker.count(gave_up=1)
+        logger.warning(f"{tracker.name} answered {response.status_code}, not waiting {delay:.1f}s to retry")
+        return None
+
+    tracker.count(retries=1, retry_after=int(from_header))
+    logger.info(f"{tracker.name} answered {response.status_code}, retrying in {delay:.2f}s")
+    return delay
+
+
+def upstream_get(name, send, throttle=None):
+    """
+    Send a GET to an upstream with hedging and retries
+
+    Args:
+        name: Upstream name ('shopee', 'instagram'), selects UPSTREAM_HEDGING
+        send: Callable sending the request, e.g.
+              ``lambda: requests.get(url, params=params, timeout=15)``
+        throttle: Optional callable run before each attempt, not timed
+
+    Returns:
+        Response of the first attempt to answer (may still be a 429/5xx)
+    """
+    tracker = get_tracker(name)
+    tracker.count(requests=1)
+    retry = 0
+    while True:
+        response = hedged(tracker, send, throttle)
+        delay = should_retry(tracker, response, retry)
+        if delay is None:
+            return response
+        close(response)
+        time.sleep(delay)
+        retry += 1
+
+
+async def aupstream_get(name, send):
+    """
+    Async version of upstream_get, ``send`` returns a coroutine
+    """
+    tracker = get_tracker(name)
+    tracker.count(requests=1)
+    retry = 0
+    while True:
+        response = await ahedged(tracker, send)
+        delay = should_retry(tracker, response, retry)
+        if delay is None:
+            return response
+        await response.aclose()
+        await asyncio.sleep(delay)
+        retry += 1
@@ -0,0 +1,55 @@
+"""
+HTTP Client Utilities
+Shared clients for talking to upstream APIs (Shopee proxy, Instagram Graph)
+"""
+import asyncio
+import weakref
+
+from django.conf import settings
+
+# One AsyncClient per event loop: under ASGI the loop lives for the whole
+# process so connections are pooled, under WSGI each request gets its own loop
+# (asgiref runs async views with asyncio.run) and the client is closed with it.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+async def close_with_loop(client):
+    """
+    Wait until the loop shuts down, then close the client
+
+    asyncio.run cancels every task still pending when its coroutine returns,
+    while the loop is still running, so the connections are closed cleanly
+    instead of leaking with the finished request's loop.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.create_future()
+    finally:
+        if _async_clients.get(loop, (None,))[0] is client:
+            del _async_clients[loop]
+        await client.aclose()
+
+
+def get_async_client():
+    """
+    Get the non-blocking HTTP client bound to the running event loop
+
+    Returns:
+        httpx.AsyncClient: Pooled client, created on first use per loop
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client, _ = _async_clients.get(loop, (None, None))
+    if client is None or client.is_closed:
+        max_connections = getattr(settings, 'UPSTREAM_MAX_CONNECTIONS', 100)
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections // 5 or 1,
+            ),
+            follow_redirects=True,
+        )
+        # The entry holds the closer task, which a pending task needs to survive
+        _async_clients[loop] = (client, loop.create_task(close_with_loop(client)))
+    return client
@@ -2,21 +2,338 @@
 Instagram API Utilities
 Fetch Instagram feed using Instagram Basic Display API
 """
-import requests
+import threading
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.cache import cache
+from .bulkhead import BulkheadFull, get_bulkhead
+from .hedging import upstream_get, aupstream_get
+from .http_client import get_async_client
+from .media_mirror import is_mirrored, mirror_feed
+from .placeholders import add_placeholders, apply_placeholders, instagram_image_url
+from .snapshot import save_snapshot, load_snapshot, snapshot_age
+from .tracing import span
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def fetch_instagram_feed(access_token=None, limit=12):
+INSTAGRAM_MEDIA_FIELDS = 'id,caption,media_type,media_url,thumbnail_url,permalink,timestamp'
+
+# Snapshot holding the synced media history, newest first
+INSTAGRAM_SNAPSHOT = 'instagram_feed'
+
+_sync_lock = threading.Lock()
+
+
+class InstagramAPIError(Exception):
+    """
+    Raised when the Graph API answers without a ``data`` list
+    """
+
+
+def get_no_token_result():
+    """
+    Result returned when no Instagram access token is configured
+    """
+    logger.warning("Instagram access token not configured")
+    return {
+        'media': [],
+        'profile_url': settings.INSTAGRAM_PROFILE_URL,
+        'has_token': False,
+        'error': 'Access token not configured'
+    }
+
+
+def get_error_result(error):
+    """
+    Result returned when the Instagram API call fails
+    """
+    return {
+        'media': [],
+        'profile_url': settings.INSTAGRAM_PROFILE_URL,
+        'has_token': True,
+        'error': error
+    }
+
+
+def normalize_instagram_item(item):
+    """
+    Convert a Graph API media item to the dict used by templates
+    """
+    media_type = item.get('media_type', 'IMAGE')
+
+    # Get appropriate media URL
+    if media_type == 'VIDEO':
+        media_url = item.get('thumbnail_url') or item.get('media_url')
+    else:
+        media_url = item.get('media_url')
+
+    return {
+        'id': item.get('id'),
+        'caption': item.get('caption', ''),
+        'media_type': media_type,
+        'media_url': media_url,
+        'permalink': item.get('permalink', settings.INSTAGRAM_PROFILE_URL),
+        'timestamp': item.get('timestamp', ''),
+    }
+
+
+def build_media_request(access_token, after=None):
+    """
+    Build URL and query params for one page of me/media
+
+    Args:
+        access_token: Instagram access token
+        after: Paging cursor of the page to fetch (None for the newest page)
+
+    Returns:
+        tuple: (url, params)
+    """
+    params = {
+        'fields': INSTAGRAM_MEDIA_FIELDS,
+        'access_token': access_token,
+        'limit': settings.INSTAGRAM_PAGE_SIZE,
+    }
+    if after:
+        params['after'] = after
+    return f"{settings.INSTAGRAM_GRAPH_URL}/me/media", params
+
+
+def parse_media_page(data):
+    """
+    Parse one me/media page
+
+    Returns:
+        tuple: (normalized items, cursor of the next older page or None)
+
+    Raises:
+        InstagramAPIError: If the payload has no ``data`` list
+    """
+    if 'data' not in data:
+        message = data.get('error', {}).get('message', 'API error')
+        logger.error(f"Instagram API error: {message}")
+        raise InstagramAPIError(message)
+
+    paging = data.get('paging', {})
+    after = paging.get('cursors', {}).get('after') if paging.get('next') else None
+    return [normalize_instagram_item(item) for item in data['data']], after
+
+
+def refresh_item(stored, item):
+    """
+    Merge a freshly fetched item into its stored version
+
+    Caption, permalink and Instagram's signed ``media_url`` always come from
+    the fetched item. A mirrored item keeps its local URLs, which do not
+    expire, and only updates ``remote_media_url``.
+    """
+    if stored is None:
+        return item
+    if is_mirrored(stored):
+        fields = {key: value for key, value in item.items() if key != 'media_url'}
+        return dict(stored, remote_media_url=item['media_url'], **fields)
+    return dict(stored, **item)
+
+
+def feed_needs_sync(payload, limit):
+    """
+    Whether the stored feed is too old or too short to serve ``limit`` posts
+    """
+    if payload is None or snapshot_age(payload) > settings.API_CACHE_TIMEOUT:
+        return True
+    data = payload['data']
+    return len(data['media']) < limit and not data['complete']
+
+
+def build_feed_result(payload, limit):
+    """
+    Build the fetch_instagram_feed result from the stored feed
+    """
+    media = payload['data']['media'][:limit]
+    return {
+        'media': media,
+        'profile_url': settings.INSTAGRAM_PROFILE_URL,
+        'has_token': True,
+        'count': len(media)
+    }
+
+
+def get_media_page(url, params):
+    """
+    Download and parse one page of the media edge
+
+    Returns:
+        tuple: (normalized items, ``after`` cursor or None)
+    """
+    import requests
+
+    with span('upstream', service='instagram', url=url) as current:
+        response = upstream_get('instagram', lambda: requests.get(url, params=params, timeout=15))
+        current.set(status=response.status_code, bytes=len(response.content))
+        response.raise_for_status()
+    with span('normalize', service='instagram'):
+        return parse_media_page(response.json())
+
+
+async def aget_media_page(client, url, params):
+    """
+    Async version of get_media_page
+    """
+    with span('upstream', service='instagram', url=url) as current:
+        response = await aupstream_get('instagram', lambda: client.get(url, params=params, timeout=15))
+        current.set(status=response.status_code, bytes=len(response.content))
+        response.raise_for_status()
+    with span('normalize', service='instagram'):
+        return parse_media_page(response.json())
+
+
+def sync_steps(feed, access_token, limit):
+    """
+    Merge logic of an incremental sync, shared by both sync variants
+
+    Pages are downloaded newest first and merged into the stored feed by id,
+    so stored posts pick up edited captions and fresh signed media URLs. The
+    walk stops at the first page made up entirely of stored posts once the
+    re-fetched window holds ``limit`` posts; stored posts inside that window
+    that Instagram no longer returns were deleted and are dropped. Older
+    history is backfilled lazily by ``after`` cursor until the feed holds at
+    least ``limit`` posts or Instagram has no more pages.
+
+    A generator doing no I/O: it yields the ``(url, params)`` of each page it
+    needs, is sent back that page's ``(items, after)`` and returns
+    ``(feed, fresh)`` once the feed is in sync, ``fresh`` being the posts
+    that were not stored before.
+    """
+    stored = {media['id']: media for media in feed['media']}
+
+    # Newest pages until a page holds nothing new
+    window = []
+    seen = set()
+    after = None
+    for _ in range(settings.INSTAGRAM_SYNC_MAX_PAGES):
+        items, after = yield build_media_request(access_token, after)
+
+        items = [item for item in items if item['id'] not in seen]
+        seen.update(item['id'] for item in items)
+        window.extend(refresh_item(stored.get(item['id']), item) for item in items)
+        all_stored = bool(stored) and all(item['id'] in stored for item in items)
+        if not after or (len(window) >= limit and (all_stored or not stored)):
+            break
+
+    fresh = [item for item in window if item['id'] not in stored]
+    if not after:
+        # The window is Instagram's whole history
+        feed = {'media': window, 'after': None, 'complete': True}
+    else:
+        # Stored posts older than the window are kept as they are
+        oldest = window[-1]['timestamp'] if window else ''
+        older = [media for media in feed['media']
+                 if media['id'] not in seen and media['timestamp'] < oldest]
+        if older:
+            feed = dict(feed, media=window + older)
+        else:
+            # The window reaches past the stored history, continue from it
+            feed = {'media': window, 'after': after, 'complete': False}
+
+    # Older pages, only as far as needed to serve `limit`
+    while len(feed['media']) < limit and feed['after']:
+        items, after = yield build_media_request(access_token, feed['after'])
+        known = {media['id'] for media in feed['media']}
+        feed = {
+            'media': feed['media'] + [item for item in items if item['id'] not in known],
+            'after': after,
+            'complete': after is None,
+        }
+
+    return feed, fresh
+
+
+def load_feed():
+    """
+    The stored feed snapshot, and its data (empty before the first sync)
+    """
+    payload = load_snapshot(INSTAGRAM_SNAPSHOT)
+    feed = payload['data'] if payload else {'media': [], 'after': None, 'complete': False}
+    return payload, feed
+
+
+def save_feed(payload, feed, fresh):
+    """
+    Store a synced feed
+
+    Returns:
+        dict: Saved snapshot payload
+    """
+    if fresh or payload is None:
+        logger.info(f"Instagram sync: {len(fresh)} new posts, {len(feed['media'])} stored")
+    return save_snapshot(INSTAGRAM_SNAPSHOT, feed)
+
+
+def sync_instagram_feed(access_token=None, limit=0, measure=False):
+    """
+    Incrementally sync the stored feed with Instagram (see sync_steps)
+
+    Args:
+        access_token: Instagram access token (if None, get from settings)
+        limit: Posts the feed should hold at least
+        measure: Measure new images for placeholders (refresh_catalog only),
+                 otherwise only stored placeholders are used
+
+    Returns:
+        dict: Saved snapshot payload
+    """
+    access_token = access_token or settings.INSTAGRAM_ACCESS_TOKEN
+    payload, feed = load_feed()
+
+    steps = sync_steps(feed, access_token, limit)
+    try:
+        request = next(steps)
+        while True:
+            request = steps.send(get_media_page(*request))
+    except StopIteration as done:
+        feed, fresh = done.value
+
+    if settings.INSTAGRAM_MIRROR:
+        feed['media'] = mirror_feed(feed['media'])
+    place = add_placeholders if measure else apply_placeholders
+    feed['media'] = place(feed['media'], 'instagram', lambda media: media['id'], instagram_image_url)
+    return save_feed(payload, feed, fresh)
+
+
+async def async_sync_instagram_feed(access_token=None, limit=0):
+    """
+    Async version of sync_instagram_feed
+    """
+    access_token = access_token or settings.INSTAGRAM_ACCESS_TOKEN
+    payload, feed = load_feed()
+    client = get_async_client()
+
+    steps = sync_steps(feed, access_token, limit)
+    try:
+        request = next(steps)
+        while True:
+            request = steps.send(await aget_media_page(client, *request))
+    except StopIteration as done:
+        feed, fresh = done.value
+
+    if settings.INSTAGRAM_MIRROR:
+        feed['media'] = await sync_to_async(mirror_feed, thread_sensitive=False)(feed['media'])
+    # Request path: stored placeholders only, refresh_catalog measures new images
+    feed['media'] = apply_placeholders(feed['media'], 'instagram', lambda media: media['id'], instagram_image_url)
+    return save_feed(payload, feed, fresh)
+
+
+def fetch_instagram_feed(access_token=None, limit=12, use_cache=True):
     """
     Fetch Instagram media feed
     
+    Posts are served from the stored feed, which is synced incrementally
+    when it is older than API_CACHE_TIMEOUT or shorter than ``limit``.
+    
     Args:
         access_token: Instagram access token (if None, get from settings)
         limit: Number of posts to fetch
+        use_cache: Set to False to always sync with upstream first
     
     Returns:
         dict: {
@@ -25,105 +342,107 @@ def fetch_instagram_feed(access_token=None, limit=12):
             'has_token': bool
         }
     """
+    import requests
+
     # Get access token
     if not access_token:
         access_token = settings.INSTAGRAM_ACCESS_TOKEN
     
     if not access_token:
-        logger.warning("Instagram access token not configured")
-        return {
-            'media': [],
-            'profile_url': settings.INSTAGRAM_PROFILE_URL,
-            'has_token': False,
-            'error': 'Access token not configured'
-        }
+        return get_no_token_result()
     
-    # Check cache
-    cache_key = f'instagram_feed_{limit}'
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return cached_data
+    with span('cache', key=INSTAGRAM_SNAPSHOT) as current:
+        payload = load_snapshot(INSTAGRAM_SNAPSHOT)
+        current.set(hit=payload is not None)
+    if use_cache and not feed_needs_sync(payload, limit):
+        return build_feed_result(payload, limit)
+    
+    # Another thread is already syncing: serve what we have
+    if payload is not None and not _sync_lock.acquire(blocking=False):
+        return build_feed_result(payload, limit)
+    locked = payload is not None
     
     try:
-        url = 'https://graph.instagram.com/me/media'
-        params = {
-            'fields': 'id,caption,media_type,media_url,thumbnail_url,permalink,timestamp',
-            'access_token': access_token,
-            'limit': limit
-        }
-        
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if 'data' in data:
-            media_items = []
-            
-            for item in data['data']:
-                media_type = item.get('media_type', 'IMAGE')
-                
-                # Get appropriate media URL
-                if media_type == 'VIDEO':
-                    media_url = item.get('thumbnail_url') or item.get('media_url')
-                else:
-                    media_url = item.get('media_url')
-                
-                media_item = {
-                    'id': item.get('id'),
-                    'caption': item.get('caption', ''),
-                    'media_type': media_type,
-                    'media_url': media_url,
-                    'permalink': item.get('permalink', settings.INSTAGRAM_PROFILE_URL),
-                    'timestamp': item.get('timestamp', ''),
-                }
-                
-                media_items.append(media_item)
-            
-            result = {
-                'media': media_items,
-                'profile_url': settings.INSTAGRAM_PROFILE_URL,
-                'has_token': True,
-                'count': len(media_items)
-            }
-            
-            # Cache for 5 minutes
-            cache.set(cache_key, result, settings.API_CACHE_TIMEOUT)
-            
-            return result
-        else:
-            logger.error(f"Instagram API error: {data.get('error', {}).get('message', 'Unknown error')}")
-            return {
-                'media': [],
-                'profile_url': settings.INSTAGRAM_PROFILE_URL,
-                'has_token': True,
-                'error': data.get('error', {}).get('message', 'API error')
-            }
+        with get_bulkhead('instagram').slot():
+            payload = sync_instagram_feed(access_token, limit)
+        return build_feed_result(payload, limit)
             
+    except BulkheadFull as e:
+        error = str(e)
     except requests.exceptions.Timeout:
         logger.error("Instagram API timeout")
-        return {
-            'media': [],
-            'profile_url': settings.INSTAGRAM_PROFILE_URL,
-            'has_token': True,
-            'error': 'API timeout'
-        }
+        error = 'API timeout'
+    except InstagramAPIError as e:
+        error = str(e)
     except requests.exceptions.RequestException as e:
         logger.error(f"Instagram API request error: {e}")
-        return {
-            'media': [],
-            'profile_url': settings.INSTAGRAM_PROFILE_URL,
-            'has_token': True,
-            'error': str(e)
-        }
+        error = str(e)
     except Exception as e:
         logger.error(f"Unexpected error fetching Instagram feed: {e}")
-        return {
-            'media': [],
-            'profile_url': settings.INSTAGRAM_PROFILE_URL,
-            'has_token': True,
-            'error': str(e)
-        }
+        error = str(e)
+    finally:
+        if locked:
+            _sync_lock.release()
+    
+    # Stale posts are better than none
+    if payload is not None and use_cache:
+        return build_feed_result(payload, limit)
+    return get_error_result(error)
+
+
+async def afetch_instagram_feed(access_token=None, limit=12, use_cache=True):
+    """
+    Async version of fetch_instagram_feed for ASGI views
+
+    Uses a non-blocking HTTP client so the upstream wait does not hold a
+    thread. Same arguments and return value as fetch_instagram_feed.
+    """
+    import httpx
+
+    # Get access token
+    if not access_token:
+        access_token = settings.INSTAGRAM_ACCESS_TOKEN
+
+    if not access_token:
+        return get_no_token_result()
+
+    with span('cache', key=INSTAGRAM_SNAPSHOT) as current:
+        payload = load_snapshot(INSTAGRAM_SNAPSHOT)
+        current.set(hit=payload is not None)
+    if use_cache and not feed_needs_sync(payload, limit):
+        return build_feed_result(payload, limit)
+
+    # Another request is already syncing: serve what we have
+    if payload is not None and not _sync_lock.acquire(blocking=False):
+        return build_feed_result(payload, limit)
+    locked = payload is not None
+
+    try:
+        async with get_bulkhead('instagram').aslot():
+            payload = await async_sync_instagram_feed(access_token, limit)
+        return build_feed_result(payload, limit)
+
+    except BulkheadFull as e:
+        error = str(e)
+    except httpx.TimeoutException:
+        logger.error("Instagram API timeout")
+        error = 'API timeout'
+    except InstagramAPIError as e:
+        error = str(e)
+    except httpx.HTTPError as e:
+        logger.error(f"Instagram API request error: {e}")
+        error = str(e)
+    except Exception as e:
+        logger.error(f"Unexpected error fetching Instagram feed: {e}")
+        error = str(e)
+    finally:
+        if locked:
+            _sync_lock.release()
+
+    # Stale posts are better than none
+    if payload is not None and use_cache:
+        return build_feed_result(payload, limit)
+    return get_error_result(error)
 
 
 def truncate_caption(caption, max_length=100):
@@ -0,0 +1,130 @@
+"""
+Instagram Media Mirror
+Download Instagram media once and serve local, content-addressed copies
+
+Instagram CDN URLs are signed and expire, so feeds that still point at them
+break after a while. Each new post is downloaded once during sync, stored
+under INSTAGRAM_MIRROR_ROOT as ``<sha256>.<ext>`` together with a square grid
+thumbnail ``<sha256>_<size>.jpg``, and the feed item is rewritten to the local
+URLs, with the placeholder of the thumbnail (see placeholders.py). Names
+change whenever the content does, so they can be cached forever.
+"""
+import hashlib
+import io
+import os
+from django.conf import settings
+from .placeholders import measure
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+    'GIF': 'gif',
+}
+
+
+def is_mirrored(item):
+    """
+    Whether a feed item already points at the local mirror
+    """
+    return bool(item.get('media_url', '').startswith(settings.INSTAGRAM_MIRROR_URL))
+
+
+def write_file(name, content):
+    """
+    Write a mirror file unless it already exists (same hash, same content)
+    """
+    path = os.path.join(settings.INSTAGRAM_MIRROR_ROOT, name)
+    if not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return settings.INSTAGRAM_MIRROR_URL + name
+
+
+def make_thumbnail(image, size):
+    """
+    Center-cropped square JPEG thumbnail
+
+    Returns:
+        bytes: Encoded thumbnail
+    """
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    thumb.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def mirror_item(item):
+    """
+    Download one media item and return it rewritten to local URLs
+
+    Args:
+        item: Normalized feed item (see normalize_instagram_item)
+
+    Returns:
+        dict: Item with local ``media_url`` and ``thumbnail_url``; the
+        Instagram URL is kept in ``remote_media_url``
+    """
+    import requests
+    from PIL import Image
+
+    response = requests.get(item['media_url'], timeout=30)
+    response.raise_for_status()
+    content = response.content
+
+    digest = hashlib.sha256(content).hexdigest()
+    image = Image.open(io.BytesIO(content))
+    extension = EXTENSIONS.get(image.format, 'jpg')
+    size = settings.INSTAGRAM_THUMBNAIL_SIZE
+    thumbnail = make_thumbnail(image, size)
+
+    return dict(
+        item,
+        media_url=write_file(f'{digest}.{extension}', content),
+        thumbnail_url=write_file(f'{digest}_{size}.jpg', thumbnail),
+        remote_media_url=item['media_url'],
+        placeholder=measure(thumbnail),
+    )
+
+
+def mirror_feed(media):
+    """
+    Mirror every feed item that is not local yet
+
+    Items that fail to download keep their Instagram URLs and are retried on
+    the next sync.
+
+    Returns:
+        list: Feed items, mirrored where possible
+    """
+    import requests
+
+    os.makedirs(settings.INSTAGRAM_MIRROR_ROOT, exist_ok=True)
+
+    mirrored = []
+    count = 0
+    for item in media:
+        if is_mirrored(item) or not item.get('media_url'):
+            mirrored.append(item)
+            continue
+        try:
+            mirrored.append(mirror_item(item))
+            count += 1
+        except (requests.exceptions.RequestException, OSError) as e:
+            logger.error(f"Cannot mirror Instagram media {item.get('id')}: {e}")
+            mirrored.append(item)
+
+    if count:
+        logger.info(f"Mirrored {count} Instagram media items")
+    return mirrored
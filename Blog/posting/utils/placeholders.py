@@ -0,0 +1,217 @@
+"""
+Image Placeholders
+Intrinsic size, average color and a tiny blurred preview of card images
+
+During a catalog refresh or Instagram sync every image not seen before is
+downloaded once and measured with Pillow. The result is stored per source in
+an 'image_meta_<source>' snapshot keyed by image ID, and copied into each
+item as ``placeholder``:
+
+    {'width': 800, 'height': 800, 'color': '#c8643c', 'lqip': 'data:image/jpeg;base64,...'}
+
+Templates render it with {% image_placeholder %} as width/height attributes
+and an inline background, so cards keep their size and show a preview before
+the image loads, without any work at request time.
+
+Only the refresh_catalog command measures (add_placeholders). Data fetched
+while serving a request gets the stored placeholders (apply_placeholders);
+images no refresh has measured yet go without one until the next refresh.
+"""
+import base64
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .snapshot import save_snapshot, load_snapshot
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Longest side of the inline preview (px); browsers scale and blur it
+PREVIEW_SIZE = 16
+
+# Seconds before an image that could not be read is tried again
+RETRY_FAILED_AFTER = 3600
+
+# Image keys that failed in this process -> monotonic time of the failure
+_failed = {}
+
+
+def measure(content):
+    """
+    Placeholder of an encoded image
+
+    Returns:
+        dict: {'width', 'height', 'color', 'lqip'}
+    """
+    from PIL import Image, ImageFilter, ImageOps
+
+    image = Image.open(io.BytesIO(content))
+    width, height = image.size
+    if image.getexif().get(0x0112) in (5, 6, 7, 8):
+        # Rotated by 90 degrees when displayed
+        width, height = height, width
+
+    # JPEGs can be decoded at 1/8 scale, plenty for a 16px preview
+    image.draft('RGB', (PREVIEW_SIZE * 4, PREVIEW_SIZE * 4))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    red, green, blue = image.resize((1, 1), Image.BOX).getpixel((0, 0))
+
+    preview = image.copy()
+    preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.BOX)
+    preview = preview.filter(ImageFilter.GaussianBlur(0.8))
+    buffer = io.BytesIO()
+    preview.save(buffer, 'JPEG', quality=40, optimize=True)
+
+    return {
+        'width': width,
+        'height': height,
+        'color': f'#{red:02x}{green:02x}{blue:02x}',
+        'lqip': 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
+
+
+def read_image(url):
+    """
+    Image bytes, from the local Instagram mirror or over HTTP
+    """
+    import requests
+
+    if url.startswith(settings.INSTAGRAM_MIRROR_URL):
+        path = os.path.join(settings.INSTAGRAM_MIRROR_ROOT, url[len(settings.INSTAGRAM_MIRROR_URL):])
+        with open(path, 'rb') as f:
+            return f.read()
+
+    response = requests.get(url, timeout=15)
+    response.raise_for_status()
+    return response.content
+
+
+def fetch_placeholder(url):
+    """
+    Download and measure one image
+
+    Returns:
+        dict or None: Placeholder, None if the image cannot be read
+    """
+    import requests
+
+    try:
+        return measure(read_image(url))
+    except (requests.exceptions.RequestException, OSError, ValueError) as e:
+        # PIL.UnidentifiedImageError is an OSError
+        logger.warning(f"Cannot measure image {url}: {e}")
+        return None
+
+
+def add_placeholders(items, source, key_of, url_of):
+    """
+    Copy stored placeholders into items, measuring images not seen before
+
+    At most IMAGE_PLACEHOLDER_MAX_NEW images are downloaded per call, the
+    rest on the next refresh. Images that fail are retried after an hour.
+
+    Args:
+        items: Products or feed items
+        source: 'shopee' or 'instagram', names the snapshot
+        key_of: Image ID of an item
+        url_of: Image URL of an item (None if it has no image)
+
+    Returns:
+        list: Items, with ``placeholder`` where known
+    """
+    if not settings.IMAGE_PLACEHOLDERS:
+        return items
+
+    snapshot = f'image_meta_{source}'
+    stored = load_snapshot(snapshot)
+    known = dict(stored['data']) if stored else {}
+
+    now = time.monotonic()
+    missing = {}
+    for item in items:
+        if not url_of(item):
+            continue
+        key = key_of(item)
+        if item.get('placeholder'):
+            # Measured on the way in (e.g. by the Instagram mirror)
+            known[key] = item['placeholder']
+        elif key not in known and now - _failed.get(key, -RETRY_FAILED_AFTER) >= RETRY_FAILED_AFTER:
+            missing.setdefault(key, url_of(item))
+
+    added = 0
+    missing = list(missing.items())[:settings.IMAGE_PLACEHOLDER_MAX_NEW]
+    if missing:
+        with ThreadPoolExecutor(max_workers=settings.IMAGE_PLACEHOLDER_CONCURRENCY) as pool:
+            placeholders = pool.map(fetch_placeholder, [url for _, url in missing])
+            for (key, _), placeholder in zip(missing, placeholders):
+                if placeholder:
+                    known[key] = placeholder
+                    _failed.pop(key, None)
+                    added += 1
+                else:
+                    _failed[key] = now
+        logger.info(f"Measured {added}/{len(missing)} new {source} images")
+
+    # Only images still in use are kept
+    in_use = {key_of(item): known[key_of(item)] for item in items if url_of(item) and key_of(item) in known}
+    if stored is None or in_use != stored['data']:
+        save_snapshot(snapshot, in_use)
+
+    return [
+        dict(item, placeholder=in_use[key_of(item)]) if url_of(item) and key_of(item) in in_use else item
+        for item in items
+    ]
+
+
+def apply_placeholders(items, source, key_of, url_of):
+    """
+    Copy stored placeholders into items, never downloading an image
+
+    Same arguments as add_placeholders, for the request path.
+    """
+    if not settings.IMAGE_PLACEHOLDERS:
+        return items
+
+    stored = load_snapshot(f'image_meta_{source}')
+    known = stored['data'] if stored else {}
+    return [
+        dict(item, placeholder=known[key_of(item)])
+        if not item.get('placeholder') and url_of(item) and key_of(item) in known else item
+        for item in items
+    ]
+
+
+def has_unmeasured(items, key_of, url_of):
+    """
+    Whether add_placeholders would measure any of these items
+
+    Items with an image but no placeholder count, unless their image failed
+    in this process less than RETRY_FAILED_AFTER seconds ago.
+    """
+    if not settings.IMAGE_PLACEHOLDERS:
+        return False
+    now = time.monotonic()
+    return any(
+        url_of(item) and not item.get('placeholder')
+        and now - _failed.get(key_of(item), -RETRY_FAILED_AFTER) >= RETRY_FAILED_AFTER
+        for item in items
+    )
+
+
+def shopee_image_id(product):
+    """
+    Shopee image ID of a product, the last part of its CDN URL
+    """
+    return (product.get('image') or '').rsplit('/', 1)[-1]
+
+
+def instagram_image_url(media):
+    """
+    The image a feed item is displayed with
+    """
+    return media.get('thumbnail_url') or media.get('media_url')
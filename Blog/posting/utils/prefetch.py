@@ -0,0 +1,176 @@
+"""
+Product Page Prefetch
+Warm the next product_list window in the background
+
+Visitors on /products/page/N/ usually open page N+1 next. When the catalog
+is fetched per request (no usable snapshot), the view schedules a background
+fetch of the next window so it is already cached when they get there.
+
+Prefetching costs an upstream call, so it is bounded (PREFETCH_CONCURRENCY
+workers, at most as many queued) and tracked: a prefetched window counts as a
+hit when it is requested while still cached, as a miss when it expires unused.
+If the hit rate over the last PREFETCH_WINDOW outcomes drops below
+PREFETCH_MIN_HIT_RATE, prefetching pauses for PREFETCH_COOLDOWN seconds.
+
+Browser prefetches (``<link rel="prefetch">``, speculation rules) are not
+visits: they neither score a warmed window nor warm the one after it.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from .catalog import get_usable_snapshot, SHOPEE_SNAPSHOT
+from .shopee_api import fetch_shopee_products, resolve_shop_id, window_cache_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_pending = set()        # (limit, offset) being fetched
+_prefetched = {}        # (limit, offset) -> time it was warmed
+_outcomes = deque()     # True (hit) / False (expired unused)
+_paused_until = 0.0
+
+
+def get_executor():
+    """
+    Shared worker pool, created on first use
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PREFETCH_CONCURRENCY,
+            thread_name_prefix='prefetch',
+        )
+    return _executor
+
+
+def record_outcome(hit):
+    """
+    Add a hit/miss and pause prefetching when it does not pay off
+    (caller holds _lock)
+    """
+    global _paused_until
+
+    _outcomes.append(hit)
+    while len(_outcomes) > settings.PREFETCH_WINDOW:
+        _outcomes.popleft()
+
+    if len(_outcomes) < settings.PREFETCH_WINDOW:
+        return
+    hit_rate = sum(_outcomes) / len(_outcomes)
+    if hit_rate < settings.PREFETCH_MIN_HIT_RATE:
+        _paused_until = time.monotonic() + settings.PREFETCH_COOLDOWN
+        _outcomes.clear()
+        logger.info(
+            f"Prefetch hit rate {hit_rate:.0%} below {settings.PREFETCH_MIN_HIT_RATE:.0%}, "
+            f"pausing for {settings.PREFETCH_COOLDOWN}s"
+        )
+
+
+def is_browser_prefetch(request):
+    """
+    Whether a request is a speculative browser fetch rather than a visit
+
+    Chromium sends ``Sec-Purpose: prefetch`` (``prefetch;prerender`` for
+    prerenders), Firefox and older browsers ``Purpose: prefetch``.
+    """
+    purpose = request.headers.get('Sec-Purpose') or request.headers.get('Purpose') or ''
+    return 'prefetch' in purpose.lower()
+
+
+def note_request(limit, offset):
+    """
+    Tell the tracker a product window is being served
+
+    Call this before serving every product_list page so prefetched windows
+    are scored as hits, and ones that expired unused as misses.
+    """
+    now = time.monotonic()
+    with _lock:
+        warmed_at = _prefetched.pop((limit, offset), None)
+        if warmed_at is not None:
+            record_outcome(now - warmed_at <= settings.API_CACHE_TIMEOUT)
+
+        expired = [key for key, at in _prefetched.items() if now - at > settings.API_CACHE_TIMEOUT]
+        for key in expired:
+            del _prefetched[key]
+            record_outcome(False)
+
+
+def is_cached(limit, offset):
+    """
+    Whether a product window is already in the cache
+    """
+    shop_id = resolve_shop_id()
+    return bool(shop_id) and cache.get(window_cache_key(shop_id, offset)) is not None
+
+
+def warm(limit, offset):
+    """
+    Fetch one product window into the cache (runs in a worker thread)
+    """
+    key = (limit, offset)
+    try:
+        result = fetch_shopee_products(limit=limit, offset=offset)
+        if result.get('products') and not result.get('error'):
+            with _lock:
+                _prefetched[key] = time.monotonic()
+    except Exception as e:
+        logger.error(f"Prefetch of products {offset}-{offset + limit} failed: {e}")
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def schedule_prefetch(limit, offset):
+    """
+    Warm a product window in the background if that is likely to pay off
+
+    Returns:
+        bool: True if a fetch was scheduled
+    """
+    if not settings.PREFETCH_ENABLED:
+        return False
+
+    # Snapshot-backed pages are already a slice away
+    if get_usable_snapshot(SHOPEE_SNAPSHOT) is not None:
+        return False
+
+    key = (limit, offset)
+    with _lock:
+        if time.monotonic() < _paused_until:
+            return False
+        if key in _pending or key in _prefetched:
+            return False
+        if len(_pending) >= settings.PREFETCH_CONCURRENCY * 2:
+            return False
+        _pending.add(key)
+
+    if is_cached(limit, offset):
+        with _lock:
+            _pending.discard(key)
+        return False
+
+    # Run in the request's context so logs and spans keep its trace ID
+    get_executor().submit(contextvars.copy_context().run, warm, limit, offset)
+    return True
+
+
+def get_prefetch_stats():
+    """
+    Current tracker state, served by status_api
+    """
+    with _lock:
+        return {
+            'pending': len(_pending),
+            'warm': len(_prefetched),
+            'hit_rate': sum(_outcomes) / len(_outcomes) if _outcomes else None,
+            'samples': len(_outcomes),
+            'paused': time.monotonic() < _paused_until,
+        }
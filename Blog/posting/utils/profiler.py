@@ -0,0 +1,223 @@
+"""
+Request Profiler
+Sampling profiler for single requests, stored as JSON on disk
+
+cProfile only sees the thread it runs in, but async views run on an event
+loop thread that asgiref starts under WSGI. The sampler instead reads the
+stacks of the threads working for the profiled request each PROFILER_INTERVAL
+seconds: the one that started it and every thread that calls profile_thread()
+in the request's context (spans and upstream attempts do), so sync views,
+async views and the upstream waits they spend their time in all show up,
+while concurrent requests and background jobs stay out.
+
+Stacks are stored collapsed (``outer;inner;leaf`` -> sample count), the
+format flame graph tools read.
+"""
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that turn the profiler on (see middleware/profiler.py)
+PROFILER_PARAMS = ('profile', 'profile_mode')
+
+_current_profiler = contextvars.ContextVar('current_profiler', default=None)
+
+
+def profile_thread():
+    """
+    Add the calling thread to the profile of the request it works for
+
+    A no-op outside a profiled request.
+    """
+    profiler = _current_profiler.get()
+    if profiler is not None:
+        profiler.thread_ids.add(threading.get_ident())
+
+
+class SamplingProfiler:
+    """
+    Collect thread stacks in a background thread until stopped
+
+    Usage:
+        profiler = SamplingProfiler(0.005)
+        profiler.start()
+        ...
+        profiler.stop()
+        profiler.stacks  # Counter of collapsed stacks
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.project_names = set()
+        self.thread_ids = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self._project_dir = str(settings.BASE_DIR)
+
+    def start(self):
+        """
+        Start sampling the calling thread and the threads it hands work to
+        """
+        self.thread_ids.add(threading.get_ident())
+        self._token = _current_profiler.set(self)
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        _current_profiler.reset(self._token)
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            thread_ids = self.thread_ids.copy()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in thread_ids:
+                    continue
+                stack = self._collapse(frame)
+                if stack:
+                    self.stacks[stack] += 1
+            self.samples += 1
+
+    def _collapse(self, frame):
+        """
+        ``outer;...;leaf`` for a thread, None if it runs no project code
+        """
+        names = []
+        in_project = False
+        while frame is not None:
+            code = frame.f_code
+            filename = code.co_filename
+            if filename.startswith(self._project_dir) and filename != __file__:
+                in_project = True
+                name = f'{code.co_name} ({os.path.relpath(filename, self._project_dir)}:{code.co_firstlineno})'
+                self.project_names.add(name)
+            else:
+                name = f'{code.co_name} ({os.path.basename(filename)}:{code.co_firstlineno})'
+            names.append(name)
+            frame = frame.f_back
+        if not in_project:
+            return None
+        return ';'.join(reversed(names))
+
+
+def count_functions(stacks):
+    """
+    Samples spent in each function (self) and under it (total)
+
+    Returns:
+        tuple: (self Counter, total Counter)
+    """
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        names = stack.split(';')
+        own[names[-1]] += count
+        for name in set(names):
+            total[name] += count
+    return own, total
+
+
+def profiled_url(request):
+    """
+    URL of a profiled request without the parameters that enabled the
+    profiler, so the PROFILER_TOKEN never ends up on disk
+    """
+    query = request.GET.copy()
+    for name in PROFILER_PARAMS:
+        query.pop(name, None)
+    return f'{request.path}?{query.urlencode()}' if query else request.path
+
+
+def build_profile(request, response, profiler, wall_time):
+    """
+    JSON-serializable profile of one request
+    """
+    return {
+        'url': profiled_url(request),
+        'method': request.method,
+        'status': response.status_code,
+        'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'wall_ms': round(wall_time * 1000, 1),
+        'interval_ms': profiler.interval * 1000,
+        'samples': profiler.samples,
+        'stacks': dict(profiler.stacks),
+        'project_functions': sorted(profiler.project_names),
+    }
+
+
+def save_profile(profile):
+    """
+    Write a profile to PROFILER_DIR
+
+    Returns:
+        str or None: File name, None if the directory is not writable
+    """
+    slug = profile['url'].strip('/').split('?')[0].replace('/', '_') or 'root'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{os.getpid()}.json"
+    try:
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        with open(os.path.join(settings.PROFILER_DIR, name), 'w') as f:
+            json.dump(profile, f)
+    except OSError as e:
+        logger.error(f"Cannot save profile for {profile['url']}: {e}")
+        return None
+    return name
+
+
+def load_profile(name):
+    """
+    Read a stored profile by file name
+    """
+    with open(os.path.join(settings.PROFILER_DIR, name)) as f:
+        return json.load(f)
+
+
+def list_profiles():
+    """
+    Stored profile file names, newest first
+    """
+    try:
+        names = os.listdir(settings.PROFILER_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((name for name in names if name.endswith('.json')), reverse=True)
+
+
+def format_summary(profile, limit=20):
+    """
+    Plain-text report of a profile: project functions by total time, then
+    all functions by self time (where threads actually were)
+
+    Times add up over threads, so a thread waiting on another counts too.
+    """
+    interval_ms = profile['interval_ms']
+    own, total = count_functions(profile['stacks'])
+    project = set(profile['project_functions'])
+
+    def row(name):
+        return f"{total[name] * interval_ms:9.1f}  {own[name] * interval_ms:8.1f}  {name}"
+
+    header = f"{'total ms':>9}  {'self ms':>8}  function"
+    lines = [
+        f"{profile['method']} {profile['url']} -> {profile['status']} "
+        f"in {profile['wall_ms']} ms ({profile['samples']} samples every {interval_ms:g} ms)",
+        '',
+        'Project code',
+        header,
+    ]
+    lines += [row(name) for name, _ in total.most_common() if name in project][:limit]
+    lines += ['', 'Hottest functions', header]
+    lines += [row(name) for name, count in own.most_common(limit)]
+    return '\n'.join(lines)
@@ -0,0 +1,192 @@
+"""
+Related Products
+Top-k similar products per item, computed once per catalog version
+
+Similarity combines:
+    - TF-IDF cosine of the normalized name tokens
+    - same Shopee category (``catid``)
+    - price band (log-scale buckets, so Rp 50.000 and Rp 60.000 are close)
+
+Candidates come from an inverted index over name tokens; tokens found in more
+than RELATED_MAX_DF of the catalog ("wanita", "murah") still weigh in the
+cosine but do not generate candidates, which keeps a few thousand products
+well under a second. Products with too few name matches are topped up with
+best sellers of their category and price band, then of their category.
+
+Results are stored as one flat integer array of catalog positions (k per
+product, -1 padded) in the 'related_products' snapshot next to the catalog,
+so a lookup is a slice.
+"""
+import base64
+import heapq
+import math
+import time
+from array import array
+from collections import Counter
+from django.conf import settings
+from .snapshot import save_snapshot, load_snapshot
+from .suggest import normalize
+import logging
+
+logger = logging.getLogger(__name__)
+
+RELATED_SNAPSHOT = 'related_products'
+
+NAME_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.3
+PRICE_WEIGHT = 0.2
+
+# Best sellers kept per category/price bucket for topping up; also the
+# posting length below which a token always generates candidates
+BUCKET_FILL = 50
+
+# (catalog version, k, neighbors array) loaded in this process
+_loaded = (None, 0, None)
+
+
+def price_band(price):
+    """
+    Log-scale price bucket, about 25% wide
+    """
+    return int(math.log(price, 1.25)) if price and price > 0 else -1
+
+
+def tfidf_vectors(products):
+    """
+    Unit-length TF-IDF vectors of the product names
+
+    Returns:
+        tuple: ([{token: weight}], {token: document frequency})
+    """
+    documents = [Counter(normalize(product['name']).split()) for product in products]
+    frequency = Counter(token for document in documents for token in document)
+    count = len(products)
+
+    vectors = []
+    for document in documents:
+        vector = {
+            token: (1 + math.log(tf)) * math.log((1 + count) / (1 + frequency[token]))
+            for token, tf in document.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({token: weight / norm for token, weight in vector.items()})
+    return vectors, frequency
+
+
+def compute_related(products, k=None):
+    """
+    k most similar products for every product
+
+    Args:
+        products: Catalog products (with name, price, catid)
+        k: Neighbors per product (default RELATED_K)
+
+    Returns:
+        array: Flat ``array('i')`` of len(products) * k catalog positions,
+        best first, -1 where fewer than k neighbors were found
+    """
+    k = k or settings.RELATED_K
+    count = len(products)
+    vectors, frequency = tfidf_vectors(products)
+    max_df = max(BUCKET_FILL, int(count * settings.RELATED_MAX_DF))
+
+    postings = {}
+    for position, vector in enumerate(vectors):
+        for token in vector:
+            if frequency[token] <= max_df:
+                postings.setdefault(token, []).append(position)
+
+    categories = [product.get('catid') for product in products]
+    bands = [price_band(product.get('price')) for product in products]
+
+    # Best sellers per (category, price band) and per category, for topping up
+    buckets = {}
+    by_popularity = sorted(range(count), key=lambda position: -products[position].get('historical_sold', 0))
+    for position in by_popularity:
+        for key in ((categories[position], bands[position]), (categories[position],)):
+            bucket = buckets.setdefault(key, [])
+            if len(bucket) < BUCKET_FILL:
+                bucket.append(position)
+
+    neighbors = array('i', [-1]) * (count * k)
+    for position, vector in enumerate(vectors):
+        # Name similarity through shared (not too common) tokens
+        scores = {}
+        for token, weight in vector.items():
+            for other in postings.get(token, ()):
+                if other != position:
+                    scores[other] = scores.get(other, 0.0) + weight * vectors[other][token]
+
+        for key in ((categories[position], bands[position]), (categories[position],)):
+            if len(scores) >= k:
+                break
+            for other in buckets.get(key, ()):
+                if other != position and other not in scores:
+                    scores[other] = 0.0
+
+        category, band = categories[position], bands[position]
+        ranked = heapq.nlargest(k, scores, key=lambda other: (
+            NAME_WEIGHT * scores[other]
+            + (CATEGORY_WEIGHT if category is not None and categories[other] == category else 0.0)
+            + PRICE_WEIGHT * max(0.0, 1 - abs(bands[other] - band) / 2)
+        ))
+        neighbors[position * k:position * k + len(ranked)] = array('i', ranked)
+
+    return neighbors
+
+
+def refresh_related(payload):
+    """
+    Compute and store related products for a catalog snapshot
+
+    Returns:
+        dict: Saved 'related_products' snapshot payload
+    """
+    products = payload['data']['products']
+    k = settings.RELATED_K
+
+    started = time.perf_counter()
+    neighbors = compute_related(products, k)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Related products: {len(products)} products, k={k} in {elapsed * 1000:.0f} ms")
+
+    return save_snapshot(RELATED_SNAPSHOT, {
+        'catalog_version': payload['version'],
+        'k': k,
+        'neighbors': base64.b64encode(neighbors.tobytes()).decode('ascii'),
+    })
+
+
+def get_neighbors(payload):
+    """
+    Neighbor array for a catalog snapshot, decoded once per version
+
+    Never computed here: the refresher stores it with each catalog version.
+
+    Returns:
+        tuple: (k, array) or (0, None) if not stored for this version yet
+    """
+    global _loaded
+
+    version, k, neighbors = _loaded
+    if version == payload['version']:
+        return k, neighbors
+
+    stored = load_snapshot(RELATED_SNAPSHOT)
+    if stored is None or stored['data']['catalog_version'] != payload['version']:
+        return 0, None
+
+    neighbors = array('i')
+    neighbors.frombytes(base64.b64decode(stored['data']['neighbors']))
+    _loaded = (payload['version'], stored['data']['k'], neighbors)
+    return stored['data']['k'], neighbors
+
+
+def related_positions(payload, position):
+    """
+    Catalog positions of the products related to the one at ``position``
+    """
+    k, neighbors = get_neighbors(payload)
+    if neighbors is None:
+        return []
+    return [other for other in neighbors[position * k:(position + 1) * k] if other >= 0]
@@ -2,9 +2,20 @@
 Shopee API Utilities
 Fetch product data from Shopee store
 """
-import requests
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.cache import cache
+from .bulkhead import BulkheadFull, get_bulkhead
+from .hedging import upstream_get, aupstream_get
+from .http_client import get_async_client
+from .placeholders import apply_placeholders, shopee_image_id
+from .snapshot import save_snapshot, load_snapshot
+from .tracing import span
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,10 +78,49 @@ def get_static_products():
     ]
 
 
-def get_shop_id_from_username(username='modelmanis34'):
+# Shop IDs looked up from usernames; a shop never changes its ID, so they are
+# stored for good (in this process and in a snapshot for the next ones)
+SHOP_IDS_SNAPSHOT = 'shopee_shop_ids'
+_shop_ids = {}
+_shop_ids_lock = threading.Lock()
+
+
+def get_shops():
+    """
+    Configured Shopee shops, main shop first
+
+    Returns:
+        list: [{'username': str, 'shopid': str or None}]
+    """
+    shops = settings.SHOPEE_SHOPS
+    if not shops:
+        return [{'username': 'modelmanis34', 'shopid': settings.SHOPEE_SHOP_ID}]
+    return shops
+
+
+def get_shop_id_from_username(username=None):
     """
     Get Shopee shop ID from username/slug
+
+    Resolved IDs are stored permanently, so each username is looked up on
+    Shopee once. Failures are not stored and are retried next time.
+
+    Args:
+        username: Shop username (default: the main shop)
     """
+    import requests
+
+    username = username or get_shops()[0]['username']
+
+    if _shop_ids.get(username):
+        return _shop_ids[username]
+
+    stored = load_snapshot(SHOP_IDS_SNAPSHOT)
+    if stored and stored['data'].get(username):
+        _shop_ids[username] = stored['data'][username]
+        return _shop_ids[username]
+
+    shop_id = None
     try:
         url = f'https://shopee.co.id/api/v4/shop/get_shop_detail'
         params = {'username': username}
@@ -87,148 +137,685 @@ def get_shop_id_from_username(username='modelmanis34'):
         data = response.json()
         if data.get('error') == 0 and data.get('data'):
             shop_id = data['data'].get('shopid')
-            return shop_id
     except Exception as e:
-        logger.error(f"Error getting shop ID: {e}")
-    
-    return None
+        logger.error(f"Error getting shop ID of {username}: {e}")
+
+    if shop_id:
+        with _shop_ids_lock:
+            _shop_ids[username] = shop_id
+            stored = load_snapshot(SHOP_IDS_SNAPSHOT)
+            save_snapshot(SHOP_IDS_SNAPSHOT, dict(stored['data'] if stored else {}, **{username: shop_id}))
+        logger.info(f"Resolved Shopee shop {username}: {shop_id}")
+    return shop_id
 
 
-def fetch_shopee_products(shop_id=None, limit=50, offset=0):
+def resolve_shop_id(shop_id=None, username=None):
     """
-    Fetch products from Shopee API via Cloudflare Worker Proxy
-    
+    Resolve the Shopee shop ID to use for a request
+
+    The main shop is always get_shops()[0], whose ID comes from SHOPEE_SHOPS
+    or is looked up by its username.
+
     Args:
-        shop_id: Shopee shop ID (if None, try to get from env or resolve from username)
-        limit: Number of products to fetch (max 50 per request)
-        offset: Pagination offset
-    
+        shop_id: Explicit shop ID (if None, resolve the shop by username)
+        username: Shop to resolve (default: the main shop)
+
     Returns:
-        dict: {
-            'products': [...],
-            'total': int,
-            'has_more': bool
-        }
+        Shop ID or None if it cannot be resolved
     """
-    # Get shop ID
-    if not shop_id:
-        shop_id = settings.SHOPEE_SHOP_ID
-    
+    if shop_id:
+        return shop_id
+
+    if username is None:
+        main = get_shops()[0]
+        shop_id, username = main['shopid'], main['username']
+
     if not shop_id:
         # Try to resolve from username
-        shop_id = get_shop_id_from_username('modelmanis34')
-        if not shop_id:
-            logger.error("Cannot resolve Shopee shop ID")
-            return get_fallback_result(limit)
-    
+        shop_id = get_shop_id_from_username(username)
+
+    return shop_id
+
+
+# item_basic fields normalize_shopee_item reads. The proxy's compact format
+# (format=compact) sends only these, as one row of values per item.
+ITEM_BASIC_FIELDS = (
+    'itemid', 'shopid', 'name', 'catid', 'price', 'price_min', 'price_max', 'image', 'images',
+    'stock', 'sold', 'historical_sold', 'liked_count', 'item_rating',
+)
+
+
+def compact_search_items(data):
+    """
+    Trim a search_items payload to the compact proxy format
+
+    Returns:
+        dict: {'error', 'error_msg', 'total_count', 'nomore', 'fields': [...], 'rows': [[...]]}
+    """
+    rows = []
+    for item in data.get('items') or []:
+        item_basic = dict(item.get('item_basic') or {})
+        rating = item_basic.get('item_rating')
+        if rating:
+            item_basic['item_rating'] = {'rating_star': rating.get('rating_star', 0)}
+        rows.append([item_basic.get(field) for field in ITEM_BASIC_FIELDS])
+
+    return {
+        'error': data.get('error'),
+        'error_msg': data.get('error_msg'),
+        'total_count': data.get('total_count'),
+        'nomore': data.get('nomore', False),
+        'fields': list(ITEM_BASIC_FIELDS),
+        'rows': rows,
+    }
+
+
+def get_item_basics(data):
+    """
+    The item_basic dicts of a search_items payload, full or compact
+    """
+    if 'fields' in data:
+        fields = data['fields']
+        # Missing values are sent as null, leave them out so defaults apply
+        return [
+            {field: value for field, value in zip(fields, row) if value is not None}
+            for row in data.get('rows') or []
+        ]
+    return [item.get('item_basic', {}) for item in data.get('items') or []]
+
+
+def build_shopee_request(shop_id, limit, offset):
+    """
+    Build URL, query params and headers for a product search request
+
+    Returns:
+        tuple: (url, params, headers)
+    """
+    # Try Cloudflare Worker Proxy first (if configured)
+    proxy_url = getattr(settings, 'SHOPEE_PROXY', None)
+
+    if proxy_url:
+        logger.info("Using Cloudflare Worker Proxy for Shopee API")
+        url = proxy_url
+        params = {
+            'shopid': shop_id,
+            'limit': limit,
+            'offset': offset,
+            # Only the fields we use (ignored by proxies without it)
+            'format': 'compact',
+        }
+        headers = {
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip',
+        }
+    else:
+        # Fallback to direct API (will likely get 403)
+        logger.warning("SHOPEE_PROXY not configured, using direct API (may get blocked)")
+        url = 'https://shopee.co.id/api/v4/search/search_items'
+        params = {
+            'by': 'relevancy',
+            'limit': limit,
+            'match_id': shop_id,
+            'newest': offset,
+            'order': 'desc',
+            'page_type': 'shop',
+            'scenario': 'PAGE_OTHERS',
+            'version': 2
+        }
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36',
+            'Accept': 'application/json',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Cache-Control': 'no-cache',
+            'Referer': f'https://shopee.co.id/shop/{shop_id}/',
+        }
+
+    return url, params, headers
+
+
+def normalize_shopee_item(item_basic, shop_id):
+    """
+    Convert a Shopee ``item_basic`` payload to the product dict used by templates
+    """
+    # Convert price (Shopee price is in cents)
+    price = item_basic.get('price', 0) / 100000
+
+    # Get main image
+    image_id = item_basic.get('image', '')
+    image_url = build_shopee_image_url(image_id, shop_id) if image_id else None
+
+    return {
+        'itemid': item_basic.get('itemid'),
+        'shopid': item_basic.get('shopid', shop_id),
+        'name': item_basic.get('name', ''),
+        'catid': item_basic.get('catid'),
+        'price': price,
+        'price_min': item_basic.get('price_min', 0) / 100000,
+        'price_max': item_basic.get('price_max', 0) / 100000,
+        'image': image_url,
+        'images': [build_shopee_image_url(img, shop_id) for img in item_basic.get('images', [])],
+        'stock': item_basic.get('stock', 0),
+        'sold': item_basic.get('sold', 0),
+        'historical_sold': item_basic.get('historical_sold', 0),
+        'liked_count': item_basic.get('liked_count', 0),
+        'rating_star': item_basic.get('item_rating', {}).get('rating_star', 0),
+        'url': build_shopee_product_url(shop_id, item_basic.get('itemid'), item_basic.get('name', '')),
+    }
+
+
+def parse_shopee_response(data, shop_id, limit):
+    """
+    Parse a search_items payload into the fetch result dict
+
+    Returns:
+        dict or None: Result dict, or None if Shopee reported an error
+    """
+    if data.get('error') != 0:
+        logger.error(f"Shopee API error: {data.get('error_msg', 'Unknown error')}")
+        return None
+
+    items = get_item_basics(data)
+    products = [normalize_shopee_item(item_basic, shop_id) for item_basic in items]
+
+    return {
+        'products': products,
+        'total': data.get('total_count', len(products)),
+        'has_more': len(items) >= limit
+    }
+
+
+# Upstream pages are fetched and cached as aligned windows of this size
+# (Shopee's maximum) whatever slice a caller asks for, so there are at most
+# total / WINDOW_SIZE cache keys per shop
+WINDOW_SIZE = 50
+
+
+def window_cache_key(shop_id, offset):
+    """
+    Cache key of the window starting at ``offset`` (a multiple of WINDOW_SIZE)
+    """
+    return f'shopee_products_{shop_id}_{WINDOW_SIZE}_{offset}'
+
+
+def canonical_windows(limit, offset, total=None):
+    """
+    Clamp a requested slice and list the windows covering it
+
+    Args:
+        limit: Number of products, clamped to 1..WINDOW_SIZE
+        offset: Index of the first product, at least 0
+        total: Known number of products (None if unknown); windows past it
+               are not requested, nor past SHOPEE_CRAWL_MAX_PAGES windows
+
+    Returns:
+        tuple: (limit, offset, [window offsets], past_end), past_end being
+        True (and the windows empty) when offset is beyond the last product
+    """
+    limit = max(1, min(int(limit), WINDOW_SIZE))
+    offset = max(0, int(offset))
+    end = settings.SHOPEE_CRAWL_MAX_PAGES * WINDOW_SIZE
+    if total:
+        end = min(end, total)
+    if offset >= end:
+        return limit, offset, [], True
+    first = offset // WINDOW_SIZE * WINDOW_SIZE
+    return limit, offset, list(range(first, min(offset + limit, end), WINDOW_SIZE)), False
+
+
+def out_of_range_result(total):
+    """
+    Result for a slice past the end of the catalog, marked ``out_of_range``
+    """
+    return {'products': [], 'total': total or 0, 'has_more': False, 'out_of_range': True}
+
+
+def merge_windows(results, limit, offset):
+    """
+    Cut the slice [offset, offset + limit) out of consecutive window results
+
+    Returns:
+        dict: fetch_shopee_products result, with the error/stale flags of
+        any window
+    """
+    first = offset // WINDOW_SIZE * WINDOW_SIZE
+    products = [product for result in results for product in result.get('products', [])]
+    start = offset - first
+    merged = dict(results[0], products=products[start:start + limit])
+    merged['has_more'] = results[-1].get('has_more', False) or len(products) > start + limit
+    for result in results:
+        if result.get('error'):
+            merged['error'] = result['error']
+        if result.get('stale'):
+            merged['stale'] = True
+    return merged
+
+
+def window_cache_entries(shop_id, cache_key, result):
+    """
+    What to cache for a window fetched from upstream
+
+    Good windows are kept for API_CACHE_TIMEOUT, with a stale copy and the
+    shop's total. Empty windows and Shopee error payloads are cached only
+    for API_NEGATIVE_CACHE_TIMEOUT, so they are not asked for again on every
+    request but recover quickly.
+
+    Returns:
+        list: (key, value, timeout) tuples
+    """
+    if result.get('error') or not result['products']:
+        entries = [(cache_key, result, settings.API_NEGATIVE_CACHE_TIMEOUT)]
+    else:
+        entries = [
+            (cache_key, result, settings.API_CACHE_TIMEOUT),
+            (f'stale_{cache_key}', result, settings.API_STALE_TIMEOUT),
+        ]
+    if not result.get('error') and result['total']:
+        entries.append((f'shopee_total_{shop_id}', result['total'], settings.API_STALE_TIMEOUT))
+    return entries
+
+
+def fetch_shopee_window(shop_id, offset, use_cache=True):
+    """
+    Fetch one WINDOW_SIZE window from Shopee, through the cache
+
+    After a failed request the shop is marked down for
+    API_NEGATIVE_CACHE_TIMEOUT: windows missing from the cache are then
+    served stale (or static) at once instead of waiting on upstream again.
+
+    Returns:
+        dict: {'products': [...], 'total': int, 'has_more': bool}
+    """
+    import requests
+
     # Check cache
-    cache_key = f'shopee_products_{shop_id}_{limit}_{offset}'
-    cached_data = cache.get(cache_key)
+    cache_key = window_cache_key(shop_id, offset)
+    with span('cache', key=cache_key) as current:
+        cached_data = cache.get(cache_key) if use_cache else None
+        current.set(hit=bool(cached_data))
     if cached_data:
         return cached_data
+
+    down_key = f'shopee_down_{shop_id}'
+    if use_cache and cache.get(down_key):
+        return get_stale_result(cache.get(f'stale_{cache_key}'), WINDOW_SIZE)
     
     try:
-        # Try Cloudflare Worker Proxy first (if configured)
-        proxy_url = getattr(settings, 'SHOPEE_PROXY', None)
+        url, params, headers = build_shopee_request(shop_id, WINDOW_SIZE, offset)
         
-        if proxy_url:
-            logger.info("Using Cloudflare Worker Proxy for Shopee API")
-            url = proxy_url
-            params = {
-                'shopid': shop_id,
-                'limit': limit,
-                'offset': offset
-            }
-            headers = {
-                'Accept': 'application/json',
-            }
-        else:
-            # Fallback to direct API (will likely get 403)
-            logger.warning("SHOPEE_PROXY not configured, using direct API (may get blocked)")
-            url = 'https://shopee.co.id/api/v4/search/search_items'
-            params = {
-                'by': 'relevancy',
-                'limit': limit,
-                'match_id': shop_id,
-                'newest': offset,
-                'order': 'desc',
-                'page_type': 'shop',
-                'scenario': 'PAGE_OTHERS',
-                'version': 2
-            }
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36',
-                'Accept': 'application/json',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Cache-Control': 'no-cache',
-                'Referer': f'https://shopee.co.id/shop/{shop_id}/',
-            }
+        with get_bulkhead('shopee').slot(), span('upstream', service='shopee', url=url) as current:
+            response = upstream_get('shopee', lambda: requests.get(url, params=params, headers=headers, timeout=15))
+            current.set(status=response.status_code, bytes=len(response.content))
+            response.raise_for_status()
         
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        response.raise_for_status()
+        with span('normalize', service='shopee'):
+            result = parse_shopee_response(response.json(), shop_id, WINDOW_SIZE)
+        if result is None:
+            result = {'products': [], 'total': 0, 'has_more': False, 'error': 'api_error'}
+        else:
+            result['products'] = apply_placeholders(
+                result['products'], 'shopee', shopee_image_id, lambda product: product.get('image'),
+            )
         
-        data = response.json()
+        # Cache for 5 minutes, keep a stale copy for when upstream is busy or down
+        for key, value, timeout in window_cache_entries(shop_id, cache_key, result):
+            cache.set(key, value, timeout)
         
-        if data.get('error') == 0:
-            items = data.get('items', [])
-            products = []
-            
-            for item in items:
-                item_basic = item.get('item_basic', {})
-                
-                # Convert price (Shopee price is in cents)
-                price = item_basic.get('price', 0) / 100000
-                
-                # Get main image
-                image_id = item_basic.get('image', '')
-                image_url = build_shopee_image_url(image_id, shop_id) if image_id else None
-                
-                product = {
-                    'itemid': item_basic.get('itemid'),
-                    'shopid': item_basic.get('shopid', shop_id),
-                    'name': item_basic.get('name', ''),
-                    'price': price,
-                    'price_min': item_basic.get('price_min', 0) / 100000,
-                    'price_max': item_basic.get('price_max', 0) / 100000,
-                    'image': image_url,
-                    'images': [build_shopee_image_url(img, shop_id) for img in item_basic.get('images', [])],
-                    'stock': item_basic.get('stock', 0),
-                    'sold': item_basic.get('sold', 0),
-                    'historical_sold': item_basic.get('historical_sold', 0),
-                    'liked_count': item_basic.get('liked_count', 0),
-                    'rating_star': item_basic.get('item_rating', {}).get('rating_star', 0),
-                    'url': build_shopee_product_url(shop_id, item_basic.get('itemid'), item_basic.get('name', '')),
-                }
-                
-                products.append(product)
-            
-            result = {
-                'products': products,
-                'total': data.get('total_count', len(products)),
-                'has_more': len(items) >= limit
-            }
-            
-            # Cache for 5 minutes
-            cache.set(cache_key, result, settings.API_CACHE_TIMEOUT)
-            
-            return result
-        else:
-            logger.error(f"Shopee API error: {data.get('error_msg', 'Unknown error')}")
-            return {'products': [], 'total': 0, 'has_more': False}
+        return result
             
+    except BulkheadFull:
+        return get_stale_result(cache.get(f'stale_{cache_key}'), WINDOW_SIZE)
     except requests.exceptions.Timeout:
         logger.error("Shopee API timeout")
-        logger.info("Using static fallback products")
-        return get_fallback_result(limit)
     except requests.exceptions.RequestException as e:
         logger.error(f"Shopee API request error: {e}")
-        logger.info("Using static fallback products")
-        return get_fallback_result(limit)
     except Exception as e:
         logger.error(f"Unexpected error fetching Shopee products: {e}")
-        logger.info("Using static fallback products")
+
+    cache.set(down_key, True, settings.API_NEGATIVE_CACHE_TIMEOUT)
+    return get_stale_result(cache.get(f'stale_{cache_key}'), WINDOW_SIZE)
+
+
+async def afetch_shopee_window(shop_id, offset):
+    """
+    Async version of fetch_shopee_window
+
+    Uses a non-blocking HTTP client so the upstream wait does not hold a
+    thread.
+    """
+    import httpx
+
+    # Check cache
+    cache_key = window_cache_key(shop_id, offset)
+    with span('cache', key=cache_key) as current:
+        cached_data = await cache.aget(cache_key)
+        current.set(hit=bool(cached_data))
+    if cached_data:
+        return cached_data
+
+    down_key = f'shopee_down_{shop_id}'
+    if await cache.aget(down_key):
+        return get_stale_result(await cache.aget(f'stale_{cache_key}'), WINDOW_SIZE)
+
+    try:
+        url, params, headers = build_shopee_request(shop_id, WINDOW_SIZE, offset)
+
+        client = get_async_client()
+        async with get_bulkhead('shopee').aslot():
+            with span('upstream', service='shopee', url=url) as current:
+                response = await aupstream_get('shopee', lambda: client.get(url, params=params, headers=headers, timeout=15))
+                current.set(status=response.status_code, bytes=len(response.content))
+                response.raise_for_status()
+
+        with span('normalize', service='shopee'):
+            result = parse_shopee_response(response.json(), shop_id, WINDOW_SIZE)
+        if result is None:
+            result = {'products': [], 'total': 0, 'has_more': False, 'error': 'api_error'}
+        else:
+            result['products'] = apply_placeholders(
+                result['products'], 'shopee', shopee_image_id, lambda product: product.get('image'),
+            )
+
+        # Cache for 5 minutes, keep a stale copy for when upstream is busy or down
+        for key, value, timeout in window_cache_entries(shop_id, cache_key, result):
+            await cache.aset(key, value, timeout)
+
+        return result
+
+    except BulkheadFull:
+        return get_stale_result(await cache.aget(f'stale_{cache_key}'), WINDOW_SIZE)
+    except httpx.TimeoutException:
+        logger.error("Shopee API timeout")
+    except httpx.HTTPError as e:
+        logger.error(f"Shopee API request error: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error fetching Shopee products: {e}")
+
+    await cache.aset(down_key, True, settings.API_NEGATIVE_CACHE_TIMEOUT)
+    return get_stale_result(await cache.aget(f'stale_{cache_key}'), WINDOW_SIZE)
+
+
+def fetch_shopee_products(shop_id=None, limit=50, offset=0, use_cache=True):
+    """
+    Fetch products from Shopee API via Cloudflare Worker Proxy
+    
+    The slice is served from canonical WINDOW_SIZE windows (see
+    fetch_shopee_window). Slices past the shop's known total return no
+    products, marked ``out_of_range``, without asking upstream.
+    
+    Args:
+        shop_id: Shopee shop ID (if None, the main shop, see resolve_shop_id)
+        limit: Number of products to fetch (max 50 per request)
+        offset: Pagination offset
+        use_cache: Set to False to always ask upstream (background refresh)
+    
+    Returns:
+        dict: {
+            'products': [...],
+            'total': int,
+            'has_more': bool
+        }
+    """
+    # Get shop ID
+    shop_id = resolve_shop_id(shop_id)
+    if not shop_id:
+        logger.error("Cannot resolve Shopee shop ID")
         return get_fallback_result(limit)
 
+    total = cache.get(f'shopee_total_{shop_id}')
+    limit, offset, windows, past_end = canonical_windows(limit, offset, total)
+    if past_end:
+        return out_of_range_result(total)
+
+    results = [fetch_shopee_window(shop_id, window, use_cache) for window in windows]
+    return merge_windows(results, limit, offset)
+
+
+async def afetch_shopee_products(shop_id=None, limit=50, offset=0):
+    """
+    Async version of fetch_shopee_products for ASGI views
+
+    Same arguments and return value as fetch_shopee_products.
+    """
+    # Get shop ID (username lookup is rare, run it off the event loop)
+    shop_id = shop_id or get_shops()[0]['shopid']
+    if not shop_id:
+        shop_id = await sync_to_async(resolve_shop_id)()
+    if not shop_id:
+        logger.error("Cannot resolve Shopee shop ID")
+        return get_fallback_result(limit)
+
+    total = await cache.aget(f'shopee_total_{shop_id}')
+    limit, offset, windows, past_end = canonical_windows(limit, offset, total)
+    if past_end:
+        return out_of_range_result(total)
+
+    results = await asyncio.gather(*(afetch_shopee_window(shop_id, window) for window in windows))
+    return merge_windows(results, limit, offset)
+
+
+class ShopeeAPIError(Exception):
+    """
+    Raised by the crawler when Shopee answers with an error payload
+    """
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the request rate
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum burst size (defaults to ``rate``)
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, sleeping until it is available
+
+        Returns:
+            float: Seconds spent waiting for the token
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now; a negative balance is the queue of waiters
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def crawl_shopee_catalog(shop_id=None, page_size=50, concurrency=None, rate=None):
+    """
+    Fetch the whole shop catalog with bounded parallelism
+
+    Pages of ``search_items`` are requested by several workers at once, all
+    drawing from one token bucket so the proxy never sees more than ``rate``
+    requests per second. ``total_count`` bounds the page range; without it (or
+    when the shop grew mid-crawl) ``has_more`` drives the crawl one page ahead.
+    Items are deduplicated by ``itemid`` because offsets shift when products
+    are added or removed while crawling.
+
+    Args:
+        shop_id: Shopee shop ID (if None, resolved like fetch_shopee_products)
+        page_size: Items per page (max 50)
+        concurrency: Parallel page requests (default SHOPEE_CRAWL_CONCURRENCY)
+        rate: Requests per second (default SHOPEE_CRAWL_RATE)
+
+    Returns:
+        dict: {
+            'products': [...],
+            'total': int,
+            'stats': {'pages', 'bytes', 'wall_time', 'throttle_wait', 'duplicates'}
+        }
+
+    Raises:
+        ShopeeAPIError, requests.exceptions.RequestException: If any page fails
+    """
+    import requests.adapters
+
+    shop_id = resolve_shop_id(shop_id)
+    if not shop_id:
+        raise ShopeeAPIError('Cannot resolve Shopee shop ID')
+
+    concurrency = concurrency or settings.SHOPEE_CRAWL_CONCURRENCY
+    bucket = TokenBucket(rate or settings.SHOPEE_CRAWL_RATE)
+    max_pages = settings.SHOPEE_CRAWL_MAX_PAGES
+    stats = {'pages': 0, 'bytes': 0, 'wall_time': 0.0, 'throttle_wait': 0.0, 'duplicates': 0}
+    stats_lock = threading.Lock()
+    started = time.monotonic()
+
+    session = requests.Session()
+    session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def fetch_page(offset):
+        url, params, headers = build_shopee_request(shop_id, page_size, offset)
+
+        def throttle():
+            # Every attempt takes a token, hedges and retries included
+            waited = bucket.acquire()
+            with stats_lock:
+                stats['throttle_wait'] += waited
+
+        response = upstream_get(
+            'shopee',
+            lambda: session.get(url, params=params, headers=headers, timeout=15),
+            throttle,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get('error') != 0:
+            raise ShopeeAPIError(data.get('error_msg', 'Unknown error'))
+
+        with stats_lock:
+            stats['pages'] += 1
+            stats['bytes'] += len(response.content)
+
+        items = get_item_basics(data)
+        return {
+            'items': items,
+            'total': data.get('total_count') or 0,
+            'has_more': not data.get('nomore', len(items) < page_size) and bool(items),
+        }
+
+    pages = {0: fetch_page(0)}
+    # Pages at or past `end` are known to be empty
+    end = None if pages[0]['has_more'] else page_size
+    # Without a total, speculate one page at a time
+    bound = pages[0]['total'] or 2 * page_size
+    next_offset = page_size
+    inflight = {}
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                while (len(inflight) < concurrency and next_offset < bound
+                       and (end is None or next_offset < end)
+                       and next_offset < max_pages * page_size):
+                    inflight[pool.submit(fetch_page, next_offset)] = next_offset
+                    next_offset += page_size
+
+                if not inflight:
+                    break
+
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offset = inflight.pop(future)
+                    page = pages[offset] = future.result()
+                    if not page['has_more']:
+                        end = offset + page_size if end is None else min(end, offset + page_size)
+                    elif offset + page_size >= bound:
+                        # Shop grew past total_count: keep going one page ahead
+                        bound = offset + 2 * page_size
+    finally:
+        for future in inflight:
+            future.cancel()
+        session.close()
+
+    products = []
+    seen = set()
+    for offset in sorted(pages):
+        for item_basic in pages[offset]['items']:
+            itemid = item_basic.get('itemid')
+            if itemid in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(itemid)
+            products.append(normalize_shopee_item(item_basic, shop_id))
+
+    stats['wall_time'] = round(time.monotonic() - started, 3)
+    stats['throttle_wait'] = round(stats['throttle_wait'], 3)
+
+    return {
+        'products': products,
+        'total': len(products),
+        'stats': stats,
+    }
+
+
+def crawl_shopee_shops(shops=None, timeout=None):
+    """
+    Crawl every configured shop concurrently
+
+    Each shop is crawled by crawl_shopee_catalog in its own thread, with its
+    own session and token bucket, so a shop that is blocked or slow only
+    delays itself. Shops still running after ``timeout`` are reported as
+    failed and left to finish in the background.
+
+    Args:
+        shops: Shops to crawl (default: get_shops())
+        timeout: Seconds to wait for all shops (default SHOPEE_SHOP_CRAWL_TIMEOUT)
+
+    Returns:
+        dict: {username: crawl_shopee_catalog result with 'shopid' added, and
+        every product tagged with 'shop', or {'error': str} if the shop failed}
+    """
+    shops = shops or get_shops()
+    timeout = timeout or settings.SHOPEE_SHOP_CRAWL_TIMEOUT
+
+    def crawl(shop):
+        shop_id = resolve_shop_id(shop['shopid'], shop['username'])
+        if not shop_id:
+            raise ShopeeAPIError(f"Cannot resolve Shopee shop ID of {shop['username']}")
+        with span('crawl', service='shopee', shop=shop['username']):
+            catalog = crawl_shopee_catalog(shop_id)
+        for product in catalog['products']:
+            product['shop'] = shop['username']
+        return dict(catalog, shopid=str(shop_id))
+
+    results = {}
+    pool = ThreadPoolExecutor(max_workers=len(shops), thread_name_prefix='shopee-shop')
+    try:
+        futures = {pool.submit(contextvars.copy_context().run, crawl, shop): shop['username'] for shop in shops}
+        done, pending = wait(futures, timeout=timeout)
+        for future in done:
+            username = futures[future]
+            try:
+                results[username] = future.result()
+            except Exception as e:
+                logger.error(f"Shopee crawl of {username} failed: {e}")
+                results[username] = {'error': str(e)}
+        for future in pending:
+            username = futures[future]
+            logger.error(f"Shopee crawl of {username} timed out after {timeout}s")
+            results[username] = {'error': f'timed out after {timeout}s'}
+    finally:
+        # Do not wait for timed out shops
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
 
 def get_fallback_result(limit=50):
     """
@@ -246,6 +833,24 @@ def get_fallback_result(limit=50):
     }
 
 
+def get_stale_result(stale, limit=50):
+    """
+    Serve the last good result for a window, or static products if none
+
+    Args:
+        stale: Stale copy from the cache (None if expired or never fetched)
+        limit: Window size, for the static fallback
+
+    Returns:
+        dict: Result marked ``stale``, or the static fallback result
+    """
+    if stale:
+        logger.info("Using stale Shopee products")
+        return dict(stale, stale=True)
+    logger.info("Using static fallback products")
+    return get_fallback_result(limit)
+
+
 def build_shopee_image_url(image_id, shop_id=None):
     """
     Build Shopee CDN image URL from image ID
@@ -0,0 +1,157 @@
+"""
+Snapshot Store
+Persist refreshed API data on disk so request processes only have to read it
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Parsed snapshots per process, keyed by name -> (mtime_ns, payload)
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def snapshot_path(name):
+    """
+    Path of the JSON file holding a snapshot
+    """
+    return os.path.join(settings.CATALOG_SNAPSHOT_DIR, f'{name}.json')
+
+
+def checked_path(name):
+    """
+    Path of the empty file whose mtime says when a snapshot was last confirmed
+    """
+    return os.path.join(settings.CATALOG_SNAPSHOT_DIR, f'{name}.checked')
+
+
+def compute_version(data):
+    """
+    Short content hash identifying a version of the data
+    """
+    raw = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def save_snapshot(name, data):
+    """
+    Atomically write a snapshot to disk
+
+    Args:
+        name: Snapshot name (e.g. 'shopee_catalog')
+        data: JSON-serializable data
+
+    Returns:
+        dict: {
+            'data': ...,
+            'version': str,
+            'fetched_at': float (unix time)
+        }
+    """
+    payload = {
+        'data': data,
+        'version': compute_version(data),
+        'fetched_at': time.time(),
+    }
+
+    path = snapshot_path(name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as e:
+        # Read-only filesystem (e.g. serverless): keep it for this process only
+        logger.error(f"Cannot write snapshot {name}: {e}")
+        mtime = None
+
+    with _memo_lock:
+        _memo[name] = (mtime, payload)
+    return payload
+
+
+def touch_snapshot(name):
+    """
+    Mark a stored snapshot as still current without rewriting it
+
+    For refreshes that produced the same version: snapshot_age counts from
+    the last check instead of the last change, and readers do not re-parse.
+
+    Returns:
+        dict or None: The stored payload, with ``checked_at``
+    """
+    now = time.time()
+    path = checked_path(name)
+    try:
+        with open(path, 'a'):
+            pass
+        os.utime(path, (now, now))
+    except OSError as e:
+        logger.error(f"Cannot touch snapshot {name}: {e}")
+
+    payload = load_snapshot(name)
+    if payload is not None:
+        payload['checked_at'] = max(now, payload.get('checked_at', 0))
+    return payload
+
+
+def apply_checked(name, payload):
+    """
+    Copy the time of the last touch_snapshot into a loaded payload
+    """
+    try:
+        checked = os.stat(checked_path(name)).st_mtime
+    except OSError:
+        return payload
+    if checked > payload.get('checked_at', payload['fetched_at']):
+        payload['checked_at'] = checked
+    return payload
+
+
+def load_snapshot(name):
+    """
+    Load a snapshot, re-reading the file only when it changed on disk
+
+    Returns:
+        dict or None: Payload written by save_snapshot, None if missing
+    """
+    memo = _memo.get(name)
+    if memo and memo[0] is None:
+        # Written by this process but not persisted, see save_snapshot
+        return memo[1]
+
+    try:
+        mtime = os.stat(snapshot_path(name)).st_mtime_ns
+    except OSError:
+        return None
+
+    if memo and memo[0] == mtime:
+        return apply_checked(name, memo[1])
+
+    try:
+        with open(snapshot_path(name), encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot read snapshot {name}: {e}")
+        return memo[1] if memo else None
+
+    with _memo_lock:
+        _memo[name] = (mtime, payload)
+    return apply_checked(name, payload)
+
+
+def snapshot_age(payload):
+    """
+    Age of a snapshot payload in seconds, since it was last confirmed current
+    """
+    if not payload:
+        return None
+    return max(0.0, time.time() - payload.get('checked_at', payload.get('fetched_at', 0)))
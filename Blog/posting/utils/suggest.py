@@ -0,0 +1,117 @@
+"""
+Product Suggestions
+Search-as-you-type over product names with a sorted token array
+
+Product names are normalized (lowercase, accents and punctuation removed) and
+split into tokens. The index keeps the distinct tokens sorted, so the tokens
+starting with a prefix are one bisect plus a short scan. Products are numbered
+by popularity (historical_sold, then sold), which makes "best sellers first"
+a matter of sorting small integers.
+
+Every term of a query is a prefix and a product has to match all of them:
+"kaos pol" finds "Kaos Polos Hitam". The index is rebuilt only when the
+catalog version changes.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Shorter tokens (sizes, single letters) are not offered as completions
+MIN_TERM_LENGTH = 3
+
+
+def normalize(text):
+    """
+    Lowercase ASCII words of a text, joined by single spaces
+    """
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+class SuggestIndex:
+    """
+    Prefix index over one catalog version
+
+    Attributes:
+        tokens: Distinct name tokens, sorted
+        postings: For each token, product numbers (popularity order) containing it
+        popularity: For each token, total historical_sold of its products,
+                    used to rank completions of the last query term
+    """
+
+    def __init__(self, products):
+        ranked = sorted(
+            products,
+            key=lambda product: (-product.get('historical_sold', 0), -product.get('sold', 0)),
+        )
+        self.products = [
+            {'id': product['itemid'], 'name': product['name'], 'price': product['price'], 'url': product['url']}
+            for product in ranked
+        ]
+
+        postings = {}
+        popularity = {}
+        for number, product in enumerate(ranked):
+            for token in set(normalize(product['name']).split()):
+                postings.setdefault(token, []).append(number)
+                popularity[token] = popularity.get(token, 0) + product.get('historical_sold', 0)
+
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+        self.popularity = [popularity[token] for token in self.tokens]
+
+    def prefix_range(self, prefix):
+        """
+        Positions in ``tokens`` of every token starting with prefix
+
+        Returns:
+            range: Contiguous, since the tokens are sorted
+        """
+        start = bisect_left(self.tokens, prefix)
+        # Every token with this prefix sorts before prefix + U+FFFF
+        end = bisect_left(self.tokens, prefix + '\uffff', start)
+        return range(start, end)
+
+    def matching(self, prefix):
+        """
+        Product numbers with a name token starting with prefix
+        """
+        positions = self.prefix_range(prefix)
+        if len(positions) == 1:
+            return set(self.postings[positions[0]])
+        numbers = set()
+        for position in positions:
+            numbers.update(self.postings[position])
+        return numbers
+
+    def suggest(self, query, limit=8):
+        """
+        Best-selling products matching every query term, plus completions
+
+        Returns:
+            dict: {'products': [...], 'terms': [query with its last term completed]}
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return {'products': [], 'terms': []}
+
+        numbers = None
+        for term in sorted(terms, key=len, reverse=True):
+            # Longest terms first: their sets are smallest
+            matches = self.matching(term)
+            numbers = matches if numbers is None else numbers & matches
+            if not numbers:
+                return {'products': [], 'terms': []}
+
+        products = [self.products[number] for number in sorted(numbers)[:limit]]
+
+        # Popular words the last term may become, after the terms before it
+        head = ' '.join(terms[:-1] + [''])
+        positions = sorted(self.prefix_range(terms[-1]), key=lambda position: -self.popularity[position])
+        completions = [
+            head + self.tokens[position] for position in positions
+            if len(self.tokens[position]) >= MIN_TERM_LENGTH
+        ][:limit]
+        return {'products': products, 'terms': completions}
@@ -0,0 +1,179 @@
+"""
+Request Tracing
+Trace and span IDs carried in contextvars, spans exported as NDJSON
+
+TracingMiddleware starts a trace per request. Code below it opens spans with
+``with span('upstream', url=...)``; spans nest through contextvars, so they
+follow the request across async tasks (asyncio.gather copies the context).
+Outside a trace, span() yields a no-op span.
+
+A trace is sampled with probability TRACE_SAMPLE_RATE. Finished spans of
+sampled traces are appended as one JSON object per line to TRACE_FILE, which
+rotates at TRACE_FILE_MAX_BYTES. Every trace, sampled or not, gets an ID that
+TraceIdFilter adds to log records.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from .profiler import profile_thread
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed operation within a trace
+    """
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'sampled', 'attrs', 'start', 'started')
+
+    def __init__(self, name, trace_id, parent_id, sampled, attrs):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.sampled = sampled
+        self.attrs = attrs
+        self.start = time.time()
+        self.started = time.perf_counter()
+
+    def set(self, **attrs):
+        """
+        Add attributes after the span started (status code, cache hit...)
+        """
+        self.attrs.update(attrs)
+
+    def to_dict(self, duration):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': round(duration * 1000, 3),
+            'attrs': self.attrs,
+        }
+
+
+class NoopSpan:
+    """
+    Stand-in yielded by span() outside a trace
+    """
+    trace_id = None
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def get_exporter():
+    """
+    Rotating NDJSON file handler for finished spans, None if unwritable
+    """
+    global _exporter
+
+    with _exporter_lock:
+        if _exporter is None:
+            try:
+                os.makedirs(os.path.dirname(settings.TRACE_FILE), exist_ok=True)
+                _exporter = logging.handlers.RotatingFileHandler(
+                    settings.TRACE_FILE,
+                    maxBytes=settings.TRACE_FILE_MAX_BYTES,
+                    backupCount=settings.TRACE_FILE_BACKUPS,
+                )
+                _exporter.setFormatter(logging.Formatter('%(message)s'))
+            except OSError as e:
+                logger.warning(f"Span export disabled, cannot open {settings.TRACE_FILE}: {e}")
+                _exporter = False
+        return _exporter or None
+
+
+def export_span(current, duration):
+    """
+    Append a finished span to the trace file
+    """
+    exporter = get_exporter()
+    if exporter is None:
+        return
+    line = json.dumps(current.to_dict(duration), default=str, separators=(',', ':'))
+    # handle() holds the handler lock: spans of concurrent threads never
+    # interleave, and a rollover cannot race a write
+    exporter.handle(logging.makeLogRecord({'msg': line}))
+
+
+@contextmanager
+def _run_span(current):
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        if current.sampled:
+            export_span(current, time.perf_counter() - current.started)
+
+
+def trace(name, **attrs):
+    """
+    Start a new trace with its root span
+
+    Usage:
+        with trace('view', path=request.path) as root:
+            ...
+    """
+    sampled = random.random() < settings.TRACE_SAMPLE_RATE
+    return _run_span(Span(name, uuid.uuid4().hex, None, sampled, attrs))
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Child span of the current one; a no-op outside a trace
+
+    Usage:
+        with span('upstream', url=url) as current:
+            response = requests.get(url)
+            current.set(status=response.status_code)
+    """
+    # Threads doing traced work are the ones a request profile samples
+    profile_thread()
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    with _run_span(Span(name, parent.trace_id, parent.span_id, parent.sampled, attrs)) as current:
+        yield current
+
+
+def current_trace_id():
+    """
+    ID of the trace the caller runs in, None outside a trace
+    """
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+class TraceIdFilter(logging.Filter):
+    """
+    Add ``trace_id`` to log records ('-' outside a request)
+    """
+
+    def filter(self, record):
+        record.trace_id = current_trace_id() or '-'
+        return True
@@ -1,29 +1,48 @@
 """
 Views for Model Manis website
 API-based views without database
+
+The data-heavy views are async so that, under ASGI, waiting on Shopee or
+Instagram does not hold a worker thread. Django runs them unchanged under WSGI.
+Data is read from the snapshots kept by `manage.py refresh_catalog` when present.
+Every page carries an edge cache policy (see cache_policy.py).
 """
-from django.shortcuts import render
+import asyncio
+from django.http import HttpResponsePermanentRedirect
+from django.urls import reverse
 from django.conf import settings
 from django.core.paginator import Paginator
-from .utils.shopee_api import fetch_shopee_products, format_price
-from .utils.instagram_api import fetch_instagram_feed, truncate_caption
+from .utils.shopee_api import format_price
+from .utils.instagram_api import truncate_caption
+from .utils.catalog import aget_products, aget_instagram_feed, PRODUCTS_PER_PAGE
+from .utils.prefetch import is_browser_prefetch, note_request, schedule_prefetch
+from .cache_policy import cache_policy
+from .rendering import render_page
+from .streaming import stream_homepage
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def homepage(request):
+@cache_policy('catalog', keys=('catalog', 'instagram'))
+async def homepage(request):
     """
     Homepage view - display featured products from Shopee
     """
+    if settings.HOMEPAGE_RENDER_MODE == 'stream':
+        return stream_homepage(request)
+    if settings.HOMEPAGE_RENDER_MODE == 'fragments':
+        return homepage_shell(request)
+
     try:
-        # Fetch products from Shopee
-        shopee_data = fetch_shopee_products(limit=12)
+        # Fetch products from Shopee and Instagram feed preview (first 6 posts)
+        shopee_data, instagram_data = await asyncio.gather(
+            aget_products(limit=12),
+            aget_instagram_feed(limit=6),
+        )
         products = shopee_data.get('products', [])
         shopee_error = shopee_data.get('error')
         
-        # Get Instagram feed preview (first 6 posts)
-        instagram_data = fetch_instagram_feed(limit=6)
         instagram_posts = instagram_data.get('media', [])
         
         context = {
@@ -36,7 +55,10 @@ def homepage(request):
             'shopee_error': shopee_error,  # Pass error flag to template
         }
         
-        return render(request, 'posting/homepage.html', context)
+        response = render_page(request, 'posting/homepage.html', context)
+        if shopee_error or shopee_data.get('stale'):
+            response.cache_policy = 'degraded'
+        return response
     
     except Exception as e:
         logger.error(f"Error in homepage view: {e}")
@@ -50,50 +72,107 @@ def homepage(request):
             'has_instagram': False,
             'error': 'Mohon maaf, terjadi kesalahan saat memuat data.'
         }
-        return render(request, 'posting/homepage.html', context)
+        response = render_page(request, 'posting/homepage.html', context)
+        response.cache_policy = 'degraded'
+        return response
+
+
+def homepage_shell(request):
+    """
+    Homepage without data: products and Instagram load as fragments
+    """
+    context = {
+        'fragment_urls': {
+            'products': f"{reverse('products_fragment')}?limit=8",
+            'instagram': f"{reverse('instagram_fragment')}?limit=6",
+        },
+        'shopee_url': settings.SHOPEE_STORE_URL,
+        'instagram_url': settings.INSTAGRAM_PROFILE_URL,
+    }
+    response = render_page(request, 'posting/homepage.html', context)
+    response.cache_policy = 'shell'
+    return response
 
 
-def product_list(request):
+def product_list_url(page):
+    """
+    URL of a product_list page (/products/, then /products/page/N/)
+    """
+    if page <= 1:
+        return reverse('product_list')
+    return reverse('product_list_page', args=[page])
+
+
+@cache_policy('catalog', keys=('catalog',))
+async def product_list(request, page=None):
     """
     Product listing view - display all products from Shopee
+
+    Each page has one URL: ?page=N links and /products/page/1/ redirect to it.
+    Pages past the end of the catalog are a 404 pointing at the last page.
     """
-    try:
-        # Get page number
-        page_number = request.GET.get('page', 1)
-        limit = 50
-        
+    # Canonical URL (also keeps ?page=garbage out of the caches)
+    if page is None and 'page' in request.GET:
         try:
-            page_number = int(page_number)
-            offset = (page_number - 1) * limit
+            page = int(request.GET['page'])
         except ValueError:
-            page_number = 1
-            offset = 0
+            page = 1
+        return HttpResponsePermanentRedirect(product_list_url(page))
+    if page is not None and page <= 1:
+        return HttpResponsePermanentRedirect(product_list_url(1))
+
+    try:
+        page_number = page or 1
+        limit = PRODUCTS_PER_PAGE
+        offset = (page_number - 1) * limit
+        # Browser prefetches are no visits: they must not score or chain warms
+        visit = not is_browser_prefetch(request)
         
         # Fetch products from Shopee
-        shopee_data = fetch_shopee_products(limit=limit, offset=offset)
+        if visit:
+            note_request(limit, offset)
+        shopee_data = await aget_products(limit=limit, offset=offset)
         products = shopee_data.get('products', [])
         total = shopee_data.get('total', 0)
         has_more = shopee_data.get('has_more', False)
         shopee_error = shopee_data.get('error')
+        degraded = bool(shopee_error or shopee_data.get('stale'))
         
         # Calculate pagination
         total_pages = (total + limit - 1) // limit if total > 0 else 1
+        has_next = has_more and page_number < total_pages
+        # Only a known catalog size makes a page missing, never fallback or stale data
+        not_found = bool(shopee_data.get('out_of_range')) or (
+            not degraded and total > 0 and page_number > total_pages
+        )
+        
+        # Visitors usually open the next page: warm it while they read this one
+        if has_next and not shopee_error and visit:
+            schedule_prefetch(limit, offset + limit)
         
         context = {
             'products': products,
             'page_number': page_number,
             'total_pages': total_pages,
             'has_previous': page_number > 1,
-            'has_next': has_more and page_number < total_pages,
+            'has_next': has_next,
             'previous_page': page_number - 1,
             'next_page': page_number + 1,
+            'previous_page_url': product_list_url(page_number - 1),
+            'next_page_url': product_list_url(page_number + 1),
             'total_products': total,
             'shopee_url': settings.SHOPEE_STORE_URL,
             'has_products': len(products) > 0,
             'shopee_error': shopee_error,  # Pass error flag to template
+            'last_page_url': product_list_url(total_pages) if not_found else None,
         }
         
-        return render(request, 'posting/product_list.html', context)
+        response = render_page(request, 'posting/product_list.html', context)
+        if not_found:
+            response.status_code = 404
+        elif degraded:
+            response.cache_policy = 'degraded'
+        return response
     
     except Exception as e:
         logger.error(f"Error in product_list view: {e}")
@@ -108,16 +187,19 @@ def product_list(request):
             'has_products': False,
             'error': 'Mohon maaf, terjadi kesalahan saat memuat produk.'
         }
-        return render(request, 'posting/product_list.html', context)
+        response = render_page(request, 'posting/product_list.html', context)
+        response.cache_policy = 'degraded'
+        return response
 
 
-def instagram_gallery(request):
+@cache_policy('instagram', keys=('instagram',))
+async def instagram_gallery(request):
     """
     Instagram gallery view - display Instagram feed
     """
     try:
         # Fetch Instagram feed
-        instagram_data = fetch_instagram_feed(limit=24)
+        instagram_data = await aget_instagram_feed(limit=24)
         media_items = instagram_data.get('media', [])
         profile_url = instagram_data.get('profile_url', settings.INSTAGRAM_PROFILE_URL)
         has_token = instagram_data.get('has_token', False)
@@ -132,7 +214,10 @@ def instagram_gallery(request):
             'instagram_username': 'modelmanis_rtl',
         }
         
-        return render(request, 'posting/instagram.html', context)
+        response = render_page(request, 'posting/instagram.html', context)
+        if error_message and has_token:
+            response.cache_policy = 'degraded'
+        return response
     
     except Exception as e:
         logger.error(f"Error in instagram_gallery view: {e}")
@@ -144,9 +229,12 @@ def instagram_gallery(request):
             'error': 'Mohon maaf, terjadi kesalahan saat memuat feed Instagram.',
             'instagram_username': 'modelmanis_rtl',
         }
-        return render(request, 'posting/instagram.html', context)
+        response = render_page(request, 'posting/instagram.html', context)
+        response.cache_policy = 'degraded'
+        return response
 
 
+@cache_policy('static_page')
 def about_us(request):
     """
     About us page
@@ -155,9 +243,10 @@ def about_us(request):
         'shopee_url': settings.SHOPEE_STORE_URL,
         'instagram_url': settings.INSTAGRAM_PROFILE_URL,
     }
-    return render(request, 'posting/about_us.html', context)
+    return render_page(request, 'posting/about_us.html', context)
 
 
+@cache_policy('static_page')
 def contact(request):
     """
     Contact page
@@ -166,4 +255,4 @@ def contact(request):
         'shopee_url': settings.SHOPEE_STORE_URL,
         'instagram_url': settings.INSTAGRAM_PROFILE_URL,
     }
-    return render(request, 'posting/contact.html', context)
+    return render_page(request, 'posting/contact.html', context)
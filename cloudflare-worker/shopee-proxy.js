@@ -10,6 +10,32 @@
  * 6. Add to Django .env: SHOPEE_PROXY=https://your-worker-url.workers.dev
  */
 
+// item_basic fields the Django site uses (ITEM_BASIC_FIELDS in
+// posting/utils/shopee_api.py). With ?format=compact only these are sent,
+// one row of values per item.
+const ITEM_BASIC_FIELDS = [
+  "itemid", "shopid", "name", "catid", "price", "price_min", "price_max", "image", "images",
+  "stock", "sold", "historical_sold", "liked_count", "item_rating",
+];
+
+function compactSearchItems(data) {
+  const rows = (data.items || []).map((item) => {
+    const itemBasic = { ...(item.item_basic || {}) };
+    if (itemBasic.item_rating) {
+      itemBasic.item_rating = { rating_star: itemBasic.item_rating.rating_star || 0 };
+    }
+    return ITEM_BASIC_FIELDS.map((field) => (field in itemBasic ? itemBasic[field] : null));
+  });
+  return {
+    error: data.error,
+    error_msg: data.error_msg || null,
+    total_count: data.total_count,
+    nomore: data.nomore || false,
+    fields: ITEM_BASIC_FIELDS,
+    rows,
+  };
+}
+
 export default {
   async fetch(request, env) {
     // Handle CORS preflight
@@ -27,6 +53,7 @@ export default {
     const shopId = url.searchParams.get("shopid");
     const limit = url.searchParams.get("limit") || "50";
     const offset = url.searchParams.get("offset") || "0";
+    const compact = url.searchParams.get("format") === "compact";
 
     if (!shopId) {
       return new Response(
@@ -69,8 +96,8 @@ export default {
       // Get response data
       const data = await response.json();
 
-      // Return with CORS headers
-      return new Response(JSON.stringify(data), {
+      // Return with CORS headers (Cloudflare gzips for clients that accept it)
+      return new Response(JSON.stringify(compact && data.error === 0 ? compactSearchItems(data) : data), {
         status: response.status,
         headers: {
           "Content-Type": "application/json",